@@ -5,13 +5,15 @@ import os
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
 
-# Initialize database on startup
-from database.db_init import initialize_database
+# Check the schema version on startup (migrates only when the database is behind)
+from database.migrations import ensure_schema
 try:
-    initialize_database()
-    print("Database initialized successfully on app startup.")
+    if ensure_schema():
+        print("Database migrated on app startup.")
 except Exception as e:
+    # Refuse to serve on a schema that is missing or half-migrated
     print(f"Failed to initialize database on startup: {e}")
+    raise
 
 # Register blueprints
 from routes.main_routes import main_bp
@@ -20,5 +22,16 @@ from routes.api_routes import api_bp
 app.register_blueprint(main_bp)
 app.register_blueprint(api_bp, url_prefix='/api')
 
+# Return each request's pooled DB connection when the request ends
+from config.db_config import release_request_connection, finish_sql_instrumentation
+app.teardown_appcontext(release_request_connection)
+
+# Per-request query counts, DB time, N+1 and slow-query logging
+app.after_request(finish_sql_instrumentation)
+
+# Fold credits to hot accounts into their balances in the background
+from database.hot_accounts import start_sweeper
+start_sweeper()
+
 if __name__ == '__main__':
     app.run(debug=True)
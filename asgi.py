@@ -0,0 +1,41 @@
+# ⚡ ASGI application: the /api blueprint on asyncio (hypercorn asgi:app)
+from quart import Quart
+import os
+
+app = Quart(__name__)
+# Same key as app.py, so sessions signed by either app are valid in both
+app.secret_key = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
+
+# Check the schema version on startup (migrates only when the database is behind)
+from database.migrations import ensure_schema
+try:
+    if ensure_schema():
+        print("Database migrated on app startup.")
+except Exception as e:
+    # Refuse to serve on a schema that is missing or half-migrated
+    print(f"Failed to initialize database on startup: {e}")
+    raise
+
+from routes.async_api_routes import api_bp, shutdown_model_executor
+app.register_blueprint(api_bp, url_prefix='/api')
+
+from config.async_db import init_async_pools, close_async_pools
+from database.export_jobs import shutdown_export_workers
+from database.hot_accounts import start_sweeper, stop_sweeper
+
+
+@app.before_serving
+async def open_database_pools():
+    await init_async_pools()
+    start_sweeper()
+
+
+@app.after_serving
+async def close_database_pools():
+    await close_async_pools()
+    shutdown_model_executor()
+    shutdown_export_workers()
+    stop_sweeper()
+
+if __name__ == '__main__':
+    app.run(debug=True)
@@ -0,0 +1,261 @@
+# 🔀 Sync (app.py) vs asyncio (asgi.py) API concurrency benchmark
+"""
+Start the Flask app under gunicorn and the Quart app under hypercorn with the
+same number of worker processes, then hold 1..N concurrent keep-alive
+connections against the same /api endpoints on each and record throughput,
+latency percentiles, errors and server CPU time.
+
+The headline number is connections per core: the highest concurrency each
+server sustains with p99 latency under --slo-ms and under 1% errors, divided
+by its worker count (one worker process per core).
+
+Usage (from the repository root):
+    python benchmarks/async_api_bench.py
+    python benchmarks/async_api_bench.py --concurrency 1 16 64 256 1024 --duration 20 --workers 2
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shlex
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_OUTPUT = os.path.join(REPO_ROOT, 'benchmarks', 'results', 'async_api.json')
+DEFAULT_CONCURRENCY = [1, 8, 32, 128, 512]
+DEFAULT_PATHS = [
+    '/api/transactions?customer_id={customer}&date_range=all',
+    '/api/transactions?customer_id={customer}&date_range=3months&transaction_type=debit',
+    '/api/health',
+]
+SERVERS = {
+    'sync': '{python} -m gunicorn --workers {workers} --threads {threads} --bind 127.0.0.1:{port} app:app',
+    'async': '{python} -m hypercorn --workers {workers} --bind 127.0.0.1:{port} asgi:app',
+}
+
+
+def cpu_seconds(root_pid):
+    """User+system CPU of a process and all its descendants (Linux /proc), or None elsewhere."""
+    if not os.path.isdir('/proc'):
+        return None
+    ticks = os.sysconf('SC_CLK_TCK')
+    parents, usage = {}, {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        parents[int(entry)] = int(fields[1])
+        usage[int(entry)] = (int(fields[11]) + int(fields[12])) / ticks
+    tree, frontier = {root_pid}, [root_pid]
+    while frontier:
+        pid = frontier.pop()
+        for child, parent in parents.items():
+            if parent == pid and child not in tree:
+                tree.add(child)
+                frontier.append(child)
+    return sum(usage.get(pid, 0.0) for pid in tree)
+
+
+async def _read_response(reader):
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    length = 0
+    for line in head.split(b'\r\n')[1:]:
+        name, _, value = line.partition(b':')
+        if name.strip().lower() == b'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def _client(port, paths, customers, deadline, record, rng):
+    """One keep-alive connection issuing requests back to back until `deadline`."""
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        path = rng.choice(paths).format(customer=rng.choice(customers))
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: keep-alive\r\n\r\n'.encode())
+            await writer.drain()
+            status = await _read_response(reader)
+            record((time.perf_counter() - start) * 1000, status < 500)
+        except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError, IndexError):
+            record((time.perf_counter() - start) * 1000, False)
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.01)
+    if writer is not None:
+        writer.close()
+
+
+async def _drive(port, paths, customers, concurrency, duration, seed):
+    """Hold `concurrency` connections for `duration` seconds; returns (latencies in ms, failed requests)."""
+    latencies, failures = [], [0]
+
+    def record(latency_ms, ok):
+        if ok:
+            latencies.append(latency_ms)
+        else:
+            failures[0] += 1
+
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(_client(port, paths, customers, deadline, record, random.Random(seed + i))
+                           for i in range(concurrency)))
+    return latencies, failures[0]
+
+
+def run_level(server_pid, port, paths, customers, concurrency, duration, warmup, seed):
+    if warmup:
+        asyncio.run(_drive(port, paths, customers, concurrency, warmup, seed))
+    cpu_before = cpu_seconds(server_pid)
+    latencies, failures = asyncio.run(_drive(port, paths, customers, concurrency, duration, seed))
+    cpu_after = cpu_seconds(server_pid)
+
+    completed = len(latencies)
+    total = completed + failures
+    result = {
+        'concurrency': concurrency,
+        'requests': completed,
+        'errors': failures,
+        'error_rate': round(failures / total, 4) if total else 0.0,
+        'rps': round(completed / duration, 1),
+    }
+    if latencies:
+        result.update({
+            'p50_ms': round(float(np.percentile(latencies, 50)), 2),
+            'p95_ms': round(float(np.percentile(latencies, 95)), 2),
+            'p99_ms': round(float(np.percentile(latencies, 99)), 2),
+        })
+    if cpu_before is not None:
+        cpu = cpu_after - cpu_before
+        result['server_cpu_s'] = round(cpu, 2)
+        result['rps_per_cpu_second'] = round(completed / cpu, 1) if cpu > 0 else None
+    return result
+
+
+def wait_until_ready(port, process, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'server exited with code {process.returncode}')
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/api/health', timeout=2) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            time.sleep(0.25)
+    raise RuntimeError('server did not become ready')
+
+
+def benchmark_server(name, command, args):
+    print(f"Starting {name} server: {command}")
+    process = subprocess.Popen(shlex.split(command), cwd=REPO_ROOT,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL if not args.verbose else None)
+    levels = []
+    try:
+        wait_until_ready(args.port, process)
+        for concurrency in args.concurrency:
+            result = run_level(process.pid, args.port, args.paths, args.customers, concurrency,
+                               args.duration, args.warmup, args.seed)
+            levels.append(result)
+            print(f"  {name:<5} c={concurrency:<5} rps={result['rps']:<8} p50={result.get('p50_ms', '-')}ms "
+                  f"p99={result.get('p99_ms', '-')}ms errors={result['errors']}")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return levels
+
+
+def summarise(levels, workers, slo_ms):
+    within_slo = [level for level in levels
+                  if level.get('p99_ms') is not None and level['p99_ms'] <= slo_ms and level['error_rate'] < 0.01]
+    best = max(within_slo, key=lambda level: level['concurrency'], default=None)
+    peak = max(levels, key=lambda level: level['rps'], default=None)
+    return {
+        'max_concurrency_within_slo': best['concurrency'] if best else 0,
+        'connections_per_core': round(best['concurrency'] / workers, 1) if best else 0.0,
+        'peak_rps': peak['rps'] if peak else 0.0,
+        'peak_rps_per_core': round(peak['rps'] / workers, 1) if peak else 0.0,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Concurrent connections per core: sync Flask vs asyncio API')
+    parser.add_argument('--concurrency', nargs='+', type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--duration', type=float, default=10, help='measured seconds per concurrency level')
+    parser.add_argument('--warmup', type=float, default=2, help='unmeasured seconds before each level')
+    parser.add_argument('--workers', type=int, default=1, help='worker processes per server (= cores)')
+    parser.add_argument('--sync-threads', type=int, default=8, help='gunicorn threads per sync worker')
+    parser.add_argument('--slo-ms', type=float, default=500, help='p99 latency a level must stay under')
+    parser.add_argument('--paths', nargs='+', default=DEFAULT_PATHS,
+                        help='request paths; {customer} is replaced by a random customer id')
+    parser.add_argument('--customers', type=int, nargs=2, default=[1, 1000], metavar=('FIRST', 'LAST'))
+    parser.add_argument('--servers', nargs='+', choices=list(SERVERS), default=list(SERVERS))
+    parser.add_argument('--sync-cmd', default=SERVERS['sync'], help='command template for the sync server')
+    parser.add_argument('--async-cmd', default=SERVERS['async'], help='command template for the async server')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--verbose', action='store_true', help='show server logs')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    args = parser.parse_args(argv)
+    args.customers = list(range(args.customers[0], args.customers[1] + 1))
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    templates = {'sync': args.sync_cmd, 'async': args.async_cmd}
+    results = {}
+    for name in args.servers:
+        command = templates[name].format(python=shlex.quote(sys.executable), workers=args.workers,
+                                         threads=args.sync_threads, port=args.port)
+        levels = benchmark_server(name, command, args)
+        results[name] = {'command': command, 'levels': levels,
+                         'summary': summarise(levels, args.workers, args.slo_ms)}
+
+    report = {
+        'generated_at': datetime.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'db_backend': os.environ.get('DB_BACKEND', 'mysql'),
+        },
+        'settings': {
+            'concurrency': args.concurrency,
+            'duration_s': args.duration,
+            'workers': args.workers,
+            'sync_threads': args.sync_threads,
+            'slo_p99_ms': args.slo_ms,
+            'paths': args.paths,
+        },
+        'servers': results,
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"Report written to: {args.output}")
+    for name, result in results.items():
+        summary = result['summary']
+        print(f"{name:<5} connections/core within p99 {args.slo_ms:g}ms: {summary['connections_per_core']}  "
+              f"peak rps/core: {summary['peak_rps_per_core']}")
@@ -0,0 +1,320 @@
+# 📏 Model size vs latency vs accuracy benchmark sweep
+"""
+Train variants of the credit model and measure what each one costs to serve.
+
+For every variant the sweep records RMSE, artifact size on disk, load time,
+per-worker RSS, single-row p50/p99 latency through
+feature_engineering.predict_credit_score and batch throughput, then writes
+everything to a JSON report together with the smallest variant whose RMSE
+stays within the tolerance of the best one.
+
+Usage (from the repository root):
+    python benchmarks/model_sweep.py
+    python benchmarks/model_sweep.py --trees 10 50 100 --depths 4 8 --output sweep.json
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor, HistGradientBoostingRegressor
+from sklearn.model_selection import train_test_split
+
+# Add parent directory to path to import config and model
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import model_config
+from model import feature_engineering
+from model.train_model import generate_synthetic_data, preprocess_data
+
+try:
+    import lightgbm
+except ImportError:
+    lightgbm = None
+
+try:
+    import shap
+except ImportError:
+    shap = None
+
+DEFAULT_TREES = [10, 25, 50, 100, 200, 300]
+DEFAULT_DEPTHS = [4, 6, 8, 10, 12, 16]
+DEFAULT_OUTPUT = 'benchmarks/results/model_sweep.json'
+
+RAW_FEATURES = ['age', 'income', 'credit_score', 'debt_to_income', 'employment_years',
+                'loan_amount', 'loan_term', 'home_ownership', 'purpose']
+
+
+def build_estimator(family, n_trees, depth):
+    """Create an unfitted estimator for one point of the sweep."""
+    if family == 'random_forest':
+        return RandomForestRegressor(n_estimators=n_trees, max_depth=depth, random_state=42, n_jobs=-1)
+    if family == 'hist_gbm':
+        return HistGradientBoostingRegressor(max_iter=n_trees, max_depth=depth, random_state=42)
+    if family == 'lightgbm':
+        return lightgbm.LGBMRegressor(n_estimators=n_trees, max_depth=depth,
+                                      num_leaves=min(31, 2 ** depth), random_state=42, verbose=-1)
+    raise ValueError(f'Unknown model family: {family}')
+
+
+def available_families(requested):
+    """Drop families whose library is not installed."""
+    families = []
+    for family in requested:
+        if family == 'lightgbm' and lightgbm is None:
+            print("lightgbm is not installed, skipping LightGBM variants.")
+            continue
+        families.append(family)
+    return families
+
+
+def sample_customers(df, n=200):
+    """Turn synthetic rows into customer dicts accepted by predict_credit_score."""
+    customers = []
+    for row in df[RAW_FEATURES].head(n).to_dict('records'):
+        # Enough history to pass the data sufficiency check
+        row.update({'transaction_count': 10, 'total_loans': 1, 'total_payments': 12})
+        customers.append(row)
+    return customers
+
+
+def rss_to_mb(max_rss):
+    """ru_maxrss is reported in KiB on Linux and in bytes on macOS."""
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(max_rss / divisor, 2)
+
+
+def current_rss_mb():
+    """Resident set size right now (Linux /proc), or the peak where /proc is unavailable."""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return round(pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024), 2)
+    except (OSError, ValueError):
+        return rss_to_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def measure_worker_rss(model_path, shap_path, customer):
+    """Run in a fresh process: RSS before and after loading the artifacts, and peak RSS after one prediction.
+
+    The spawned process has already imported sklearn, numpy and joblib, so
+    the growth from joblib.load is what the model itself costs each worker.
+    """
+    gc.collect()
+    baseline = current_rss_mb()
+    artifacts = [joblib.load(path) for path in (model_path, shap_path) if os.path.exists(path)]
+    loaded = current_rss_mb()
+    del artifacts
+    model_config.MODEL_PATH = model_path
+    model_config.SHAP_EXPLAINER_PATH = shap_path
+    feature_engineering.get_customer_features = lambda customer_id: customer
+    with contextlib.redirect_stdout(io.StringIO()):
+        feature_engineering.predict_credit_score(0)
+    peak = rss_to_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+    return {'baseline_mb': baseline, 'loaded_mb': loaded, 'peak_mb': peak}
+
+
+def measure_latency(customers, runs, warmup=5):
+    """Single-row latency of predict_credit_score, in milliseconds."""
+    feature_engineering.get_customer_features = lambda customer_id: customers[customer_id % len(customers)]
+    timings = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(warmup):
+            feature_engineering.predict_credit_score(i)
+        for i in range(runs):
+            start = time.perf_counter()
+            feature_engineering.predict_credit_score(i)
+            timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'p50_ms': round(float(np.percentile(timings, 50)), 3),
+        'p99_ms': round(float(np.percentile(timings, 99)), 3),
+        'mean_ms': round(float(np.mean(timings)), 3)
+    }
+
+
+def measure_batch_throughput(model, X, batch_size, repeats=3):
+    """Rows per second for model.predict on pre-processed batches."""
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for offset in range(0, len(X), batch_size):
+            model.predict(X.iloc[offset:offset + batch_size])
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return round(len(X) / best, 1)
+
+
+def measure_load_time(path, repeats=3):
+    """Best-of-N wall time for joblib.load, in milliseconds."""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        joblib.load(path)
+        timings.append((time.perf_counter() - start) * 1000)
+    return round(min(timings), 3)
+
+
+def run_variant(family, n_trees, depth, data, workdir, args, mp_context):
+    """Train, persist and measure a single variant."""
+    X_train, X_test, y_train, y_test, preprocessing, customers = data
+    name = f'{family}-{n_trees}x{depth}'
+    variant_dir = os.path.join(workdir, name)
+    os.makedirs(variant_dir, exist_ok=True)
+
+    model = build_estimator(family, n_trees, depth)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    train_seconds = time.perf_counter() - start
+
+    y_pred = model.predict(X_test)
+    rmse = float(np.sqrt(np.mean((y_test - y_pred) ** 2)))
+
+    model_path = os.path.join(variant_dir, 'credit_model.pkl')
+    shap_path = os.path.join(variant_dir, 'shap_explainer.pkl')
+    joblib.dump(dict(preprocessing, model=model, rmse=rmse), model_path)
+
+    explainer_bytes = None
+    if shap is not None and not args.no_shap:
+        try:
+            joblib.dump(shap.TreeExplainer(model), shap_path)
+            explainer_bytes = os.path.getsize(shap_path)
+        except Exception as e:
+            print(f"  SHAP explainer unavailable for {name}: {e}")
+
+    model_config.MODEL_PATH = model_path
+    model_config.SHAP_EXPLAINER_PATH = shap_path
+
+    with mp_context.Pool(1) as pool:
+        rss = pool.apply(measure_worker_rss, (model_path, shap_path, customers[0]))
+
+    return {
+        'name': name,
+        'family': family,
+        'n_trees': n_trees,
+        'max_depth': depth,
+        'rmse': round(rmse, 4),
+        'train_seconds': round(train_seconds, 3),
+        'artifact_bytes': os.path.getsize(model_path),
+        'explainer_bytes': explainer_bytes,
+        'load_ms': measure_load_time(model_path),
+        'worker_rss_mb': rss['peak_mb'],
+        'worker_rss_delta_mb': round(rss['loaded_mb'] - rss['baseline_mb'], 2),
+        'latency': measure_latency(customers, args.latency_runs),
+        'batch_rows_per_sec': measure_batch_throughput(model, X_test, args.batch_size)
+    }
+
+
+def recommend(results, tolerance):
+    """Smallest artifact whose RMSE is within `tolerance` of the best RMSE."""
+    if not results:
+        return None
+    best_rmse = min(r['rmse'] for r in results)
+    eligible = [r for r in results if r['rmse'] <= best_rmse * (1 + tolerance)]
+    choice = min(eligible, key=lambda r: (r['artifact_bytes'], r['latency']['p99_ms']))
+    return {
+        'name': choice['name'],
+        'best_rmse': best_rmse,
+        'rmse': choice['rmse'],
+        'artifact_bytes': choice['artifact_bytes'],
+        'rmse_tolerance': tolerance
+    }
+
+
+def run_sweep(args):
+    """Run every variant and return the report dict."""
+    print("Generating synthetic training data...")
+    df = generate_synthetic_data(args.samples)
+    df_processed, features, scaler, le_home, le_purpose, le_age = preprocess_data(df)
+
+    X = df_processed[features]
+    y = df_processed['target_score']
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    preprocessing = {
+        'features': features,
+        'scaler': scaler,
+        'le_home': le_home,
+        'le_purpose': le_purpose,
+        'le_age': le_age
+    }
+    data = (X_train, X_test, y_train, y_test, preprocessing, sample_customers(df))
+
+    original_paths = (model_config.MODEL_PATH, model_config.SHAP_EXPLAINER_PATH)
+    original_features = feature_engineering.get_customer_features
+    mp_context = multiprocessing.get_context('spawn')
+
+    results = []
+    try:
+        with tempfile.TemporaryDirectory(prefix='model_sweep_') as tmpdir:
+            workdir = args.keep_artifacts or tmpdir
+            for family in available_families(args.families):
+                for n_trees in args.trees:
+                    for depth in args.depths:
+                        result = run_variant(family, n_trees, depth, data, workdir, args, mp_context)
+                        results.append(result)
+                        print(f"{result['name']:<24} rmse={result['rmse']:<8} "
+                              f"size={result['artifact_bytes'] / 1024:>9.1f}KB "
+                              f"load={result['load_ms']:>8.1f}ms "
+                              f"p50={result['latency']['p50_ms']:>7.2f}ms "
+                              f"p99={result['latency']['p99_ms']:>7.2f}ms "
+                              f"batch={result['batch_rows_per_sec']:>10.0f} rows/s")
+    finally:
+        model_config.MODEL_PATH, model_config.SHAP_EXPLAINER_PATH = original_paths
+        feature_engineering.get_customer_features = original_features
+
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'settings': {
+            'samples': args.samples,
+            'latency_runs': args.latency_runs,
+            'batch_size': args.batch_size,
+            'shap': shap is not None and not args.no_shap
+        },
+        'variants': results,
+        'recommendation': recommend(results, args.rmse_tolerance)
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Credit model size/latency/accuracy sweep')
+    parser.add_argument('--families', nargs='+', default=['random_forest', 'hist_gbm', 'lightgbm'],
+                        choices=['random_forest', 'hist_gbm', 'lightgbm'])
+    parser.add_argument('--trees', nargs='+', type=int, default=DEFAULT_TREES)
+    parser.add_argument('--depths', nargs='+', type=int, default=DEFAULT_DEPTHS)
+    parser.add_argument('--samples', type=int, default=10000, help='synthetic training rows')
+    parser.add_argument('--latency-runs', type=int, default=200, help='single-row predictions per variant')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--rmse-tolerance', type=float, default=0.02,
+                        help='relative RMSE loss accepted when picking the smallest model')
+    parser.add_argument('--no-shap', action='store_true', help='skip SHAP explainers (fallback explanations)')
+    parser.add_argument('--keep-artifacts', metavar='DIR', help='write variant artifacts here instead of a temp dir')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = run_sweep(args)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"Report written to: {args.output}")
+    if report['recommendation']:
+        print(f"Smallest model within tolerance: {report['recommendation']['name']}")
@@ -0,0 +1,398 @@
+# 🏋️ Concurrent transfer load test: TPS, latency percentiles, deadlocks and balance conservation
+"""
+Seed --accounts fresh customers, each with one primary account holding
+--balance, then drive /api/transfer, /qr_pay and /mobile_transfer between
+them from --concurrency threads for --duration seconds per level. Receivers
+are drawn from a Zipf distribution (--zipf 0 is uniform; around 1 and above
+a few accounts take most of the payments, like popular merchants), senders
+uniformly unless --sender-zipf is set.
+
+Each level reports completed transfers per second, refusals (insufficient
+balance and the like), errors, p50/p95/p99/max latency, and the ledger's
+retries, deadlocks and lock-wait timeouts from /api/health. At the end the
+seeded accounts' balances (plus unswept hot-account credits) must add up to
+what was seeded, and their debit rows must match the transfers reported as
+completed.
+
+By default the requests go through the Flask test client in this process
+(no server needed; DB_BACKEND and friends select the database). With
+--target they go to a running server instead. That server must use the same
+database and SECRET_KEY, because this script seeds the accounts directly and
+signs the session cookies the form routes need. /api/health then answers
+from whichever worker served it, so the ledger counters cover one worker.
+
+Seeded customers are named 'Load Test <run>-<n>' and stay in the database;
+point it at a scratch database.
+
+Usage (from the repository root):
+    python benchmarks/transfer_load_test.py
+    python benchmarks/transfer_load_test.py --accounts 500 --concurrency 1 8 32 --duration 10 --zipf 1.2
+    python benchmarks/transfer_load_test.py --zipf 1.2 --hot 5
+    python benchmarks/transfer_load_test.py --target http://127.0.0.1:5000 --concurrency 16 64
+"""
+import argparse
+import json
+import os
+import platform
+import secrets
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime
+from decimal import Decimal
+
+import bcrypt
+import numpy as np
+
+# Add parent directory to path to import the app and config
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(REPO_ROOT)
+
+DEFAULT_OUTPUT = os.path.join(REPO_ROOT, 'benchmarks', 'results', 'transfer_load.json')
+DEFAULT_CONCURRENCY = [1, 4, 16]
+OPERATIONS = ('api_transfer', 'qr_pay', 'mobile_transfer')
+PASSWORD = 'loadtest'
+IFSC = 'LTST0000001'
+
+
+# ============================
+# Seeding and verification
+# ============================
+def seed_accounts(conn, run, count, balance):
+    """Create `count` customers with one primary account each; returns [(account_id, customer_id, account_number)]."""
+    password_hash = bcrypt.hashpw(PASSWORD.encode('utf-8'), bcrypt.gensalt(4)).decode('utf-8')
+    cursor = conn.cursor()
+    accounts = []
+    try:
+        for n in range(count):
+            cursor.execute('INSERT INTO customers (full_name, email, password_hash) VALUES (%s, %s, %s)',
+                           (f'Load Test {run}-{n}', f'loadtest-{run}-{n}@example.com', password_hash))
+            customer_id = cursor.lastrowid
+            account_number = f'LT{run}{n:06d}'
+            cursor.execute('''
+                INSERT INTO accounts (customer_id, account_number, bank_name, ifsc_code, account_type, balance,
+                                      opened_date, status, is_primary)
+                VALUES (%s, %s, 'Load Test Bank', %s, 'Savings', %s, CURDATE(), 'Active', TRUE)
+            ''', (customer_id, account_number, IFSC, balance))
+            accounts.append((cursor.lastrowid, customer_id, account_number))
+        conn.commit()
+    finally:
+        cursor.close()
+    return accounts
+
+
+def ledger_totals(conn, accounts):
+    """(sum of balances plus unswept credits, number of debit rows, lowest balance) over the seeded accounts."""
+    account_ids = [account[0] for account in accounts]
+    placeholders = ', '.join(['%s'] * len(account_ids))
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f'''
+            SELECT SUM(a.balance + COALESCE((SELECT SUM(p.amount) FROM pending_credits p
+                                             WHERE p.account_id = a.account_id), 0)),
+                   MIN(a.balance)
+            FROM accounts a WHERE a.account_id IN ({placeholders})
+        ''', account_ids)
+        total, lowest = cursor.fetchall()[0]
+        cursor.execute(f"SELECT COUNT(*) FROM transactions WHERE account_id IN ({placeholders}) "
+                       f"AND transaction_type = 'Debit'", account_ids)
+        debits = cursor.fetchall()[0][0]
+    finally:
+        cursor.close()
+    conn.commit()
+    return Decimal(str(total)).quantize(Decimal('0.01')), debits, lowest  # SQLite sums REALs
+
+
+# ============================
+# Request targets
+# ============================
+class TestClientTarget:
+    """Requests through the Flask test client, in this process."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def post(self, path, cookie=None, json_body=None, form=None):
+        """(status, Set-Cookie headers) of a POST."""
+        client = self.app.test_client(use_cookies=False)
+        headers = {'Cookie': f'session={cookie}'} if cookie else {}
+        response = client.post(path, json=json_body, data=form, headers=headers)
+        return response.status_code, response.headers.getlist('Set-Cookie')
+
+    def get_json(self, path):
+        return self.app.test_client().get(path).get_json()
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class ServerTarget:
+    """Requests to a running server over HTTP."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(_NoRedirect)
+
+    def post(self, path, cookie=None, json_body=None, form=None):
+        if json_body is not None:
+            data, content_type = json.dumps(json_body).encode(), 'application/json'
+        else:
+            data, content_type = urllib.parse.urlencode(form).encode(), 'application/x-www-form-urlencoded'
+        request = urllib.request.Request(self.base_url + path, data=data, method='POST',
+                                         headers={'Content-Type': content_type})
+        if cookie:
+            request.add_header('Cookie', f'session={cookie}')
+        try:
+            with self.opener.open(request, timeout=30) as response:
+                response.read()
+                return response.status, response.headers.get_all('Set-Cookie') or []
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers.get_all('Set-Cookie') or []
+
+    def get_json(self, path):
+        with self.opener.open(self.base_url + path, timeout=30) as response:
+            return json.loads(response.read())
+
+
+# ============================
+# Load generation
+# ============================
+def zipf_cdf(count, exponent):
+    """Cumulative distribution over ranks 0..count-1 with weight 1 / (rank + 1) ** exponent."""
+    weights = 1.0 / np.arange(1, count + 1) ** exponent
+    return np.cumsum(weights) / weights.sum()
+
+
+class Workload:
+    """Everything a worker thread needs to build and judge requests."""
+
+    def __init__(self, target, serializer, accounts, operations, receiver_cdf, sender_cdf, max_amount):
+        self.target = target
+        self.serializer = serializer
+        self.accounts = accounts
+        self.operations = operations
+        self.receiver_cdf = receiver_cdf
+        self.sender_cdf = sender_cdf
+        self.max_amount = max_amount
+        self.cookies = {}
+
+    def cookie(self, customer_id):
+        if customer_id not in self.cookies:
+            self.cookies[customer_id] = self.serializer.dumps({'customer_id': customer_id})
+        return self.cookies[customer_id]
+
+    def flash_outcome(self, set_cookies):
+        """'ok', 'refused' or 'error' from the flash a form route left in its session cookie."""
+        for header in set_cookies:
+            name, _, rest = header.partition('=')
+            if name.strip() != 'session':
+                continue
+            try:
+                flashes = self.serializer.loads(rest.split(';', 1)[0]).get('_flashes') or []
+            except Exception:
+                return 'error'
+            if flashes:
+                category, message = flashes[-1]
+                if category == 'success':
+                    return 'ok'
+                return 'error' if 'failed' in message.lower() else 'refused'
+        return 'error'
+
+    def pick(self, rng):
+        """(operation, sender, receiver, amount) for one request."""
+        operation = self.operations[rng.integers(len(self.operations))]
+        sender = int(np.searchsorted(self.sender_cdf, rng.random())) if self.sender_cdf is not None \
+            else int(rng.integers(len(self.accounts)))
+        receiver = int(np.searchsorted(self.receiver_cdf, rng.random()))
+        if receiver == sender:
+            receiver = (receiver + 1) % len(self.accounts)
+        amount = round(float(rng.uniform(1, self.max_amount)), 2)
+        return operation, self.accounts[sender], self.accounts[receiver], amount
+
+    def run(self, operation, sender, receiver, amount):
+        """Send one transfer; returns its outcome."""
+        sender_account_id, sender_customer_id, _ = sender
+        _, receiver_customer_id, receiver_account_number = receiver
+        if operation == 'api_transfer':
+            status, _ = self.target.post('/api/transfer', json_body={
+                'sender_account_id': sender_account_id, 'receiver_account_number': receiver_account_number,
+                'receiver_ifsc': IFSC, 'amount': amount, 'transfer_type': 'IMPS'})
+            return 'ok' if status == 200 else 'error' if status >= 500 else 'refused'
+        if operation == 'qr_pay':
+            form = {'qr_data': f'{receiver_account_number}|{IFSC}|Load Test Merchant|{amount}'}
+        else:
+            form = {'selectedReceiverId': receiver_customer_id, 'amount': amount,
+                    'sender_account': sender_account_id, 'password': PASSWORD}
+        status, set_cookies = self.target.post(f'/{operation}', cookie=self.cookie(sender_customer_id), form=form)
+        return self.flash_outcome(set_cookies) if status < 500 else 'error'
+
+
+def _worker(workload, deadline, seed, results, lock):
+    rng = np.random.default_rng(seed)
+    local = []
+    while time.perf_counter() < deadline:
+        operation, sender, receiver, amount = workload.pick(rng)
+        start = time.perf_counter()
+        try:
+            outcome = workload.run(operation, sender, receiver, amount)
+        except Exception:
+            outcome = 'error'
+        local.append((operation, outcome, (time.perf_counter() - start) * 1000))
+    with lock:
+        results.extend(local)
+
+
+def ledger_counters(target):
+    return target.get_json('/api/health').get('ledger', {})
+
+
+def run_level(workload, concurrency, duration, seed):
+    before = ledger_counters(workload.target)
+    results, lock = [], threading.Lock()
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=_worker, args=(workload, deadline, seed + i, results, lock))
+               for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    after = ledger_counters(workload.target)
+
+    completed = [latency for _, outcome, latency in results if outcome == 'ok']
+    latencies = [latency for _, _, latency in results]
+    level = {
+        'concurrency': concurrency,
+        'requests': len(results),
+        'completed': len(completed),
+        'refused': sum(outcome == 'refused' for _, outcome, _ in results),
+        'errors': sum(outcome == 'error' for _, outcome, _ in results),
+        'tps': round(len(completed) / elapsed, 1),
+        'by_operation': {operation: sum(op == operation and outcome == 'ok' for op, outcome, _ in results)
+                         for operation in workload.operations},
+        'ledger': {key: after.get(key, 0) - before.get(key, 0)
+                   for key in ('committed', 'refused', 'failed', 'retries', 'deadlocks', 'lock_timeouts')},
+    }
+    if latencies:
+        level.update({
+            'p50_ms': round(float(np.percentile(latencies, 50)), 2),
+            'p95_ms': round(float(np.percentile(latencies, 95)), 2),
+            'p99_ms': round(float(np.percentile(latencies, 99)), 2),
+            'max_ms': round(float(max(latencies)), 2),
+        })
+    return level
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Concurrent transfer load test')
+    parser.add_argument('--accounts', type=int, default=200, help='customers/accounts to seed')
+    parser.add_argument('--balance', type=float, default=1_000_000, help='starting balance of each account')
+    parser.add_argument('--concurrency', nargs='+', type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--duration', type=float, default=10, help='seconds per concurrency level')
+    parser.add_argument('--operations', nargs='+', choices=OPERATIONS, default=list(OPERATIONS))
+    parser.add_argument('--zipf', type=float, default=1.0, help='receiver skew exponent (0 = uniform)')
+    parser.add_argument('--sender-zipf', type=float, default=None, help='sender skew exponent (default uniform)')
+    parser.add_argument('--hot', type=int, default=0,
+                        help='flag the N most popular receivers as hot accounts (database/hot_accounts.py)')
+    parser.add_argument('--max-amount', type=float, default=50, help='largest transfer amount')
+    parser.add_argument('--target', default=None, help='base URL of a running server (default: Flask test client)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    args = parser.parse_args(argv)
+    if args.accounts < 2:
+        parser.error('--accounts must be at least 2')
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    from app import app
+    from config.db_config import get_db_connection
+    from database import hot_accounts
+
+    target = ServerTarget(args.target) if args.target else TestClientTarget(app)
+    serializer = app.session_interface.get_signing_serializer(app)
+    conn = get_db_connection()
+
+    run = secrets.token_hex(3).upper()
+    print(f"Seeding {args.accounts} accounts (run {run})...")
+    accounts = seed_accounts(conn, run, args.accounts, args.balance)
+    seeded_total, seeded_debits, _ = ledger_totals(conn, accounts)
+
+    hot = [account[0] for account in accounts[:args.hot]]
+    for account_id in hot:
+        hot_accounts.flag(conn, account_id)
+    if hot:
+        hot_accounts.refresh(conn)
+        if args.target:
+            time.sleep(2 * hot_accounts.HOT_SWEEP_INTERVAL)  # the server's sweepers reload the hot set
+
+    workload = Workload(target, serializer, accounts, args.operations, zipf_cdf(len(accounts), args.zipf),
+                        zipf_cdf(len(accounts), args.sender_zipf) if args.sender_zipf is not None else None,
+                        args.max_amount)
+    levels = []
+    try:
+        for index, concurrency in enumerate(args.concurrency):
+            level = run_level(workload, concurrency, args.duration, args.seed + 1000 * index)
+            levels.append(level)
+            print(f"  c={concurrency:<4} tps={level['tps']:<8} p50={level.get('p50_ms', '-')}ms "
+                  f"p99={level.get('p99_ms', '-')}ms refused={level['refused']} errors={level['errors']} "
+                  f"retries={level['ledger']['retries']} deadlocks={level['ledger']['deadlocks']} "
+                  f"lock_timeouts={level['ledger']['lock_timeouts']}")
+    finally:
+        for account_id in hot:
+            hot_accounts.unflag(conn, account_id)
+
+    final_total, final_debits, lowest = ledger_totals(conn, accounts)
+    conn.close()
+    completed = sum(level['completed'] for level in levels)
+    verification = {
+        'seeded_total': float(seeded_total),
+        'final_total': float(final_total),
+        'balances_conserved': final_total == seeded_total,
+        'debit_rows': final_debits - seeded_debits,
+        'completed_transfers': completed,
+        'rows_match': final_debits - seeded_debits == completed,
+        'lowest_balance': float(lowest),
+    }
+
+    report = {
+        'generated_at': datetime.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'db_backend': os.environ.get('DB_BACKEND', 'mysql'),
+            'target': args.target or 'flask test client',
+        },
+        'settings': {
+            'run': run,
+            'accounts': args.accounts,
+            'concurrency': args.concurrency,
+            'duration_s': args.duration,
+            'operations': args.operations,
+            'zipf': args.zipf,
+            'sender_zipf': args.sender_zipf,
+            'hot_accounts': len(hot),
+        },
+        'levels': levels,
+        'verification': verification,
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"Report written to: {args.output}")
+    print(f"Balances conserved: {verification['balances_conserved']} "
+          f"({verification['seeded_total']:.2f} -> {verification['final_total']:.2f}); "
+          f"debit rows {verification['debit_rows']} for {completed} completed transfers")
+    if not (verification['balances_conserved'] and verification['rows_match']):
+        sys.exit(1)
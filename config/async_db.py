@@ -0,0 +1,296 @@
+# ⚡ Asyncio database access for the ASGI API (asgi.py)
+"""
+Pooled, awaitable connections with the same targets and settings as
+config/db_config.py: aiomysql pools on MySQL, and on SQLite the existing
+SQLiteConnectionPool driven from worker threads (sqlite3 has no async API).
+
+    async with async_connection() as conn:
+        rows = await conn.fetchall(sql, params)
+
+    async with async_connection() as conn:
+        await conn.begin()
+        await conn.execute(sql, params)
+        await conn.commit()
+
+Uncommitted work is rolled back when the block exits.
+"""
+import asyncio
+import itertools
+import time
+from contextlib import asynccontextmanager
+
+try:
+    import aiomysql
+except ImportError:
+    aiomysql = None
+
+from config.db_config import (DB_TARGETS, DB_POOL_CONFIG, DB_POOL_TIMEOUT, DB_REPLICA_MAX_LAG,
+                              DB_REPLICA_CHECK_INTERVAL, DB_READ_YOUR_WRITES_SECONDS, DB_BACKEND,
+                              is_sqlite, get_pool)
+
+_pools = {}
+_pool_lock = asyncio.Lock()
+_pool_stats = {
+    'checkouts': 0,
+    'timeouts': 0,
+    'total_wait_ms': 0.0,
+    'max_wait_ms': 0.0,
+    'reads_on_replica': 0,
+    'reads_on_primary': 0,
+}
+
+_replica_state = {name: {'lag': None, 'checked_at': None} for name in DB_TARGETS if name != 'primary'}
+_replica_cycle = itertools.cycle(list(_replica_state))
+
+
+class _AsyncConnection:
+    """Fetch/execute helpers shared by both backends' connections."""
+
+    async def fetchone(self, sql, params=(), dictionary=False):
+        rows = await self.fetchall(sql, params, dictionary)
+        return rows[0] if rows else None
+
+
+class _MySQLConnection(_AsyncConnection):
+    """aiomysql connection."""
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    async def _run(self, sql, params, fetch, dictionary=False):
+        cursor_class = aiomysql.DictCursor if dictionary else aiomysql.Cursor
+        async with self._raw.cursor(cursor_class) as cursor:
+            await cursor.execute(sql, params)
+            if fetch:
+                return await cursor.fetchall()
+            return cursor.rowcount, cursor.lastrowid
+
+    async def fetchall(self, sql, params=(), dictionary=False):
+        return await self._run(sql, params, True, dictionary)
+
+    async def execute(self, sql, params=()):
+        """Run a write; returns (rowcount, lastrowid)."""
+        return await self._run(sql, params, False)
+
+    async def executemany(self, sql, seq_params):
+        """Run a write once per parameter tuple; returns (total rowcount, lastrowid)."""
+        async with self._raw.cursor() as cursor:
+            await cursor.executemany(sql, seq_params)
+            return cursor.rowcount, cursor.lastrowid
+
+    async def begin(self):
+        await self._raw.begin()
+
+    async def commit(self):
+        await self._raw.commit()
+
+    async def rollback(self):
+        await self._raw.rollback()
+
+    def in_transaction(self):
+        return self._raw.get_transaction_status()
+
+
+class _ThreadedConnection(_AsyncConnection):
+    """A blocking SQLiteConnection whose calls run in the default thread executor."""
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def _run_sync(self, sql, params, fetch, dictionary):
+        cursor = self._raw.cursor(dictionary=dictionary)
+        try:
+            cursor.execute(sql, params)
+            if fetch:
+                return cursor.fetchall()
+            return cursor.rowcount, cursor.lastrowid
+        finally:
+            cursor.close()
+
+    async def fetchall(self, sql, params=(), dictionary=False):
+        return await asyncio.to_thread(self._run_sync, sql, params, True, dictionary)
+
+    async def execute(self, sql, params=()):
+        """Run a write; returns (rowcount, lastrowid)."""
+        return await asyncio.to_thread(self._run_sync, sql, params, False, False)
+
+    def _run_many_sync(self, sql, seq_params):
+        cursor = self._raw.cursor()
+        try:
+            cursor.executemany(sql, seq_params)
+            return cursor.rowcount, cursor.lastrowid
+        finally:
+            cursor.close()
+
+    async def executemany(self, sql, seq_params):
+        """Run a write once per parameter tuple; returns (total rowcount, lastrowid)."""
+        return await asyncio.to_thread(self._run_many_sync, sql, seq_params)
+
+    async def begin(self):
+        await asyncio.to_thread(self._raw.start_transaction)
+
+    async def commit(self):
+        await asyncio.to_thread(self._raw.commit)
+
+    async def rollback(self):
+        await asyncio.to_thread(self._raw.rollback)
+
+    def in_transaction(self):
+        return self._raw.in_transaction
+
+
+class _ThreadedPool:
+    """SQLiteConnectionPool behind a semaphore, so waiting for a connection does not block the loop."""
+
+    def __init__(self, target):
+        self._pool = get_pool(target)
+        self._slots = asyncio.Semaphore(DB_POOL_CONFIG['pool_size'])
+        self.maxsize = DB_POOL_CONFIG['pool_size']
+
+    @property
+    def freesize(self):
+        return self._slots._value
+
+    async def acquire(self):
+        await self._slots.acquire()
+        try:
+            return self._pool.get_connection()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, raw):
+        raw.close()  # back to the SQLite pool
+        self._slots.release()
+
+    def close(self):
+        pass
+
+
+async def _get_async_pool(target='primary'):
+    pool = _pools.get(target)
+    if pool is None:
+        async with _pool_lock:
+            pool = _pools.get(target)
+            if pool is None:
+                if is_sqlite():
+                    pool = _ThreadedPool(target)
+                else:
+                    if aiomysql is None:
+                        raise RuntimeError('aiomysql is required for the async API on MySQL (pip install aiomysql)')
+                    settings = DB_TARGETS[target]
+                    pool = await aiomysql.create_pool(
+                        host=settings['host'], port=settings['port'], user=settings['user'],
+                        password=settings['password'], db=settings['database'],
+                        minsize=1, maxsize=DB_POOL_CONFIG['pool_size'], autocommit=False, pool_recycle=3600)
+                _pools[target] = pool
+    return pool
+
+
+async def init_async_pools():
+    """Open every target's pool up front (called from the ASGI app's startup hook)."""
+    for target in DB_TARGETS:
+        await _get_async_pool(target)
+
+
+async def close_async_pools():
+    """Close the pools (called from the ASGI app's shutdown hook)."""
+    for pool in list(_pools.values()):
+        pool.close()
+        if not is_sqlite():
+            await pool.wait_closed()
+    _pools.clear()
+
+
+async def _checkout(target):
+    pool = await _get_async_pool(target)
+    start = time.perf_counter()
+    try:
+        raw = await asyncio.wait_for(pool.acquire(), DB_POOL_TIMEOUT)
+    except asyncio.TimeoutError:
+        _pool_stats['timeouts'] += 1
+        raise
+    wait_ms = (time.perf_counter() - start) * 1000
+    _pool_stats['checkouts'] += 1
+    _pool_stats['total_wait_ms'] += wait_ms
+    _pool_stats['max_wait_ms'] = max(_pool_stats['max_wait_ms'], wait_ms)
+    conn = _ThreadedConnection(raw) if is_sqlite() else _MySQLConnection(raw)
+    return pool, raw, conn
+
+
+async def _replica_lag_seconds(conn):
+    if is_sqlite():
+        return 0.0
+    try:
+        rows = await conn.fetchall('SHOW REPLICA STATUS', dictionary=True)
+    except aiomysql.ProgrammingError:
+        rows = await conn.fetchall('SHOW SLAVE STATUS', dictionary=True)
+    if not rows:
+        return 0.0
+    lag = rows[0].get('Seconds_Behind_Source', rows[0].get('Seconds_Behind_Master'))
+    return float(lag) if lag is not None else None
+
+
+async def _checkout_replica():
+    """(pool, raw, conn) for a caught-up replica, or None to use the primary."""
+    for _ in range(len(_replica_state)):
+        name = next(_replica_cycle)
+        state = _replica_state[name]
+        now = time.monotonic()
+        stale = state['checked_at'] is None or now - state['checked_at'] >= DB_REPLICA_CHECK_INTERVAL
+        if not stale and (state['lag'] is None or state['lag'] > DB_REPLICA_MAX_LAG):
+            continue
+        try:
+            pool, raw, conn = await _checkout(name)
+        except Exception:
+            state['lag'], state['checked_at'] = None, now
+            continue
+        if stale:
+            try:
+                state['lag'] = await _replica_lag_seconds(conn)
+            except Exception:
+                state['lag'] = None
+            state['checked_at'] = now
+        if state['lag'] is not None and state['lag'] <= DB_REPLICA_MAX_LAG:
+            return pool, raw, conn
+        pool.release(raw)
+    return None
+
+
+@asynccontextmanager
+async def async_connection(readonly=False, session=None):
+    """Pooled connection for the duration of the block.
+
+    ``readonly=True`` uses a caught-up replica unless `session` (the
+    request's session) is inside its read-your-writes window.
+    """
+    checkout = None
+    if readonly and _replica_state and not (session and session.get('db_primary_until', 0) > time.time()):
+        checkout = await _checkout_replica()
+    if readonly:
+        _pool_stats['reads_on_replica' if checkout else 'reads_on_primary'] += 1
+    pool, raw, conn = checkout or await _checkout('primary')
+    try:
+        yield conn
+    finally:
+        try:
+            if conn.in_transaction():
+                await conn.rollback()
+        finally:
+            pool.release(raw)
+
+
+def mark_recent_write_async(session):
+    """Async counterpart of db_config.mark_recent_write for the ASGI app's session."""
+    if _replica_state:
+        session['db_primary_until'] = time.time() + DB_READ_YOUR_WRITES_SECONDS
+
+
+def get_async_pool_stats():
+    """Snapshot of async pool usage, shaped like db_config.get_pool_stats()."""
+    stats = dict(_pool_stats)
+    stats['backend'] = DB_BACKEND
+    stats['pool_size'] = DB_POOL_CONFIG['pool_size']
+    stats['avg_wait_ms'] = round(stats['total_wait_ms'] / stats['checkouts'], 3) if stats['checkouts'] else 0.0
+    stats['pools'] = {name: {'size': pool.maxsize, 'free': pool.freesize} for name, pool in _pools.items()}
+    return stats
@@ -1,11 +1,33 @@
-# ⚙️ Database connection setup (MySQL)
+# ⚙️ Database connection setup (MySQL, or SQLite with DB_BACKEND=sqlite)
 import mysql.connector
+from mysql.connector import pooling, errors
 import os
+import re
+import json
+import sqlite3
+import itertools
+import threading
+import time
+import weakref
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
 from dotenv import load_dotenv
+from flask import current_app, g, has_request_context, request, session
+from config import sqlite_db
 
 # Load environment variables
 load_dotenv()
 
+# 'mysql' (default) or 'sqlite' for the embedded, WAL-mode backend
+DB_BACKEND = os.environ.get('DB_BACKEND', 'mysql').lower()
+DB_SQLITE_PATH = os.environ.get('DB_SQLITE_PATH', 'database/credit_scoring.sqlite3')
+# SQLite stand-in replicas: comma-separated database file paths
+DB_SQLITE_REPLICA_PATHS = [p.strip() for p in os.environ.get('DB_SQLITE_REPLICA_PATHS', '').split(',') if p.strip()]
+
+# Errors raised by either backend's driver
+DB_ERRORS = (errors.Error, sqlite3.Error)
+
 # Database configuration
 DB_CONFIG = {
     'host': os.environ.get('DB_HOST', 'localhost'),
@@ -15,9 +37,541 @@ DB_CONFIG = {
     'password': os.environ.get('DB_PASSWORD', ''),
 }
 
-def get_db_connection():
-    """Get MySQL database connection."""
-    return mysql.connector.connect(**DB_CONFIG)
+# Connection pool configuration (mysql.connector caps pool_size at 32)
+DB_POOL_CONFIG = {
+    'pool_name': os.environ.get('DB_POOL_NAME', 'credit_scoring_pool'),
+    'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+    # Session reset would drop the server-side prepared statements cached per connection;
+    # open transactions are rolled back on checkout and release instead.
+    'pool_reset_session': os.environ.get('DB_POOL_RESET_SESSION', 'false').lower() == 'true',
+}
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 5))  # seconds to wait for a free connection
+DB_POOL_PING = os.environ.get('DB_POOL_PING', 'true').lower() == 'true'  # health check on checkout
+DB_RECONNECT_ATTEMPTS = int(os.environ.get('DB_RECONNECT_ATTEMPTS', 3))
+DB_RECONNECT_DELAY = float(os.environ.get('DB_RECONNECT_DELAY', 0.2))
+
+# Read replicas: comma-separated host[:port] list sharing DB_CONFIG's database and credentials
+DB_REPLICA_HOSTS = [h.strip() for h in os.environ.get('DB_REPLICA_HOSTS', '').split(',') if h.strip()]
+DB_REPLICA_MAX_LAG = float(os.environ.get('DB_REPLICA_MAX_LAG', 2))  # seconds behind the primary
+DB_REPLICA_CHECK_INTERVAL = float(os.environ.get('DB_REPLICA_CHECK_INTERVAL', 5))  # seconds between lag checks
+DB_READ_YOUR_WRITES_SECONDS = float(os.environ.get('DB_READ_YOUR_WRITES_SECONDS', 5))
+
+# transactions partitioning and cold archival (database/partitions.py)
+DB_PARTITION_MONTHS_AHEAD = int(os.environ.get('DB_PARTITION_MONTHS_AHEAD', 3))
+DB_ARCHIVE_AFTER_MONTHS = int(os.environ.get('DB_ARCHIVE_AFTER_MONTHS', 24))
+DB_ARCHIVE_DIR = os.environ.get('DB_ARCHIVE_DIR', 'archive/transactions')
+
+# Per-request SQL instrumentation
+DB_INSTRUMENTATION = os.environ.get('DB_INSTRUMENTATION', 'true').lower() == 'true'
+DB_SLOW_QUERY_MS = float(os.environ.get('DB_SLOW_QUERY_MS', 200))
+DB_SLOW_QUERY_LOG = os.environ.get('DB_SLOW_QUERY_LOG', 'logs/slow_queries.log')  # empty to disable
+DB_N_PLUS_ONE_THRESHOLD = int(os.environ.get('DB_N_PLUS_ONE_THRESHOLD', 5))  # same shape this often in one request
+DB_DEBUG_HEADERS = os.environ.get('DB_DEBUG_HEADERS', 'false').lower() == 'true'  # also sent whenever app.debug is on
+
+# Rows pulled per round trip when streaming large results (exports)
+DB_STREAM_BATCH_ROWS = int(os.environ.get('DB_STREAM_BATCH_ROWS', 2000))
+
+_pools = {}
+_pool_lock = threading.Lock()
+_pool_stats = {
+    'checkouts': 0,
+    'waits': 0,
+    'timeouts': 0,
+    'reconnects': 0,
+    'total_wait_ms': 0.0,
+    'max_wait_ms': 0.0,
+    'reads_on_replica': 0,
+    'reads_on_primary': 0,
+    'replica_fallbacks': 0,
+}
+
+# Prepared cursors, cached per physical connection and keyed by SQL text
+_prepared_cursors = weakref.WeakKeyDictionary()
+
+_sql_metrics = {
+    'requests': 0,
+    'queries': 0,
+    'db_time_ms': 0.0,
+    'slow_queries': 0,
+    'n_plus_one_requests': 0,
+    'max_queries_per_request': 0,
+}
+_slow_log_lock = threading.Lock()
+
+
+def _replica_config(host_spec):
+    host, _, port = host_spec.partition(':')
+    return dict(DB_CONFIG, host=host, port=int(port or DB_CONFIG['port']))
+
+
+def is_sqlite():
+    """True when the app runs on the embedded SQLite backend."""
+    return DB_BACKEND == 'sqlite'
+
+
+# Pool name -> connection settings: the primary plus one pool per read replica
+if is_sqlite():
+    DB_TARGETS = {'primary': {'database': DB_SQLITE_PATH}}
+    for _index, _path in enumerate(DB_SQLITE_REPLICA_PATHS):
+        DB_TARGETS[f'replica{_index}'] = {'database': _path}
+else:
+    DB_TARGETS = {'primary': DB_CONFIG}
+    for _index, _host in enumerate(DB_REPLICA_HOSTS):
+        DB_TARGETS[f'replica{_index}'] = _replica_config(_host)
+
+# Replica health, refreshed at most every DB_REPLICA_CHECK_INTERVAL seconds; entries are
+# replaced whole under _pool_lock, so a reader always sees a matching lag and checked_at
+_replica_state = {name: {'lag': None, 'checked_at': None} for name in DB_TARGETS if name != 'primary'}
+_replica_cycle = itertools.cycle(list(_replica_state))
+
+
+def get_pool(target='primary'):
+    """Get (lazily creating) the process-wide connection pool for `target`."""
+    pool = _pools.get(target)
+    if pool is None:
+        with _pool_lock:
+            pool = _pools.get(target)
+            if pool is None:
+                pool_config = dict(DB_POOL_CONFIG, pool_name=f"{DB_POOL_CONFIG['pool_name']}_{target}")
+                pool_class = sqlite_db.SQLiteConnectionPool if is_sqlite() else pooling.MySQLConnectionPool
+                pool = _pools[target] = pool_class(**pool_config, **DB_TARGETS[target])
+    return pool
+
+
+def _count(stat):
+    with _pool_lock:
+        _pool_stats[stat] += 1
+
+
+def _record_checkout(wait_ms, waited, reconnected):
+    with _pool_lock:
+        _pool_stats['checkouts'] += 1
+        _pool_stats['total_wait_ms'] += wait_ms
+        _pool_stats['max_wait_ms'] = max(_pool_stats['max_wait_ms'], wait_ms)
+        if waited:
+            _pool_stats['waits'] += 1
+        if reconnected:
+            _pool_stats['reconnects'] += 1
+
+
+def _checkout_connection(target='primary'):
+    """Take a connection from the pool, waiting up to DB_POOL_TIMEOUT for one to free up."""
+    pool = get_pool(target)
+    start = time.perf_counter()
+    waited = False
+
+    while True:
+        try:
+            conn = pool.get_connection()
+            break
+        except errors.PoolError:
+            if time.perf_counter() - start >= DB_POOL_TIMEOUT:
+                _count('timeouts')
+                raise
+            waited = True
+            time.sleep(0.005)
+
+    wait_ms = (time.perf_counter() - start) * 1000
+
+    # Health check: transparently reconnect connections the server has dropped
+    reconnected = False
+    if DB_POOL_PING and not conn.is_connected():
+        conn.reconnect(attempts=DB_RECONNECT_ATTEMPTS, delay=DB_RECONNECT_DELAY)
+        _prepared_cursors.pop(_physical_connection(conn), None)
+        reconnected = True
+    elif conn.in_transaction:
+        conn.rollback()
+
+    _record_checkout(wait_ms, waited, reconnected)
+    return conn
+
+
+def replica_lag_seconds(conn):
+    """Seconds the server behind `conn` lags its source; None if replication is broken.
+
+    A server without replication status (e.g. a standalone instance used as a
+    stand-in replica) reports no lag, and neither does a SQLite file.
+    """
+    if is_sqlite():
+        return 0.0
+    cursor = conn.cursor(dictionary=True)
+    try:
+        try:
+            cursor.execute('SHOW REPLICA STATUS')
+        except errors.ProgrammingError:
+            cursor.execute('SHOW SLAVE STATUS')  # MariaDB and MySQL before 8.0.22
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    if not rows:
+        return 0.0
+    lag = rows[0].get('Seconds_Behind_Source', rows[0].get('Seconds_Behind_Master'))
+    return float(lag) if lag is not None else None
+
+
+def _set_replica_state(name, lag, checked_at):
+    with _pool_lock:
+        _replica_state[name] = {'lag': lag, 'checked_at': checked_at}
+
+
+def _replica_is_fresh(name, conn):
+    with _pool_lock:
+        state = _replica_state[name]
+    now = time.monotonic()
+    if state['checked_at'] is None or now - state['checked_at'] >= DB_REPLICA_CHECK_INTERVAL:
+        try:
+            lag = replica_lag_seconds(conn)
+        except DB_ERRORS:
+            lag = None
+        _set_replica_state(name, lag, now)
+    else:
+        lag = state['lag']
+    return lag is not None and lag <= DB_REPLICA_MAX_LAG
+
+
+def _checkout_replica():
+    """Connection to a healthy, caught-up replica, or None to fall back to the primary."""
+    for _ in range(len(_replica_state)):
+        with _pool_lock:
+            name = next(_replica_cycle)
+            state = _replica_state[name]
+        recently_checked = (state['checked_at'] is not None
+                            and time.monotonic() - state['checked_at'] < DB_REPLICA_CHECK_INTERVAL)
+        if recently_checked and (state['lag'] is None or state['lag'] > DB_REPLICA_MAX_LAG):
+            continue
+
+        try:
+            conn = _checkout_connection(name)
+        except DB_ERRORS:
+            _set_replica_state(name, None, time.monotonic())
+            continue
+
+        if _replica_is_fresh(name, conn):
+            return conn
+        conn.close()
+    return None
+
+
+def _read_your_writes_active():
+    """True while the current client is inside the window after its own write."""
+    return session.get('db_primary_until', 0) > time.time()
+
+
+def mark_recent_write():
+    """Pin this client's reads to the primary for DB_READ_YOUR_WRITES_SECONDS.
+
+    Called after committing a customer's own write (transfers, applications)
+    so the pages they land on next do not read from a lagging replica.
+    """
+    if _replica_state and has_request_context():
+        session['db_primary_until'] = time.time() + DB_READ_YOUR_WRITES_SECONDS
+
+
+# ============================
+# Per-request SQL instrumentation
+# ============================
+_SQL_LITERAL_RE = re.compile(r"'(?:[^'\\]|\\.)*'|\b\d+(?:\.\d+)?\b")
+
+
+@lru_cache(maxsize=2048)
+def query_shape(sql):
+    """Statement with literals and placeholders collapsed, for grouping repeats."""
+    shape = _SQL_LITERAL_RE.sub('?', ' '.join(sql.split()))
+    return shape.replace('%s', '?')
+
+
+def _request_sql_stats():
+    """SQL stats of the current request, or None outside a request."""
+    if not (DB_INSTRUMENTATION and has_request_context()):
+        return None
+    stats = g.get('_sql_stats')
+    if stats is None:
+        stats = g._sql_stats = {'count': 0, 'time_ms': 0.0, 'statements': [], 'shapes': Counter()}
+    return stats
+
+
+def _write_slow_log(entry):
+    if not DB_SLOW_QUERY_LOG:
+        return
+    with _slow_log_lock:
+        os.makedirs(os.path.dirname(os.path.abspath(DB_SLOW_QUERY_LOG)), exist_ok=True)
+        with open(DB_SLOW_QUERY_LOG, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+
+
+class InstrumentedCursor:
+    """Cursor wrapper timing every statement (execute plus its fetches) into the request's stats."""
+
+    def __init__(self, cursor, stats):
+        self._cursor = cursor
+        self._stats = stats
+        self._current = None
+
+    def _record(self, sql, elapsed_ms):
+        stats = self._stats
+        shape = query_shape(sql)
+        stats['count'] += 1
+        stats['time_ms'] += elapsed_ms
+        stats['shapes'][shape] += 1
+        self._current = {'sql': shape, 'ms': elapsed_ms}
+        stats['statements'].append(self._current)
+
+    def _timed_fetch(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return getattr(self._cursor, method)(*args)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self._stats['time_ms'] += elapsed_ms
+            if self._current is not None:
+                self._current['ms'] += elapsed_ms
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._cursor.execute(operation, params, *args, **kwargs)
+        finally:
+            self._record(operation, (time.perf_counter() - start) * 1000)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._cursor.executemany(operation, seq_params, *args, **kwargs)
+        finally:
+            self._record(operation, (time.perf_counter() - start) * 1000)
+
+    def fetchone(self):
+        return self._timed_fetch('fetchone')
+
+    def fetchmany(self, *args):
+        return self._timed_fetch('fetchmany', *args)
+
+    def fetchall(self):
+        return self._timed_fetch('fetchall')
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def finish_sql_instrumentation(response):
+    """after_request hook: slow-query log, N+1 detection, metrics and debug headers."""
+    stats = g.pop('_sql_stats', None)
+    if stats is None:
+        return response
+
+    now = datetime.now().isoformat(timespec='milliseconds')
+    endpoint = f'{request.method} {request.path}'
+    slow = [st for st in stats['statements'] if st['ms'] >= DB_SLOW_QUERY_MS]
+    for statement in slow:
+        _write_slow_log({'ts': now, 'type': 'slow_query', 'endpoint': endpoint,
+                         'ms': round(statement['ms'], 2), 'sql': statement['sql']})
+
+    repeated = {shape: n for shape, n in stats['shapes'].items() if n >= DB_N_PLUS_ONE_THRESHOLD}
+    for shape, n in repeated.items():
+        _write_slow_log({'ts': now, 'type': 'n_plus_one', 'endpoint': endpoint, 'count': n, 'sql': shape})
+
+    with _pool_lock:
+        _sql_metrics['requests'] += 1
+        _sql_metrics['queries'] += stats['count']
+        _sql_metrics['db_time_ms'] += stats['time_ms']
+        _sql_metrics['slow_queries'] += len(slow)
+        _sql_metrics['n_plus_one_requests'] += bool(repeated)
+        _sql_metrics['max_queries_per_request'] = max(_sql_metrics['max_queries_per_request'], stats['count'])
+
+    if DB_DEBUG_HEADERS or current_app.debug:
+        response.headers['X-DB-Query-Count'] = str(stats['count'])
+        response.headers['X-DB-Time-Ms'] = f"{stats['time_ms']:.2f}"
+        response.headers['Server-Timing'] = f'db;dur={stats["time_ms"]:.2f};desc="{stats["count"]} queries"'
+        if repeated:
+            response.headers['X-DB-N-Plus-One'] = str(len(repeated))
+            response.headers['X-DB-Repeated-Queries'] = ' | '.join(
+                f'{n}x {shape[:120]}' for shape, n in sorted(repeated.items(), key=lambda item: -item[1]))
+    return response
+
+
+def get_sql_metrics():
+    """Process-wide totals of the per-request SQL instrumentation."""
+    with _pool_lock:
+        metrics = dict(_sql_metrics)
+    requests = metrics['requests']
+    metrics['avg_queries_per_request'] = metrics['queries'] / requests if requests else 0.0
+    metrics['avg_db_time_ms'] = metrics['db_time_ms'] / requests if requests else 0.0
+    return metrics
+
+
+class RequestConnection:
+    """Pooled connection bound to the current Flask request.
+
+    Route code keeps calling ``conn.close()`` as before; inside a request that
+    only ends any open transaction. The connection goes back to the pool when
+    the request is torn down (see ``release_request_connection``).
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, *args, **kwargs):
+        cursor = self._conn.cursor(*args, **kwargs)
+        stats = _request_sql_stats()
+        return cursor if stats is None else InstrumentedCursor(cursor, stats)
+
+    def close(self):
+        if self._conn.in_transaction:
+            self._conn.rollback()
+
+    def release(self):
+        try:
+            if self._conn.in_transaction:
+                self._conn.rollback()
+        finally:
+            self._conn.close()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def _get_read_connection():
+    """Replica connection for read-only work, or None when the primary must serve it."""
+    if not _replica_state:
+        return None
+    if not has_request_context():
+        return _checkout_replica()
+
+    if _read_your_writes_active():
+        return None
+
+    # Reuse whatever this request already holds
+    conn = g.get('_db_read_conn') or g.get('_db_conn')
+    if conn is None:
+        replica = _checkout_replica()
+        if replica is None:
+            _count('replica_fallbacks')
+        else:
+            conn = g._db_read_conn = RequestConnection(replica)
+    return conn
+
+
+def get_db_connection(readonly=False):
+    """Get database connection (MySQL, or SQLite when DB_BACKEND=sqlite).
+
+    Inside a Flask request every call returns the same pooled connection;
+    outside a request (scripts, background work) a connection is checked out
+    of the pool and returned to it by ``close()``.
+
+    ``readonly=True`` routes the work to a read replica (DB_REPLICA_HOSTS)
+    unless the client wrote recently, every replica lags more than
+    DB_REPLICA_MAX_LAG, or none is reachable; then the primary serves it.
+    """
+    in_request = has_request_context()
+    if readonly:
+        conn = _get_read_connection()
+        if conn is not None and not (in_request and conn is g.get('_db_conn')):
+            _count('reads_on_replica')
+            return conn
+        _count('reads_on_primary')
+
+    if in_request:
+        conn = g.get('_db_conn')
+        if conn is None:
+            conn = g._db_conn = RequestConnection(_checkout_connection())
+        return conn
+    return _checkout_connection()
+
+
+def release_request_connection(exception=None):
+    """Return the request-bound connections to their pools (registered as a teardown handler)."""
+    for key in ('_db_read_conn', '_db_conn'):
+        conn = g.pop(key, None)
+        if conn is not None:
+            conn.release()
+
+
+def get_pool_stats():
+    """Snapshot of pool checkout and wait-time metrics."""
+    with _pool_lock:
+        stats = dict(_pool_stats)
+        replica_lag = {name: state['lag'] for name, state in _replica_state.items()}
+    stats['backend'] = DB_BACKEND
+    stats['pool_size'] = DB_POOL_CONFIG['pool_size']
+    stats['avg_wait_ms'] = stats['total_wait_ms'] / stats['checkouts'] if stats['checkouts'] else 0.0
+    stats['replicas'] = {
+        name: {'host': DB_TARGETS[name].get('host'), 'port': DB_TARGETS[name].get('port'),
+               'database': DB_TARGETS[name]['database'], 'lag_seconds': lag}
+        for name, lag in replica_lag.items()
+    }
+    return stats
+
+
+def _physical_connection(conn):
+    """Unwrap request/pool wrappers down to the connection that owns the socket."""
+    if isinstance(conn, RequestConnection):
+        conn = conn._conn
+    if isinstance(conn, pooling.PooledMySQLConnection):
+        conn = conn._cnx
+    return conn
+
+
+def _physical_cursor(conn, **kwargs):
+    # Cached cursors outlive the request, so they are never instrumented themselves
+    if isinstance(conn, RequestConnection):
+        conn = conn._conn
+    return conn.cursor(**kwargs)
+
+
+def get_prepared_cursor(conn, sql):
+    """Get the server-side prepared cursor for `sql` on this connection.
+
+    The statement is prepared on first use and reused for the lifetime of the
+    pooled connection (on SQLite, sqlite3's own statement cache does this). `sql` must be a module-level constant: the connector
+    only skips re-preparing when it sees the identical string object.
+    """
+    cursors = _prepared_cursors.setdefault(_physical_connection(conn), {})
+    cursor = cursors.get(sql)
+    if cursor is None:
+        cursor = cursors[sql] = _physical_cursor(conn, prepared=True)
+    return cursor
+
+
+def execute_prepared(conn, sql, params=()):
+    """Execute `sql` as a prepared statement and return the cursor holding the result."""
+    cursor = get_prepared_cursor(conn, sql)
+    stats = _request_sql_stats()
+    if stats is not None:
+        cursor = InstrumentedCursor(cursor, stats)
+    cursor.execute(sql, tuple(params))
+    return cursor
+
+
+def iter_rows(conn, sql, params=(), batch_size=DB_STREAM_BATCH_ROWS):
+    """Yield the rows of `sql` in batches of `batch_size`, without holding the whole result.
+
+    Uses an unbuffered cursor, so MySQL sends rows as they are fetched
+    (SQLite steps its statement lazily anyway). If the consumer stops early
+    (e.g. a download is cancelled) the unread rest of the result is dropped
+    by reconnecting, which leaves the connection usable for its next caller.
+    """
+    cursor = conn.cursor(buffered=False)
+    finished = False
+    try:
+        cursor.execute(sql, tuple(params))
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+        finished = True
+    finally:
+        try:
+            cursor.close()
+        except DB_ERRORS:
+            if finished:
+                raise
+            conn.reconnect(attempts=DB_RECONNECT_ATTEMPTS, delay=DB_RECONNECT_DELAY)
+            _prepared_cursors.pop(_physical_connection(conn), None)
+
 
 def get_db_cursor():
     """Get database cursor."""
@@ -1 +1,11 @@
 # Paths & constants for model and features
+import os
+
+# Trained model bundle (model, scaler, encoders, feature list) and SHAP explainer
+MODEL_PATH = os.environ.get('MODEL_PATH', 'model/credit_model.pkl')
+SHAP_EXPLAINER_PATH = os.environ.get('SHAP_EXPLAINER_PATH', 'model/shap_explainer.pkl')
+
+# Async API (asgi.py): executor for score_customer - 'process' keeps inference off the
+# event loop's GIL, 'thread' skips the per-call pickling of features and results
+MODEL_EXECUTOR = os.environ.get('MODEL_EXECUTOR', 'process')
+MODEL_EXECUTOR_WORKERS = int(os.environ.get('MODEL_EXECUTOR_WORKERS', 2))
@@ -0,0 +1,214 @@
+# 🪶 Embedded SQLite backend (DB_BACKEND=sqlite)
+"""
+SQLite stand-in for MySQL, used for offline benchmarks, profiling and
+single-node deployments.
+
+SQLiteConnection exposes the subset of the mysql.connector API the app
+relies on (cursor(dictionary=/prepared=), start_transaction, in_transaction,
+is_connected, reconnect, ...) and translates the MySQL dialect used in the
+routes on the fly: %s placeholders, NOW()/CURDATE()/DATE_SUB, FOR UPDATE and
+double-quoted string literals. translate_schema() turns the migrations' DDL into
+SQLite DDL.
+"""
+import queue
+import re
+import sqlite3
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+
+from mysql.connector import errors
+
+# Python values -> SQLite
+sqlite3.register_adapter(Decimal, float)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+
+# Declared column types -> the Python types mysql.connector returns
+sqlite3.register_converter('DATETIME', lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter('TIMESTAMP', lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter('DATE', lambda value: date.fromisoformat(value.decode()[:10]))
+sqlite3.register_converter('DECIMAL', lambda value: Decimal(value.decode()))
+
+PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA foreign_keys=ON',
+    'PRAGMA busy_timeout=5000',
+)
+
+_INTERVAL_UNITS = {'DAY': 'days', 'MONTH': 'months', 'YEAR': 'years'}
+_DATE_SUB_RE = re.compile(r"DATE_SUB\(\s*CURDATE\(\)\s*,\s*INTERVAL\s+(\d+)\s+(DAY|MONTH|YEAR)\s*\)", re.IGNORECASE)
+_DOUBLE_QUOTED_RE = re.compile(r'"([^"\']*)"')
+_FOR_UPDATE_RE = re.compile(r'\s+FOR\s+UPDATE\b', re.IGNORECASE)
+_ENUM_RE = re.compile(r'\b(\w+)\s+ENUM\(([^)]*)\)', re.IGNORECASE)
+_AUTO_PK_RE = re.compile(r'\b(?:BIG)?INT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b', re.IGNORECASE)
+_CREATE_TABLE_RE = re.compile(r'CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)', re.IGNORECASE)
+_INLINE_INDEX_RE = re.compile(r',\s*INDEX\s+(\w+)\s*\(([^)]*)\)', re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def translate_sql(sql):
+    """Rewrite a MySQL statement as used in this app into SQLite syntax."""
+    sql = _DATE_SUB_RE.sub(lambda m: f"date('now', 'localtime', '-{m.group(1)} {_INTERVAL_UNITS[m.group(2).upper()]}')", sql)
+    sql = re.sub(r'\bCURDATE\(\)', "date('now', 'localtime')", sql, flags=re.IGNORECASE)
+    sql = re.sub(r'\bNOW\(\)', "datetime('now', 'localtime')", sql, flags=re.IGNORECASE)
+    # SQLite serialises writers itself; BEGIN IMMEDIATE in start_transaction() takes the lock
+    sql = _FOR_UPDATE_RE.sub('', sql)
+    sql = _DOUBLE_QUOTED_RE.sub(r"'\1'", sql)
+    return sql.replace('%s', '?')
+
+
+def translate_schema(sql):
+    """Translate one MySQL DDL statement (database/migrations.py) into a list of SQLite statements.
+
+    SQLite has no inline INDEX clause, so a CREATE TABLE's indexes come back
+    as separate CREATE INDEX statements after it.
+    """
+    sql = _AUTO_PK_RE.sub('INTEGER PRIMARY KEY AUTOINCREMENT', sql)
+    sql = _ENUM_RE.sub(r'\1 TEXT CHECK (\1 IN (\2))', sql)
+
+    statements = [sql]
+    table = _CREATE_TABLE_RE.search(sql)
+    if table:
+        statements[0] = _INLINE_INDEX_RE.sub('', sql)
+        statements += [f'CREATE INDEX IF NOT EXISTS {name} ON {table.group(1)} ({columns})'
+                       for name, columns in _INLINE_INDEX_RE.findall(sql)]
+    return [translate_sql(statement) for statement in statements]
+
+
+class SQLiteCursor:
+    """DB-API cursor returning tuples or, with dictionary=True, dicts."""
+
+    def __init__(self, connection, dictionary=False):
+        self._cursor = connection._db.cursor()
+        self._dictionary = dictionary
+
+    def execute(self, operation, params=None):
+        self._cursor.execute(translate_sql(operation), tuple(params or ()))
+
+    def executemany(self, operation, seq_params):
+        self._cursor.executemany(translate_sql(operation), seq_params)
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return dict(zip([desc[0] for desc in self._cursor.description], row))
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """sqlite3 connection with the mysql.connector methods the app calls."""
+
+    def __init__(self, database, pool=None):
+        self.database = database
+        self._pool = pool
+        self._db = None
+        self.reconnect()
+
+    def reconnect(self, attempts=1, delay=0):
+        if self._db is not None:
+            self._db.close()
+        self._db = sqlite3.connect(self.database, detect_types=sqlite3.PARSE_DECLTYPES,
+                                   check_same_thread=False)
+        for pragma in PRAGMAS:
+            self._db.execute(pragma)
+
+    def cursor(self, dictionary=False, prepared=False, buffered=None):
+        # sqlite3 keeps its own per-connection statement cache, so prepared cursors are plain cursors
+        return SQLiteCursor(self, dictionary=dictionary)
+
+    @property
+    def in_transaction(self):
+        return self._db.in_transaction
+
+    def start_transaction(self, *args, **kwargs):
+        if not self._db.in_transaction:
+            self._db.execute('BEGIN IMMEDIATE')
+
+    def commit(self):
+        self._db.commit()
+
+    def rollback(self):
+        self._db.rollback()
+
+    def is_connected(self):
+        try:
+            self._db.execute('SELECT 1')
+            return True
+        except sqlite3.Error:
+            return False
+
+    def ping(self, reconnect=False, attempts=1, delay=0):
+        if not self.is_connected() and reconnect:
+            self.reconnect(attempts, delay)
+
+    def executescript(self, sql):
+        self._db.executescript(sql)
+
+    def close(self):
+        """Return to the pool when pooled, otherwise close the file handle."""
+        if self._pool is not None:
+            if self._db.in_transaction:
+                self._db.rollback()
+            self._pool.add_connection(self)
+        else:
+            self._db.close()
+
+
+class SQLiteConnectionPool:
+    """Fixed-size pool of SQLite connections with the MySQLConnectionPool interface."""
+
+    def __init__(self, pool_name, pool_size, database, **kwargs):
+        self.pool_name = pool_name
+        self.pool_size = pool_size
+        self.database = database
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def get_connection(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened >= self.pool_size:
+                raise errors.PoolError('Failed getting connection; pool exhausted')
+            self._opened += 1
+        return SQLiteConnection(self.database, pool=self)
+
+    def add_connection(self, conn):
+        self._idle.put(conn)
+
+
+def connect(database):
+    """Open a standalone (unpooled) SQLite connection."""
+    return SQLiteConnection(database)
@@ -0,0 +1,157 @@
+# 🧊 Cold storage for archived transactions
+"""
+Months moved out of the transactions table (see database/partitions.py) are
+kept as zstd-compressed Parquet files, one or more per month, named
+transactions_YYYYMM_<archived at>.parquet. Exports read them back with
+column projection and account/date predicates pushed down to the files.
+"""
+
+import glob
+import os
+import re
+from datetime import datetime
+from decimal import Decimal
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+from config.db_config import DB_ARCHIVE_DIR
+from database import search_index
+
+# Columns copied to the archive, in SELECT order
+ARCHIVE_COLUMNS = [
+    'transaction_id', 'account_id', 'transaction_date', 'transaction_type', 'amount', 'merchant', 'category',
+    'description', 'counterparty_account_id', 'counterparty_account_number', 'counterparty_bank_name',
+    'counterparty_ifsc_code', 'transfer_type', 'reference_number', 'status', 'initiated_at', 'completed_at', 'remarks',
+]
+
+# Export column order (matches the 'export' shape in database/queries.py)
+EXPORT_COLUMNS = ['transaction_date', 'transaction_type', 'amount', 'merchant', 'category', 'description']
+
+_FILE_RE = re.compile(r'transactions_(\d{4})(\d{2})_\w+\.parquet$')
+_CENTS = Decimal('0.01')
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError('pyarrow is required to read or write archived transactions (pip install pyarrow)')
+
+
+def archive_schema():
+    _require_pyarrow()
+    string_columns = {'transaction_type', 'merchant', 'category', 'description', 'counterparty_account_number',
+                      'counterparty_bank_name', 'counterparty_ifsc_code', 'transfer_type', 'reference_number',
+                      'status', 'remarks'}
+    types = {
+        'transaction_id': pa.int64(),
+        'account_id': pa.int32(),
+        'counterparty_account_id': pa.int32(),
+        'transaction_date': pa.timestamp('s'),
+        'initiated_at': pa.timestamp('s'),
+        'completed_at': pa.timestamp('s'),
+        'amount': pa.decimal128(15, 2),
+    }
+    return pa.schema([(name, pa.string() if name in string_columns else types[name]) for name in ARCHIVE_COLUMNS])
+
+
+def _normalise(row):
+    # SQLite hands back REAL-backed Decimals with float noise; Parquet wants scale 2
+    row = list(row)
+    amount_index = ARCHIVE_COLUMNS.index('amount')
+    if row[amount_index] is not None:
+        row[amount_index] = Decimal(row[amount_index]).quantize(_CENTS)
+    return row
+
+
+def write_archive(cursor, month, batch_size=50000):
+    """Stream the result of an executed SELECT of ARCHIVE_COLUMNS into a Parquet file for `month`.
+
+    Returns (path, rows). The file only appears under its final name once complete.
+    """
+    _require_pyarrow()
+    os.makedirs(DB_ARCHIVE_DIR, exist_ok=True)
+    path = os.path.join(DB_ARCHIVE_DIR, f"transactions_{month:%Y%m}_{datetime.now():%Y%m%dT%H%M%S}.parquet")
+    schema = archive_schema()
+    rows = 0
+
+    with pq.ParquetWriter(path + '.tmp', schema, compression='zstd') as writer:
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            columns = list(zip(*(_normalise(row) for row in batch)))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(column, type=schema.field(i).type) for i, column in enumerate(columns)], schema=schema))
+            rows += len(batch)
+
+    os.replace(path + '.tmp', path)
+    return path, rows
+
+
+def archive_files(start=None):
+    """Archive files that may hold rows on or after `start` (all files when None)."""
+    files = []
+    for path in sorted(glob.glob(os.path.join(DB_ARCHIVE_DIR, 'transactions_*.parquet'))):
+        match = _FILE_RE.search(path)
+        if not match:
+            continue
+        year, month = int(match.group(1)), int(match.group(2))
+        month_end = datetime(year + month // 12, month % 12 + 1, 1)
+        if start is None or month_end > start:
+            files.append(path)
+    return files
+
+
+def _files_by_month(files):
+    """{(year, month): [paths]} for archive file paths."""
+    months = {}
+    for path in files:
+        match = _FILE_RE.search(path)
+        months.setdefault((int(match.group(1)), int(match.group(2))), []).append(path)
+    return months
+
+
+def iter_archived_transactions(account_ids, start=None, type_filter=None, search=''):
+    """Archived rows for these accounts in export shape, newest first.
+
+    Reads one archived month at a time, so memory is bounded by the largest
+    month rather than the whole archive. `type_filter` is a (column, value)
+    pair from TRANSACTION_TYPE_FILTERS and `search` is matched like the live
+    table's search index (search_index.matches).
+    """
+    files = archive_files(start)
+    if not files or not account_ids:
+        return
+    _require_pyarrow()
+
+    condition = ds.field('account_id').isin(list(account_ids))
+    if start is not None:
+        condition &= ds.field('transaction_date') >= pa.scalar(start, type=pa.timestamp('s'))
+    if type_filter:
+        condition &= ds.field(type_filter[0]) == type_filter[1]
+
+    months = _files_by_month(files)
+    for month in sorted(months, reverse=True):
+        table = ds.dataset(months[month], format='parquet', schema=archive_schema()).to_table(
+            columns=EXPORT_COLUMNS + ['transaction_id'], filter=condition)
+        table = table.sort_by([('transaction_date', 'descending'), ('transaction_id', 'descending')])
+
+        # A month re-archived after an interrupted run may appear in two files
+        seen = set()
+        for transaction_id, *row in zip(table.column('transaction_id').to_pylist(),
+                                        *(table.column(name).to_pylist() for name in EXPORT_COLUMNS)):
+            if transaction_id in seen:
+                continue
+            seen.add(transaction_id)
+            if search and not search_index.matches(search, (row[3], row[4], row[5])):
+                continue
+            yield tuple(row)
+
+
+def read_archived_transactions(account_ids, start=None, type_filter=None, search=''):
+    """iter_archived_transactions() as a list."""
+    return list(iter_archived_transactions(account_ids, start, type_filter, search))
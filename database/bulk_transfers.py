@@ -0,0 +1,341 @@
+# 📦 Bulk transfers: payroll and disbursement batches from one account
+"""
+POST /api/transfers/bulk applies up to BULK_TRANSFER_MAX_ITEMS transfers from
+one source account with a handful of statements per chunk instead of one
+/api/transfer call (connection, lookups, commit) per receiver:
+
+1. new_batch() validates every item up front; invalid items are reported
+   as 'Rejected' and never applied;
+2. all receivers are resolved with one IN query on account_number
+   (receivers_statement()), and the total of what is left is checked against
+   the sender's balance once: a batch the account cannot cover is refused
+   as a whole, before anything is written;
+3. the transfers are applied BULK_TRANSFER_CHUNK at a time, each chunk in
+   its own ledger transaction (chunk_plan()): executemany() credits the
+   receivers and one conditional UPDATE debits the sender for the chunk
+   total, touching the rows in account_id order like ledger transfers do;
+   multi-row INSERTs of BULK_INSERT_ROWS rows then write the debit/credit
+   pairs, followed by the chunk's daily rollup, search terms and
+   customer_versions bump. Credits to hot accounts are checked with a
+   non-locking status read and go to pending_credits instead; the sweeper
+   writes their rows (database/hot_accounts.py).
+
+A chunk whose UPDATEs are refused (a receiver closed, or the balance spent
+by another payment since the check) is rolled back, the chunk's accounts are
+read once to find the items to fail, and the rest of the chunk is run again.
+Chunks already committed stay committed; the response reports every item as
+'Completed', 'Failed' or 'Rejected'.
+"""
+import os
+import uuid
+from decimal import Decimal
+
+from config.db_config import DB_ERRORS
+from database import customer_versions, hot_accounts, ledger, search_index
+from database.daily_summary import rollup_statement
+from database.ledger import TransferError
+from database.queries import HOT_QUERIES, fetch_one, inserted_ids
+
+BULK_TRANSFER_MAX_ITEMS = int(os.environ.get('BULK_TRANSFER_MAX_ITEMS', 10000))
+BULK_TRANSFER_CHUNK = int(os.environ.get('BULK_TRANSFER_CHUNK', 500))  # transfers per database transaction
+BULK_INSERT_ROWS = int(os.environ.get('BULK_INSERT_ROWS', 1000))  # transactions rows per INSERT statement
+BULK_CHUNK_ATTEMPTS = int(os.environ.get('BULK_CHUNK_ATTEMPTS', 3))  # re-runs of a chunk whose accounts changed
+
+_CREDIT = "UPDATE accounts SET balance = balance + %s WHERE account_id = %s AND status = 'Active'"
+
+
+def new_batch(sender_account_id, sender_customer_id, items, transfer_type='IMPS', remarks=None):
+    """Batch dict for a bulk request; ValueError (the 400 message) when the batch cannot run at all.
+
+    Each item is {'receiver_account_number', 'amount'[, 'receiver_ifsc', 'remarks']}.
+    """
+    if transfer_type not in ledger.TRANSFER_TYPES:
+        raise ValueError('Invalid transfer type')
+    if not isinstance(items, list) or not items:
+        raise ValueError('items must be a non-empty list')
+    if len(items) > BULK_TRANSFER_MAX_ITEMS:
+        raise ValueError(f'At most {BULK_TRANSFER_MAX_ITEMS} transfers per batch')
+
+    batch_reference = f'BLK{uuid.uuid4().hex[:12].upper()}'
+    results, pending = [], []
+    for index, item in enumerate(items):
+        result = {'index': index, 'reference_number': f'{batch_reference}{index:05d}', 'status': 'Rejected',
+                  'error': None, 'transaction_id': None}
+        results.append(result)
+        try:
+            if not isinstance(item, dict):
+                raise TransferError('Item must be an object')
+            account_number = str(item.get('receiver_account_number') or '').strip()
+            if not account_number:
+                raise TransferError('receiver_account_number is required')
+            amount = ledger.to_amount(item.get('amount'))
+        except TransferError as e:
+            result['error'] = str(e)
+            continue
+        result.update(receiver_account_number=account_number, amount=float(amount))
+        pending.append((index, account_number, amount, str(item.get('receiver_ifsc') or '').strip() or None,
+                        str(item.get('remarks') or '').strip() or remarks))
+    return {
+        'batch_reference': batch_reference,
+        'sender_account_id': sender_account_id,
+        'sender_customer_id': sender_customer_id,
+        'transfer_type': transfer_type,
+        'results': results,
+        'pending': pending,
+        'transfers': [],  # (index, ledger transfer) once resolved
+    }
+
+
+def receivers_statement(batch):
+    """(sql, params): the pending items' receivers as (account_number, account_id, customer_id) rows,
+    active accounts only, in one IN query."""
+    account_numbers = sorted({account_number for _, account_number, _, _, _ in batch['pending']})
+    placeholders = ', '.join(['%s'] * len(account_numbers))
+    return (f"SELECT account_number, account_id, customer_id FROM accounts "
+            f"WHERE account_number IN ({placeholders}) AND status = 'Active'"), account_numbers
+
+
+def resolve(batch, rows):
+    """Turn the pending items into ledger transfers using the receivers_statement() rows."""
+    receivers = {row[0]: (row[1], row[2]) for row in rows}
+    results = batch['results']
+    for index, account_number, amount, ifsc, remarks in batch['pending']:
+        receiver = receivers.get(account_number)
+        if receiver is None:
+            results[index]['error'] = 'Receiver account not found'
+            continue
+        try:
+            transfer = ledger.new_transfer(
+                batch['sender_account_id'], batch['sender_customer_id'], receiver[0], receiver[1], amount,
+                batch['transfer_type'], results[index]['reference_number'], 'Bulk Transfer',
+                f'Bulk transfer to {account_number}', 'Received from bulk transfer',
+                account_number, None, ifsc, remarks)
+        except TransferError as e:
+            results[index]['error'] = str(e)
+            continue
+        results[index]['status'] = 'Pending'
+        batch['transfers'].append((index, transfer))
+    batch['pending'] = []
+
+
+def check_balance(batch, row):
+    """TransferError unless the HOT_QUERIES['owned_account_balance'] row covers the whole batch."""
+    if row is None:
+        raise TransferError('Invalid sender account', 404)
+    total = sum((transfer['amount'] for _, transfer in batch['transfers']), Decimal(0))
+    if Decimal(str(row[0])) < total:
+        raise TransferError(f'Insufficient balance for the batch: {total} needed, {row[0]} available', 400)
+
+
+def _rows(conn, statement):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(*statement)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def prepare_batch(conn, batch):
+    """Resolve the batch's receivers and check the sender's balance covers it (TransferError if not)."""
+    balance_row = fetch_one(conn, 'owned_account_balance', (batch['sender_account_id'], batch['sender_customer_id']))
+    if balance_row is not None and batch['pending']:
+        resolve(batch, _rows(conn, receivers_statement(batch)))
+    check_balance(batch, balance_row)
+
+
+async def prepare_batch_async(conn, batch):
+    """prepare_batch() on a config/async_db.py connection."""
+    balance_row = await conn.fetchone(HOT_QUERIES['owned_account_balance'],
+                                      (batch['sender_account_id'], batch['sender_customer_id']))
+    if balance_row is not None and batch['pending']:
+        resolve(batch, await conn.fetchall(*receivers_statement(batch)))
+    check_balance(batch, balance_row)
+
+
+def chunks(batch):
+    transfers = batch['transfers']
+    return [transfers[start:start + BULK_TRANSFER_CHUNK] for start in range(0, len(transfers), BULK_TRANSFER_CHUNK)]
+
+
+def chunk_plan(chunk):
+    """The statements of one chunk of (index, transfer) pairs, a ledger plan: returns the
+    [debit_id, credit_id] of each transfer (credit_id None for hot receivers), or None when an
+    UPDATE or a hot receiver's status check was refused."""
+    transfers = [transfer for _, transfer in chunk]
+    first = transfers[0]
+    sender = first['sender_account_id']
+    total = sum(transfer['amount'] for transfer in transfers)
+    credits, hot = {}, set()
+    for transfer in transfers:
+        if transfer['receiver_hot']:
+            hot.add(transfer['receiver_account_id'])
+        else:
+            credits[transfer['receiver_account_id']] = credits.get(transfer['receiver_account_id'], 0) + transfer['amount']
+
+    if hot:
+        active, _ = yield ledger.read(*hot_accounts.active_statement(sorted(hot)))
+        if active != len(hot):
+            return None
+
+    # Receivers below the sender, the sender, then receivers above: account_id order
+    below = [(credits[account_id], account_id) for account_id in sorted(credits) if account_id < sender]
+    above = [(credits[account_id], account_id) for account_id in sorted(credits) if account_id > sender]
+    if below:
+        rowcount, _ = yield ledger.many(_CREDIT, below)
+        if rowcount != len(below):
+            return None
+    rowcount, _ = yield ledger.debit_statement(sender, first['sender_customer_id'], total)
+    if rowcount != 1:
+        return None
+    if above:
+        rowcount, _ = yield ledger.many(_CREDIT, above)
+        if rowcount != len(above):
+            return None
+
+    rows = [row for transfer in transfers for row in ledger.transfer_rows(transfer)]
+    ids = []
+    for start in range(0, len(rows), BULK_INSERT_ROWS):
+        batch_rows = rows[start:start + BULK_INSERT_ROWS]
+        _, lastrowid = yield ledger.insert_statement(batch_rows)
+        ids += inserted_ids(lastrowid, len(batch_rows))
+    pairs, position = [], 0
+    for transfer in transfers:
+        if transfer['receiver_hot']:
+            pairs.append([ids[position], None])
+            position += 1
+        else:
+            pairs.append(ids[position:position + 2])
+            position += 2
+
+    # Hot receivers' credits go to pending_credits; the sweeper writes their rows
+    deferred = [ledger.pending_credit(transfer, debit_id)
+                for transfer, (debit_id, _) in zip(transfers, pairs) if transfer['receiver_hot']]
+    if deferred:
+        yield hot_accounts.pending_statement(deferred)
+    yield rollup_statement(ids)
+    sources = [source for transfer, pair in zip(transfers, pairs) for source in ledger.term_sources(transfer, *pair)]
+    for statement in search_index.insert_statements(search_index.term_rows(sources)):
+        yield statement
+    yield customer_versions.bump_statement(
+        'transactions', [first['sender_customer_id']] + [transfer['receiver_customer_id'] for transfer in transfers
+                                                         if not transfer['receiver_hot']])
+    return pairs
+
+
+def accounts_statement(chunk):
+    """(sql, params) reading (account_id, customer_id, balance, status) of a refused chunk's accounts."""
+    account_ids = sorted({chunk[0][1]['sender_account_id']} | {transfer['receiver_account_id'] for _, transfer in chunk})
+    placeholders = ', '.join(['%s'] * len(account_ids))
+    return (f'SELECT account_id, customer_id, balance, status FROM accounts '
+            f'WHERE account_id IN ({placeholders})'), account_ids
+
+
+def refused_chunk(batch, chunk, rows):
+    """Fail the items of a refused chunk that the accounts_statement() rows explain; returns the
+    items left to run again (all of them when nothing explains the refusal)."""
+    accounts = {row[0]: row for row in rows}
+    sender = accounts.get(batch['sender_account_id'])
+    if sender is None or sender[1] != batch['sender_customer_id'] or sender[3] != 'Active':
+        return _fail(batch, chunk, 'Invalid sender account')
+
+    remaining = []
+    for index, transfer in chunk:
+        receiver = accounts.get(transfer['receiver_account_id'])
+        if receiver is None or receiver[3] != 'Active':
+            _fail(batch, [(index, transfer)], 'Receiver account not available')
+        else:
+            remaining.append((index, transfer))
+
+    # Keep the items (in order) the balance still covers
+    covered, available = [], Decimal(str(sender[2]))
+    for index, transfer in remaining:
+        if transfer['amount'] <= available:
+            covered.append((index, transfer))
+            available -= transfer['amount']
+        else:
+            _fail(batch, [(index, transfer)], 'Insufficient balance')
+    return covered
+
+
+def _fail(batch, chunk, error):
+    for index, _ in chunk:
+        batch['results'][index].update(status='Failed', error=error)
+    return []
+
+
+def completed(batch, chunk, pairs):
+    """Record a committed chunk's transaction ids in the results; returns the customers it touched."""
+    for (index, _), (debit_id, _) in zip(chunk, pairs):
+        batch['results'][index].update(status='Completed', transaction_id=debit_id)
+    return {batch['sender_customer_id']} | {transfer['receiver_customer_id'] for _, transfer in chunk}
+
+
+def execute_batch(conn, batch):
+    """Apply a resolved batch chunk by chunk on `conn`; returns the customer ids whose accounts
+    changed. Item outcomes are recorded in batch['results']: a database error fails the chunk
+    it happened in and every later one, chunks committed before it stay committed.
+    """
+    customer_ids = set()
+    pending = chunks(batch)
+    if pending and hot_accounts.is_hot(batch['sender_account_id']):
+        hot_accounts.sweep_account(conn, batch['sender_account_id'])
+    for position, chunk in enumerate(pending):
+        try:
+            for _ in range(BULK_CHUNK_ATTEMPTS):
+                if not chunk:
+                    break
+                pairs = ledger.run_transaction(conn, lambda: chunk_plan(chunk), len(chunk))
+                if pairs is not None:
+                    customer_ids |= completed(batch, chunk, pairs)
+                    break
+                chunk = refused_chunk(batch, chunk, _rows(conn, accounts_statement(chunk)))
+            else:
+                _fail(batch, chunk, 'Accounts changed during the transfer, please retry')
+        except DB_ERRORS as e:
+            for unapplied in pending[position:]:
+                _fail(batch, unapplied, f'Transfer failed: {e}')
+            break
+    return customer_ids
+
+
+async def execute_batch_async(conn, batch):
+    """execute_batch() on a config/async_db.py connection."""
+    customer_ids = set()
+    pending = chunks(batch)
+    if pending and hot_accounts.is_hot(batch['sender_account_id']):
+        await hot_accounts.sweep_account_async(conn, batch['sender_account_id'])
+    for position, chunk in enumerate(pending):
+        try:
+            for _ in range(BULK_CHUNK_ATTEMPTS):
+                if not chunk:
+                    break
+                pairs = await ledger.run_transaction_async(conn, lambda: chunk_plan(chunk), len(chunk))
+                if pairs is not None:
+                    customer_ids |= completed(batch, chunk, pairs)
+                    break
+                chunk = refused_chunk(batch, chunk, await conn.fetchall(*accounts_statement(chunk)))
+            else:
+                _fail(batch, chunk, 'Accounts changed during the transfer, please retry')
+        except Exception as e:
+            for unapplied in pending[position:]:
+                _fail(batch, unapplied, f'Transfer failed: {e}')
+            break
+    return customer_ids
+
+
+def batch_response(batch):
+    """/api/transfers/bulk payload: counts, the completed total and every item's result."""
+    results = batch['results']
+    done = [result for result in results if result['status'] == 'Completed']
+    return {
+        'batch_reference': batch['batch_reference'],
+        'sender_account_id': batch['sender_account_id'],
+        'transfer_type': batch['transfer_type'],
+        'requested': len(results),
+        'completed': len(done),
+        'failed': sum(result['status'] == 'Failed' for result in results),
+        'rejected': sum(result['status'] == 'Rejected' for result in results),
+        'total_amount': round(sum(result['amount'] for result in done), 2),
+        'results': results,
+    }
@@ -0,0 +1,52 @@
+# 🗃 Per-customer cache for derived listing data (counts, summaries)
+"""
+Small in-process TTL cache keyed by customer. Everything cached for a
+customer is dropped by invalidate_customer() when this process writes one of
+their transactions; other worker processes pick the change up once the
+entry's CUSTOMER_CACHE_TTL expires.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+CUSTOMER_CACHE_TTL = float(os.environ.get('CUSTOMER_CACHE_TTL', 30))  # seconds
+CUSTOMER_CACHE_MAX_CUSTOMERS = int(os.environ.get('CUSTOMER_CACHE_MAX_CUSTOMERS', 10000))
+
+_entries = OrderedDict()  # customer_id -> {key: (expires_at, value)}, least recently used first
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+
+def get(customer_id, key):
+    """Cached value for (customer_id, key), or None when missing or expired."""
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(customer_id, {}).get(key)
+        if entry is None or entry[0] <= now:
+            _stats['misses'] += 1
+            return None
+        _entries.move_to_end(customer_id)
+        _stats['hits'] += 1
+        return entry[1]
+
+
+def put(customer_id, key, value, ttl=CUSTOMER_CACHE_TTL):
+    with _lock:
+        _entries.setdefault(customer_id, {})[key] = (time.monotonic() + ttl, value)
+        _entries.move_to_end(customer_id)
+        while len(_entries) > CUSTOMER_CACHE_MAX_CUSTOMERS:
+            _entries.popitem(last=False)
+
+
+def invalidate_customer(*customer_ids):
+    """Drop everything cached for these customers (call after committing their transactions)."""
+    with _lock:
+        for customer_id in customer_ids:
+            if _entries.pop(customer_id, None) is not None:
+                _stats['invalidations'] += 1
+
+
+def get_cache_stats():
+    with _lock:
+        return dict(_stats, customers=len(_entries))
@@ -0,0 +1,94 @@
+# 🔢 Per-customer change counters (customer_versions)
+"""
+One row per customer with a counter for each kind of data the APIs serve
+(transactions, loan_applications). Every path that writes that data bumps
+the customer's counter in the same database transaction, so the counter
+moves exactly when a response could change. The APIs read it with a
+primary-key lookup (HOT_QUERIES['customer_versions']), build their ETag
+from it, and answer a matching If-None-Match with 304 Not Modified without
+running their queries.
+
+Row 0 is a global epoch that is part of every customer's version. Bulk
+loads and archival bump it instead of touching every customer's row; after
+editing rows by hand, bump it with the command below.
+
+Usage (from the repository root):
+    python database/customer_versions.py bump
+    python database/customer_versions.py bump --kind transactions
+"""
+
+import argparse
+import sys
+import os
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.db_config import get_db_connection, is_sqlite
+
+KINDS = ('transactions', 'loan_applications')
+GLOBAL_EPOCH = 0  # customer_id of the row every version includes
+
+_BUMP_UPSERT = {
+    kind: {
+        'mysql': f'ON DUPLICATE KEY UPDATE {kind}_version = {kind}_version + 1',
+        'sqlite': f'ON CONFLICT (customer_id) DO UPDATE SET {kind}_version = {kind}_version + 1',
+    }
+    for kind in KINDS
+}
+
+
+def versions_params(customer_id):
+    """Parameters of HOT_QUERIES['customer_versions']: the epoch row and the customer's row."""
+    return (GLOBAL_EPOCH, customer_id)
+
+
+def version_token(rows, kind, customer_id):
+    """'<epoch>.<customer counter>' for `kind` from the customer_versions rows (missing rows count as 0)."""
+    column = 1 + KINDS.index(kind)
+    counters = {row[0]: row[column] for row in rows}
+    return f'{counters.get(GLOBAL_EPOCH, 0)}.{counters.get(customer_id, 0)}'
+
+
+def bump_statement(kind, customer_ids):
+    """(sql, params) adding one to `kind`'s counter of each customer (created at 1 when missing)."""
+    customer_ids = sorted(set(customer_ids))
+    values = ', '.join(['(%s, 1)'] * len(customer_ids))
+    upsert = _BUMP_UPSERT[kind]['sqlite' if is_sqlite() else 'mysql']
+    return f'INSERT INTO customer_versions (customer_id, {kind}_version) VALUES {values} {upsert}', customer_ids
+
+
+def bump(cursor, kind, customer_ids):
+    """Bump these customers' `kind` counter; call in the transaction that changed their data."""
+    customer_ids = [customer_id for customer_id in customer_ids if customer_id is not None]
+    if customer_ids:
+        cursor.execute(*bump_statement(kind, customer_ids))
+
+
+def bump_all(cursor, kinds=KINDS):
+    """Invalidate every customer's ETags at once (bulk loads, archival, manual edits)."""
+    for kind in kinds:
+        bump(cursor, kind, [GLOBAL_EPOCH])
+
+
+def invalidate_all(kinds=KINDS):
+    """bump_all() in its own committed transaction."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        bump_all(cursor, kinds)
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='customer_versions maintenance')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    bump_command = subcommands.add_parser('bump', help="invalidate every customer's API ETags")
+    bump_command.add_argument('--kind', choices=KINDS, help='only this kind of data (default: all)')
+    args = parser.parse_args()
+
+    invalidate_all([args.kind] if args.kind else KINDS)
+    print("Bumped the global epoch; clients will re-fetch on their next request.")
@@ -0,0 +1,177 @@
+# 📅 Per-account daily rollup of transactions (account_daily_summary)
+"""
+One row per account per day with its credit total, debit total and
+transaction count, so summary stats for any date range add up at most a few
+hundred rollup rows instead of re-reading the customer's whole history.
+
+Every path that inserts transactions passes the new transaction ids to
+record_transactions() before committing, so the rollup commits or rolls back
+together with the rows it counts. The backfill command rebuilds it from the
+transactions table (new databases, bulk loads, or repairing drift).
+
+Usage (from the repository root):
+    python database/daily_summary.py backfill
+    python database/daily_summary.py backfill --accounts 1000 2000
+    python database/daily_summary.py check
+"""
+
+import argparse
+import sys
+import os
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.db_config import get_db_connection, is_sqlite
+
+BACKFILL_CHUNK_ACCOUNTS = 5000  # accounts rebuilt per committed transaction
+
+# Aggregate the matching transactions by account and day and add them onto the rollup rows
+_ROLLUP_INSERT = '''
+    INSERT INTO account_daily_summary
+        (account_id, customer_id, summary_date, total_credits, total_debits, transaction_count)
+    SELECT account_id, MAX(customer_id), DATE(transaction_date),
+           SUM(CASE WHEN transaction_type = 'Credit' THEN amount ELSE 0 END),
+           SUM(CASE WHEN transaction_type = 'Debit' THEN amount ELSE 0 END),
+           COUNT(*)
+    FROM transactions
+    WHERE {where} AND transaction_date IS NOT NULL
+    GROUP BY account_id, DATE(transaction_date)
+'''
+_UPSERT_MYSQL = '''
+    ON DUPLICATE KEY UPDATE
+        total_credits = total_credits + VALUES(total_credits),
+        total_debits = total_debits + VALUES(total_debits),
+        transaction_count = transaction_count + VALUES(transaction_count)
+'''
+_UPSERT_SQLITE = '''
+    ON CONFLICT (account_id, summary_date) DO UPDATE SET
+        total_credits = total_credits + excluded.total_credits,
+        total_debits = total_debits + excluded.total_debits,
+        transaction_count = transaction_count + excluded.transaction_count
+'''
+
+
+def rollup_sql(where):
+    """INSERT ... SELECT adding the transactions matching `where` to the rollup."""
+    return _ROLLUP_INSERT.format(where=where) + (_UPSERT_SQLITE if is_sqlite() else _UPSERT_MYSQL)
+
+
+def rollup_statement(transaction_ids):
+    """(sql, params) adding these just-inserted transactions to the rollup."""
+    placeholders = ', '.join(['%s'] * len(transaction_ids))
+    return rollup_sql(f"transaction_id IN ({placeholders})"), list(transaction_ids)
+
+
+def record_transactions(cursor, transaction_ids):
+    """Add new transactions to the rollup; call in the transaction that inserted them."""
+    if transaction_ids:
+        cursor.execute(*rollup_statement(transaction_ids))
+
+
+def rebuild_accounts(cursor, first, last):
+    """Recompute the rollup rows of accounts first..last from transactions."""
+    cursor.execute("DELETE FROM account_daily_summary WHERE account_id BETWEEN %s AND %s", (first, last))
+    cursor.execute(rollup_sql("account_id BETWEEN %s AND %s"), (first, last))
+
+
+def account_range(cursor, first=None, last=None):
+    cursor.execute("SELECT MIN(account_id), MAX(account_id) FROM accounts")
+    low, high = cursor.fetchall()[0]
+    if low is None:
+        return None, None
+    return max(low, first or low), min(high, last or high)
+
+
+def rebuild_all(cursor, chunk=BACKFILL_CHUNK_ACCOUNTS):
+    """Rebuild every account in bounded chunks inside the caller's transaction."""
+    low, high = account_range(cursor)
+    while low is not None and low <= high:
+        rebuild_accounts(cursor, low, min(low + chunk - 1, high))
+        low += chunk
+
+
+def backfill(first=None, last=None, chunk=BACKFILL_CHUNK_ACCOUNTS):
+    """Rebuild the rollup for accounts first..last (default: all), one transaction per chunk."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        low, high = account_range(cursor, first, last)
+        if low is None:
+            print("No accounts to summarise.")
+            return
+        print(f"Rebuilding account_daily_summary for accounts {low}..{high}")
+        while low <= high:
+            upper = min(low + chunk - 1, high)
+            # Each chunk's DELETE and re-insert commit together, so readers never see it half built
+            conn.rollback()
+            conn.start_transaction()
+            rebuild_accounts(cursor, low, upper)
+            conn.commit()
+            print(f"  accounts {low}..{upper} done", flush=True)
+            low = upper + 1
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _totals_by_account(cursor, sql, first, last):
+    cursor.execute(sql, (first, last))
+    return {row[0]: (round(float(row[1] or 0), 2), round(float(row[2] or 0), 2), int(row[3]))
+            for row in cursor.fetchall()}
+
+
+def check(chunk=BACKFILL_CHUNK_ACCOUNTS):
+    """Compare the rollup with transactions per account; returns the mismatching account ids."""
+    conn = get_db_connection(readonly=True)
+    cursor = conn.cursor()
+    mismatched = []
+    try:
+        low, high = account_range(cursor)
+        while low is not None and low <= high:
+            upper = min(low + chunk - 1, high)
+            expected = _totals_by_account(cursor, '''
+                SELECT account_id, SUM(CASE WHEN transaction_type = 'Credit' THEN amount ELSE 0 END),
+                       SUM(CASE WHEN transaction_type = 'Debit' THEN amount ELSE 0 END), COUNT(*)
+                FROM transactions
+                WHERE account_id BETWEEN %s AND %s AND transaction_date IS NOT NULL
+                GROUP BY account_id
+            ''', low, upper)
+            actual = _totals_by_account(cursor, '''
+                SELECT account_id, SUM(total_credits), SUM(total_debits), SUM(transaction_count)
+                FROM account_daily_summary
+                WHERE account_id BETWEEN %s AND %s
+                GROUP BY account_id
+            ''', low, upper)
+            mismatched.extend(account for account in sorted(set(expected) | set(actual))
+                              if expected.get(account) != actual.get(account))
+            low = upper + 1
+        return mismatched
+    finally:
+        cursor.close()
+        conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='account_daily_summary rollup maintenance')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    rebuild = subcommands.add_parser('backfill', help='rebuild the rollup from transactions')
+    rebuild.add_argument('--accounts', type=int, nargs=2, metavar=('FIRST', 'LAST'),
+                         help='only rebuild this account_id range')
+    rebuild.add_argument('--chunk', type=int, default=BACKFILL_CHUNK_ACCOUNTS, help='accounts per transaction')
+    subcommands.add_parser('check', help='compare the rollup with transactions')
+    args = parser.parse_args()
+
+    if args.command == 'backfill':
+        first, last = args.accounts or (None, None)
+        backfill(first, last, args.chunk)
+        print("Backfill complete.")
+    else:
+        mismatched = check()
+        if mismatched:
+            print(f"{len(mismatched)} accounts differ from transactions, e.g. {mismatched[:10]}")
+            print("Run: python database/daily_summary.py backfill --accounts FIRST LAST")
+            sys.exit(1)
+        print("account_daily_summary matches transactions.")
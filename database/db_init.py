@@ -9,57 +9,44 @@ load_dotenv()
 
 # Add parent directory to path to import config
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-from config.db_config import DB_CONFIG
+from config.db_config import DB_CONFIG, DB_SQLITE_PATH, is_sqlite
+from database.migrations import migrate
 
 def initialize_database():
-    """Initialize the MySQL database with schema and sample data."""
-    # Connect to MySQL server (without specifying database to create it if needed)
-    config_without_db = DB_CONFIG.copy()
-    config_without_db.pop('database', None)
-
-    conn = mysql.connector.connect(**config_without_db)
-    cursor = conn.cursor()
+    """Create the database if needed and apply pending migrations (schema, upgrades, sample data)."""
+    if is_sqlite():
+        # The database file is created on first connect
+        os.makedirs(os.path.dirname(os.path.abspath(DB_SQLITE_PATH)), exist_ok=True)
+    else:
+        # Connect to MySQL server (without specifying database to create it if needed)
+        config_without_db = DB_CONFIG.copy()
+        config_without_db.pop('database', None)
+
+        conn = mysql.connector.connect(**config_without_db)
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS {DB_CONFIG['database']}")
+            conn.commit()
+        finally:
+            conn.close()
 
     try:
-        # Create database if it doesn't exist
-        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {DB_CONFIG['database']}")
-        conn.commit()
-
-        # Switch to the database
-        cursor.execute(f"USE {DB_CONFIG['database']}")
-
-        # Get script directory and file paths
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        schema_path = os.path.join(script_dir, 'schema.sql')
-        sample_path = os.path.join(script_dir, 'sample_data.sql')
-
-        # Read and execute schema
-        with open(schema_path, 'r', encoding='utf-8') as f:
-            schema_sql = f.read()
-        # Split by semicolon and execute each statement
-        statements = [stmt.strip() for stmt in schema_sql.split(';') if stmt.strip()]
-        for statement in statements:
-            cursor.execute(statement)
-
-        # Read and execute sample data
-        with open(sample_path, 'r', encoding='utf-8') as f:
-            sample_sql = f.read()
-        # Split by semicolon and execute each statement
-        statements = [stmt.strip() for stmt in sample_sql.split(';') if stmt.strip()]
-        for statement in statements:
-            cursor.execute(statement)
-
-        conn.commit()
-        print("Database initialized successfully!")
-
+        version = migrate()
+        print(f"Database initialized successfully (schema version {version})!")
     except Exception as e:
         print(f"Error initializing database: {e}")
-        conn.rollback()
-    finally:
-        conn.close()
+        raise
 
 def reset_database():
     """Reset the database by dropping and recreating it."""
+    if is_sqlite():
+        # The database file plus its WAL and shared-memory files
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(DB_SQLITE_PATH + suffix):
+                os.remove(DB_SQLITE_PATH + suffix)
+        print(f"Database {DB_SQLITE_PATH} dropped.")
+        return initialize_database()
+
     config_without_db = DB_CONFIG.copy()
     config_without_db.pop('database', None)
 
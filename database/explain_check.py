@@ -0,0 +1,135 @@
+# 🩺 Query plan checker for the registered hot queries
+"""
+Runs EXPLAIN (EXPLAIN QUERY PLAN on SQLite) on every SELECT in
+database/queries.py and exits non-zero when one of them scans a whole table.
+
+Usage (from the repository root):
+    python database/explain_check.py
+    python database/explain_check.py --strict   # also fail when MySQL ignores a usable index
+"""
+
+import argparse
+import sys
+import os
+from datetime import datetime
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.db_config import get_db_connection, is_sqlite
+from database.queries import HOT_QUERIES, TRANSACTION_VARIANTS, date_range_start, transaction_query, cursor_params
+
+# Representative parameters for each registered hot query
+SAMPLE_PARAMS = {
+    'active_account_balance': (1,),
+    'owned_account_balance': (1, 1),
+    'primary_account_balance': (1,),
+    'lock_account_balance': (1,),
+    'primary_account_id': (1,),
+    'receiver_by_account_number': ('1234567890',),
+    'account_ids_by_customer': (1,),
+    'customer_by_id': (1,),
+    'employment_by_customer': (1,),
+    'count_loans': (1,),
+    'count_loans_by_status': (1, 'Active'),
+    'count_payments': (1,),
+    'count_payments_by_status': (1, 'On-Time'),
+    'count_transactions': (1,),
+    'customer_versions': (0, 1),
+    'transactions_by_ids': (1, 2),
+    'ledger_accounts': (1, 2),
+    'customer_names': (1, 2),
+    'summary_stats': (1,),
+    'summary_stats_since': (1, date_range_start('month').date()),
+    'avg_transaction_amount_by_type': (1, 'Credit'),
+}
+SAMPLE_SEARCH_WORDS = ['grocery', 'store', 'payment', 'online']
+
+
+def explained_queries():
+    """Yield (name, sql, params) for every SELECT that should be index-driven"""
+    for name, sql in HOT_QUERIES.items():
+        if sql.lstrip().upper().startswith('SELECT'):
+            yield name, sql, SAMPLE_PARAMS.get(name)
+
+    # Every pre-rendered /api/transactions and export variant, with the parameters transaction_query builds
+    type_filters = {None: 'all', 'transaction_type': 'credit', 'category': 'transfer'}
+    for shape, has_date, type_column, terms in TRANSACTION_VARIANTS:
+        search = ' '.join(SAMPLE_SEARCH_WORDS[:terms])
+        sql, params = transaction_query(shape, 1, 'month' if has_date else 'all', type_filters[type_column], search)
+        if shape in ('page', 'page_ranked', 'listing'):
+            params.extend([20, 0])
+        elif shape == 'page_after':
+            params.extend(cursor_params((datetime.now(), 10 ** 9)) + [20])
+        name = ':'.join(['transactions', shape] + (['date'] if has_date else []) +
+                        ([type_column] if type_column else []) + ([f'search{terms}'] if terms else []))
+        yield name, sql, params
+
+
+def full_scans(cursor, sql, params, strict=False):
+    """Plan lines for `sql` that read a whole table (or a whole index)"""
+    if is_sqlite():
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        # SEARCH uses an index for the lookup; SCAN walks every row. Scans of a
+        # derived table (subquery) only read rows its own plan already fetched.
+        plan = [row[3] for row in cursor.fetchall()]
+        derived = {line.split(' ', 1)[1] for line in plan if line.startswith(('MATERIALIZE ', 'CO-ROUTINE '))}
+        return [line for line in plan if line.startswith('SCAN ') and line[5:] not in derived]
+
+    cursor.execute('EXPLAIN ' + sql, params)
+    columns = [desc[0] for desc in cursor.description]
+    problems = []
+    for row in cursor.fetchall():
+        plan = dict(zip(columns, row))
+        if plan['type'] not in ('ALL', 'index') or str(plan['table']).startswith('<derived'):
+            continue
+        # On small tables MySQL may prefer a scan even though an index exists
+        if plan['possible_keys'] and not strict:
+            continue
+        problems.append(f"{plan['table']}: type={plan['type']} possible_keys={plan['possible_keys']} rows={plan['rows']}")
+    return problems
+
+
+def check_query_plans(strict=False):
+    """Print a plan report and return the number of failing queries"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    failures = 0
+
+    try:
+        for name, sql, params in explained_queries():
+            if params is None:
+                print(f"FAIL  {name}: no entry in SAMPLE_PARAMS")
+                failures += 1
+                continue
+            try:
+                problems = full_scans(cursor, sql, params, strict)
+            except Exception as e:
+                print(f"FAIL  {name}: {e}")
+                failures += 1
+                continue
+
+            if problems:
+                failures += 1
+                print(f"FAIL  {name}")
+                for problem in problems:
+                    print(f"        {problem}")
+            else:
+                print(f"ok    {name}")
+    finally:
+        cursor.close()
+        conn.close()
+
+    return failures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Fail when a hot query does a full table scan')
+    parser.add_argument('--strict', action='store_true',
+                        help='on MySQL, also fail when a usable index exists but the optimizer scans anyway')
+    args = parser.parse_args()
+
+    failures = check_query_plans(strict=args.strict)
+    if failures:
+        print(f"{failures} quer{'y' if failures == 1 else 'ies'} with full table scans.")
+        sys.exit(1)
+    print("All hot queries use indexes.")
@@ -0,0 +1,217 @@
+# 📤 Streaming transaction exports (CSV, HTML, PDF)
+"""
+Exports are produced as generators: rows come off an unbuffered cursor in
+DB_STREAM_BATCH_ROWS batches (then from archived months, one month at a
+time), each batch is formatted and handed to the response as soon as it is
+ready, and optionally gzip-compressed on the way out. Memory stays at about
+one batch whatever the size of the export, and the header goes out before
+the query has produced its first row.
+
+The PDF statement is written the same way: each page is emitted as soon as
+it is full, with only the object offsets kept for the final cross-reference
+table. It uses the built-in Courier/Helvetica fonts, so no PDF library is
+needed.
+"""
+import csv
+import io
+import os
+import zlib
+from html import escape
+
+from config.db_config import iter_rows, DB_STREAM_BATCH_ROWS
+from database.queries import fetch_all, transaction_query, date_range_start, TRANSACTION_TYPE_FILTERS
+from database.archive import archive_files, iter_archived_transactions
+
+EXPORT_GZIP = os.environ.get('EXPORT_GZIP', 'true').lower() == 'true'  # when the client accepts it
+EXPORT_GZIP_LEVEL = int(os.environ.get('EXPORT_GZIP_LEVEL', 6))
+
+EXPORT_HEADER = ['Date', 'Type', 'Amount', 'Merchant', 'Category', 'Description']
+
+
+def export_rows(conn, customer_id, date_range='all', transaction_type='all', search=''):
+    """Yield batches of export-shape rows: the live table newest first, then archived months."""
+    export_query, export_params = transaction_query('export', customer_id, date_range, transaction_type, search)
+    yield from iter_rows(conn, export_query, export_params)
+
+    # Months moved to cold storage (database/partitions.py archive) are still exported
+    start = date_range_start(date_range)
+    if not archive_files(start):
+        return
+    account_ids = [row[0] for row in fetch_all(conn, 'account_ids_by_customer', (customer_id,))]
+    batch = []
+    for row in iter_archived_transactions(account_ids, start, TRANSACTION_TYPE_FILTERS.get(transaction_type), search):
+        batch.append(row)
+        if len(batch) >= DB_STREAM_BATCH_ROWS:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _format_date(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else ''
+
+
+def _drain(buffer):
+    text = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return text
+
+
+def csv_chunks(batches):
+    """CSV text, one chunk for the header and one per batch of rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_HEADER)
+    yield _drain(buffer)
+    for batch in batches:
+        writer.writerows([_format_date(row[0]), row[1], f"{row[2]:.2f}", row[3] or '', row[4] or '', row[5] or '']
+                         for row in batch)
+        yield _drain(buffer)
+
+
+def html_chunks(batches):
+    """The HTML table export, one chunk for the header and one per batch of rows.
+
+    Every cell is escaped: merchant and description come from QR receiver
+    names and transfer remarks, and the file outlives the request.
+    """
+    yield """
+        <html>
+        <head><title>Transaction History</title></head>
+        <body>
+        <h1>Transaction History</h1>
+        <table border="1">
+        <tr><th>Date</th><th>Type</th><th>Amount</th><th>Merchant</th><th>Category</th><th>Description</th></tr>
+        """
+    for batch in batches:
+        yield ''.join(f"""
+            <tr>
+            <td>{escape(_format_date(row[0]))}</td>
+            <td>{escape(str(row[1] or ''))}</td>
+            <td>₹{row[2]:.2f}</td>
+            <td>{escape(row[3] or '')}</td>
+            <td>{escape(row[4] or '')}</td>
+            <td>{escape(row[5] or '')}</td>
+            </tr>
+            """ for row in batch)
+    yield "</table></body></html>"
+
+
+PDF_PAGE_SIZE = (595, 842)  # A4 portrait, in points
+PDF_MARGIN = 40
+PDF_FONT_SIZE = 8
+PDF_LEADING = 11
+# (heading, characters) of the fixed-width Courier columns; 105 characters fit the A4 text width
+PDF_COLUMNS = (('Date', 20), ('Type', 7), ('Amount', 13), ('Merchant', 20), ('Category', 14), ('Description', 31))
+PDF_ROWS_PER_PAGE = (PDF_PAGE_SIZE[1] - 2 * PDF_MARGIN - 3 * PDF_LEADING) // PDF_LEADING - 2
+
+
+def _pdf_string(text):
+    """PDF literal string body for `text` (WinAnsi; characters outside Latin-1 become '?')."""
+    text = text.replace('₹', 'Rs.').encode('latin-1', 'replace').decode('latin-1')
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def _pdf_line(values):
+    cells = []
+    for (heading, width), value in zip(PDF_COLUMNS, values):
+        value = str(value)[:width - 1]
+        cells.append(value.rjust(width - 2) + '  ' if heading == 'Amount' else value.ljust(width))
+    return ''.join(cells).rstrip()
+
+
+class PDFStatementWriter:
+    """Incremental PDF writer: pages go out as they are added, the page tree and xref at the end."""
+
+    # Object numbers fixed up front; pages take two objects each from 5 on
+    CATALOG, PAGES, BODY_FONT, TITLE_FONT = 1, 2, 3, 4
+
+    def __init__(self, title):
+        self.title = title
+        self.offsets = {}
+        self.position = 0
+        self.page_ids = []
+
+    def _object(self, number, body):
+        self.offsets[number] = self.position
+        data = b'%d 0 obj\n' % number + body + b'\nendobj\n'
+        self.position += len(data)
+        return data
+
+    def start(self):
+        header = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+        self.position = len(header)
+        return header + b''.join([
+            self._object(self.CATALOG, b'<< /Type /Catalog /Pages %d 0 R >>' % self.PAGES),
+            self._object(self.BODY_FONT, b'<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>'),
+            self._object(self.TITLE_FONT, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>'),
+        ])
+
+    def page(self, lines):
+        """A page holding the column header and up to PDF_ROWS_PER_PAGE formatted row lines."""
+        width, height = PDF_PAGE_SIZE
+        top = height - PDF_MARGIN
+        number = len(self.page_ids) + 1
+        text = [
+            f'BT /F2 12 Tf {PDF_MARGIN} {top} Td ({_pdf_string(self.title)}) Tj ET',
+            f'BT /F1 {PDF_FONT_SIZE} Tf {PDF_LEADING} TL {PDF_MARGIN} {top - 2 * PDF_LEADING} Td',
+            f'({_pdf_string(_pdf_line(heading for heading, _ in PDF_COLUMNS))}) Tj',
+            f"T* ({'-' * sum(width for _, width in PDF_COLUMNS)}) Tj",
+        ]
+        text += [f'T* ({_pdf_string(line)}) Tj' for line in lines]
+        text += ['ET', f'BT /F1 {PDF_FONT_SIZE} Tf {PDF_MARGIN} {PDF_MARGIN // 2} Td (Page {number}) Tj ET']
+        content = zlib.compress('\n'.join(text).encode('latin-1'))
+
+        content_id = 5 + 2 * len(self.page_ids)
+        page_id = content_id + 1
+        self.page_ids.append(page_id)
+        return (self._object(content_id, b'<< /Length %d /Filter /FlateDecode >>\nstream\n' % len(content)
+                             + content + b'\nendstream')
+                + self._object(page_id, (f'<< /Type /Page /Parent {self.PAGES} 0 R /MediaBox [0 0 {width} {height}] '
+                                         f'/Resources << /Font << /F1 {self.BODY_FONT} 0 R /F2 {self.TITLE_FONT} 0 R >> >> '
+                                         f'/Contents {content_id} 0 R >>').encode()))
+
+    def finish(self):
+        """Page tree, cross-reference table and trailer."""
+        kids = ' '.join(f'{page_id} 0 R' for page_id in self.page_ids)
+        data = self._object(self.PAGES, f'<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>'.encode())
+        xref_at = self.position
+        count = max(self.offsets) + 1
+        entries = [b'0000000000 65535 f \n'] + [b'%010d 00000 n \n' % self.offsets[number] for number in range(1, count)]
+        return data + (b'xref\n0 %d\n' % count + b''.join(entries)
+                       + b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (count, self.CATALOG, xref_at))
+
+
+def pdf_chunks(batches, title='Transaction History'):
+    """Paginated PDF statement as bytes, one chunk for the preamble and one per finished page."""
+    writer = PDFStatementWriter(title)
+    yield writer.start()
+    lines = []
+    for batch in batches:
+        for row in batch:
+            lines.append(_pdf_line([_format_date(row[0]), row[1], f"Rs.{row[2]:.2f}",
+                                    row[3] or '', row[4] or '', row[5] or '']))
+            if len(lines) == PDF_ROWS_PER_PAGE:
+                yield writer.page(lines)
+                lines = []
+    if lines or not writer.page_ids:
+        yield writer.page(lines)
+    yield writer.finish()
+
+
+def encode_chunks(chunks):
+    for chunk in chunks:
+        if chunk:
+            yield chunk.encode('utf-8')
+
+
+def gzip_chunks(chunks, level=EXPORT_GZIP_LEVEL):
+    """gzip stream of text chunks, flushed after each so every batch reaches the client right away."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8')) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,229 @@
+# 🧾 Background export jobs (CSV, HTML statement, paginated PDF)
+"""
+Large exports run on a small local worker pool instead of inside the
+request. submit() records the job and queues it; a worker streams the rows
+(database/export.py) into EXPORT_DIR/<job id>.<ext>.tmp chunk by chunk and
+renames it once complete. Job state is kept as EXPORT_DIR/<job id>.json, so
+any app process sharing the directory can report status and serve the
+download.
+
+Limits: EXPORT_WORKERS jobs run at once per process, each customer may have
+EXPORT_MAX_ACTIVE_PER_CUSTOMER queued or running jobs, and at most
+EXPORT_MAX_QUEUED jobs wait in total. Artifacts older than
+EXPORT_ARTIFACT_TTL are removed by cleanup(), which submit() runs at most
+every EXPORT_CLEANUP_INTERVAL seconds.
+
+Every job ends 'done' or 'failed', which frees its slot: a worker that
+cannot get a connection fails the job, and jobs still queued when
+shutdown_export_workers() stops the pool are marked failed.
+"""
+import glob
+import json
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from config.db_config import get_db_connection
+from database.export import export_rows, csv_chunks, html_chunks, pdf_chunks
+
+EXPORT_DIR = os.environ.get('EXPORT_DIR', 'exports')
+EXPORT_WORKERS = int(os.environ.get('EXPORT_WORKERS', 2))
+EXPORT_MAX_ACTIVE_PER_CUSTOMER = int(os.environ.get('EXPORT_MAX_ACTIVE_PER_CUSTOMER', 2))
+EXPORT_MAX_QUEUED = int(os.environ.get('EXPORT_MAX_QUEUED', 50))
+EXPORT_ARTIFACT_TTL = float(os.environ.get('EXPORT_ARTIFACT_TTL', 24 * 3600))  # seconds
+EXPORT_CLEANUP_INTERVAL = float(os.environ.get('EXPORT_CLEANUP_INTERVAL', 300))  # seconds
+
+# format -> (chunk generator over row batches, yields bytes?, mimetype, file extension)
+EXPORT_FORMATS = {
+    'csv': (csv_chunks, False, 'text/csv', 'csv'),
+    'html': (html_chunks, False, 'text/html', 'html'),
+    'pdf': (pdf_chunks, True, 'application/pdf', 'pdf'),
+}
+ACTIVE_STATUSES = ('queued', 'running')
+
+_executor = None
+_jobs = {}  # job_id -> job dict, for jobs queued or running in this process
+_lock = threading.Lock()
+_last_cleanup = [0.0]
+
+
+class ExportLimitError(Exception):
+    """Raised by submit() when a concurrency limit rejects the job."""
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(EXPORT_WORKERS, thread_name_prefix='export')
+    return _executor
+
+
+def shutdown_export_workers():
+    """Stop the worker pool: running exports finish, queued ones are cancelled and marked failed."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+    finished_at = datetime.now().isoformat(timespec='seconds')
+    with _lock:
+        # Still 'queued' here means no worker took the job (_start() checks under the same lock)
+        cancelled = [job for job in _jobs.values() if job['status'] == 'queued']
+        for job in cancelled:
+            job.update(status='failed', error='The server stopped before the export started, please request it again',
+                       finished_at=finished_at)
+            del _jobs[job['job_id']]
+        snapshots = [dict(job) for job in cancelled]
+    for snapshot in snapshots:
+        _save(snapshot)
+
+
+def _job_path(job_id, suffix):
+    return os.path.join(EXPORT_DIR, f'{job_id}.{suffix}')
+
+
+def _save(job):
+    """Write the job's state file atomically."""
+    path = _job_path(job['job_id'], 'json')
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(job, f)
+    os.replace(path + '.tmp', path)
+
+
+def _update(job, **changes):
+    with _lock:
+        job.update(changes)
+        snapshot = dict(job)
+    _save(snapshot)
+
+
+def submit(customer_id, export_format, date_range='all', transaction_type='all', search=''):
+    """Queue an export and return its job dict; ExportLimitError when a limit is reached."""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f'export format must be one of: {", ".join(EXPORT_FORMATS)}')
+    cleanup_if_due()
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+
+    job = {
+        'job_id': secrets.token_urlsafe(16),
+        'customer_id': customer_id,
+        'format': export_format,
+        'filters': {'date_range': date_range, 'transaction_type': transaction_type, 'search': search},
+        'status': 'queued',
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'started_at': None,
+        'finished_at': None,
+        'rows': 0,
+        'bytes': 0,
+        'error': None,
+    }
+    with _lock:
+        active = [other for other in _jobs.values() if other['status'] in ACTIVE_STATUSES]
+        if len(active) >= EXPORT_MAX_QUEUED:
+            raise ExportLimitError('Too many exports in progress, please try again shortly')
+        if sum(other['customer_id'] == customer_id for other in active) >= EXPORT_MAX_ACTIVE_PER_CUSTOMER:
+            raise ExportLimitError(f'At most {EXPORT_MAX_ACTIVE_PER_CUSTOMER} exports can run at once')
+        _jobs[job['job_id']] = job
+    _save(job)
+    get_executor().submit(_run, job)
+    return dict(job)
+
+
+def _counted(batches, job):
+    for batch in batches:
+        with _lock:
+            job['rows'] += len(batch)
+        yield batch
+
+
+def _start(job):
+    """Mark a queued job running; False when shutdown_export_workers() already failed it."""
+    with _lock:
+        if job['status'] != 'queued':
+            return False
+        job.update(status='running', started_at=datetime.now().isoformat(timespec='seconds'))
+        snapshot = dict(job)
+    _save(snapshot)
+    return True
+
+
+def _run(job):
+    """Worker: stream the export into its artifact file, then mark the job done or failed."""
+    formatter, binary, _, extension = EXPORT_FORMATS[job['format']]
+    path = _job_path(job['job_id'], extension)
+    if not _start(job):
+        return
+    conn = None
+    try:
+        # Inside the try: a pool timeout must fail the job and free its slot like any other error
+        conn = get_db_connection()
+        filters = job['filters']
+        batches = _counted(export_rows(conn, job['customer_id'], filters['date_range'],
+                                       filters['transaction_type'], filters['search']), job)
+        with open(path + '.tmp', 'wb') as f:
+            for chunk in formatter(batches):
+                f.write(chunk if binary else chunk.encode('utf-8'))
+        os.replace(path + '.tmp', path)
+        _update(job, status='done', bytes=os.path.getsize(path),
+                finished_at=datetime.now().isoformat(timespec='seconds'))
+    except Exception as e:
+        if os.path.exists(path + '.tmp'):
+            os.remove(path + '.tmp')
+        _update(job, status='failed', error=str(e), finished_at=datetime.now().isoformat(timespec='seconds'))
+    finally:
+        if conn is not None:
+            conn.close()
+        with _lock:
+            _jobs.pop(job['job_id'], None)
+
+
+def get_job(job_id):
+    """Job dict by id (from this process, or the state file another process wrote), or None."""
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is not None:
+            return dict(job)
+    # Ids are token_urlsafe, so anything else cannot name a state file
+    if not job_id or not all(c.isalnum() or c in '-_' for c in job_id):
+        return None
+    try:
+        with open(_job_path(job_id, 'json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def artifact(job):
+    """(path, mimetype, download name) of a finished job's file."""
+    _, _, mimetype, extension = EXPORT_FORMATS[job['format']]
+    return _job_path(job['job_id'], extension), mimetype, f'transactions.{extension}'
+
+
+def cleanup(max_age=EXPORT_ARTIFACT_TTL):
+    """Delete artifacts, leftovers and state files older than `max_age` seconds; returns files removed."""
+    cutoff = time.time() - max_age
+    with _lock:
+        running = set(_jobs)
+    removed = 0
+    for path in glob.glob(os.path.join(EXPORT_DIR, '*')):
+        if os.path.basename(path).split('.', 1)[0] in running:
+            continue
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass  # removed by another process meanwhile
+    return removed
+
+
+def cleanup_if_due():
+    with _lock:
+        if time.monotonic() - _last_cleanup[0] < EXPORT_CLEANUP_INTERVAL:
+            return
+        _last_cleanup[0] = time.monotonic()
+    cleanup()
@@ -0,0 +1,341 @@
+# 🏭 High-volume synthetic data generator and bulk loader for load testing
+"""
+Generates customers, accounts, employment_info, loans, payments, transactions
+and loan_applications with realistic distributions and bulk-loads them, a
+block of customers at a time so memory stays flat at any volume.
+
+Loading uses chunked executemany (MySQL and SQLite) or, on MySQL,
+LOAD DATA LOCAL INFILE from CSV chunks streamed to a temp file. Every chunk
+is committed separately and progress/throughput is reported as it goes.
+
+Usage (from the repository root):
+    python database/generate_data.py --customers 10000
+    python database/generate_data.py --customers 1000000 --transactions-per-account 65 --method infile
+"""
+
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mysql.connector
+from config.db_config import DB_CONFIG, get_db_connection, is_sqlite
+from database import customer_versions, search_index
+from database.daily_summary import backfill
+
+# Same hash as the sample data users
+PASSWORD_HASH = '$2b$12$SSwbWv5qZniJPKrYwLXTS.5B2IuwYELvrh3Hr/./LDqzpGJF0py56'
+
+FIRST_NAMES = ['Aarav', 'Vivaan', 'Aditya', 'Vihaan', 'Arjun', 'Sai', 'Reyansh', 'Krishna', 'Ishaan', 'Rohan',
+               'Ananya', 'Diya', 'Priya', 'Isha', 'Kavya', 'Meera', 'Anjali', 'Pooja', 'Neha', 'Sneha',
+               'John', 'Jane', 'Rahul', 'Vikram', 'Sandeep', 'Kiran', 'Amit', 'Sunita', 'Deepak', 'Lakshmi']
+LAST_NAMES = ['Sharma', 'Patel', 'Singh', 'Kumar', 'Gupta', 'Joshi', 'Desai', 'Reddy', 'Agarwal', 'More',
+              'Iyer', 'Nair', 'Mehta', 'Shah', 'Rao', 'Das', 'Bose', 'Khan', 'Verma', 'Pillai']
+CITIES = ['Mumbai', 'Delhi', 'Bengaluru', 'Pune', 'Chennai', 'Hyderabad', 'Kolkata', 'Ahmedabad', 'Jaipur', 'Kochi']
+BANKS = [('BankOne', 'BKON'), ('BankTwo', 'BKTW'), ('SecureBank', 'SBIN'), ('BankThree', 'BKTH'), ('BankFour', 'BKFR')]
+
+# (merchant, category, transaction_type, relative frequency, median amount)
+MERCHANTS = [
+    ('Salary Credit', 'Income', 'Credit', 4, 60000),
+    ('Interest Credit', 'Income', 'Credit', 1, 400),
+    ('Refund', 'Shopping', 'Credit', 1, 900),
+    ('BigBasket', 'Groceries', 'Debit', 10, 1800),
+    ('DMart', 'Groceries', 'Debit', 8, 2200),
+    ('Swiggy', 'Food', 'Debit', 12, 450),
+    ('Zomato', 'Food', 'Debit', 10, 500),
+    ('Amazon', 'Shopping', 'Debit', 9, 1500),
+    ('Flipkart', 'Shopping', 'Debit', 6, 2000),
+    ('Indian Oil', 'Fuel', 'Debit', 6, 2500),
+    ('Uber', 'Travel', 'Debit', 6, 350),
+    ('IRCTC', 'Travel', 'Debit', 2, 1800),
+    ('Electricity Board', 'Utilities', 'Debit', 3, 2100),
+    ('Airtel', 'Utilities', 'Debit', 3, 700),
+    ('Apollo Pharmacy', 'Healthcare', 'Debit', 3, 800),
+    ('Netflix', 'Entertainment', 'Debit', 2, 649),
+    ('Money Transfer', 'Transfer', 'Debit', 5, 5000),
+    ('Money Transfer', 'Transfer', 'Credit', 3, 5000),
+]
+
+# Tables in foreign-key order with the columns the loader writes
+TABLE_COLUMNS = {
+    'customers': ['customer_id', 'full_name', 'dob', 'gender', 'national_id', 'email', 'password_hash', 'phone', 'address', 'created_at'],
+    'accounts': ['account_id', 'customer_id', 'account_number', 'bank_name', 'ifsc_code', 'account_type', 'balance', 'opened_date', 'status', 'is_primary'],
+    'employment_info': ['customer_id', 'employer_name', 'job_title', 'annual_income', 'years_at_job', 'employment_type'],
+    'loans': ['loan_id', 'customer_id', 'loan_type', 'principal_amount', 'interest_rate', 'issue_date', 'due_date', 'status'],
+    'payments': ['loan_id', 'payment_date', 'amount_paid', 'payment_status'],
+    'transactions': ['account_id', 'customer_id', 'transaction_date', 'transaction_type', 'amount', 'merchant', 'category', 'description',
+                     'transfer_type', 'reference_number', 'status', 'initiated_at', 'completed_at'],
+    'loan_applications': ['customer_id', 'loan_type', 'requested_amount', 'tenure_months', 'purpose', 'employment_type',
+                          'employer_name', 'monthly_income', 'existing_loans', 'existing_emi', 'application_status',
+                          'credit_score_at_application', 'applied_date'],
+}
+
+
+def _pick(rng, values, size, weights=None):
+    """Vectorised choice over a Python list, returned as a list."""
+    p = None if weights is None else np.asarray(weights, dtype=float) / sum(weights)
+    return [values[i] for i in rng.choice(len(values), size=size, p=p)]
+
+
+def _dates(rng, start, end, size):
+    """Uniformly distributed datetimes between `start` and `end`."""
+    seconds = rng.integers(0, int((end - start).total_seconds()), size=size)
+    return [start + timedelta(seconds=int(s)) for s in seconds]
+
+
+class DataGenerator:
+    """Builds one block of customers with all their dependent rows."""
+
+    def __init__(self, seed, transactions_per_account, history_days, start_ids):
+        self.rng = np.random.default_rng(seed)
+        self.transactions_per_account = transactions_per_account
+        self.now = datetime.now().replace(microsecond=0)
+        self.history_start = self.now - timedelta(days=history_days)
+        self.next_customer_id, self.next_account_id, self.next_loan_id = start_ids
+
+    def block(self, n_customers):
+        """Rows for `n_customers` new customers, keyed by table in load order."""
+        rng, now = self.rng, self.now
+        customer_ids = list(range(self.next_customer_id, self.next_customer_id + n_customers))
+        self.next_customer_id += n_customers
+
+        # Customers: ages 21-70, signed up over the last five years
+        first = _pick(rng, FIRST_NAMES, n_customers)
+        last = _pick(rng, LAST_NAMES, n_customers)
+        ages = rng.integers(21, 71, size=n_customers)
+        created = _dates(rng, now - timedelta(days=5 * 365), now, n_customers)
+        customers = [
+            (cid, f'{f} {l}', (now - timedelta(days=int(age) * 365 + int(rng.integers(0, 365)))).date(),
+             gender, f'SYN{cid:010d}', f'{f.lower()}.{l.lower()}.{cid}@example.com', PASSWORD_HASH,
+             f'8{cid:09d}', f'{cid % 999 + 1} {l} Road, {city}', created_at)
+            for cid, f, l, age, gender, city, created_at in zip(
+                customer_ids, first, last, ages, _pick(rng, ['Male', 'Female', 'Other'], n_customers, [49, 49, 2]),
+                _pick(rng, CITIES, n_customers), created)
+        ]
+
+        # Employment: log-normal income around 6 lakh a year
+        employment_types = _pick(rng, ['Salaried', 'Self-Employed', 'Unemployed'], n_customers, [70, 24, 6])
+        incomes = rng.lognormal(np.log(600000), 0.6, size=n_customers)
+        employment_info = [
+            (cid, None if etype == 'Unemployed' else f'{_pick(rng, LAST_NAMES, 1)[0]} Industries',
+             None if etype == 'Unemployed' else _pick(rng, ['Engineer', 'Analyst', 'Manager', 'Consultant', 'Owner'], 1)[0],
+             0.0 if etype == 'Unemployed' else round(float(income), 2), int(rng.integers(0, 25)), etype)
+            for cid, etype, income in zip(customer_ids, employment_types, incomes)
+        ]
+
+        # Accounts: 1-3 per customer, the first one is primary
+        accounts_per_customer = rng.choice([1, 2, 3], size=n_customers, p=[0.6, 0.3, 0.1])
+        accounts = []
+        for cid, count in zip(customer_ids, accounts_per_customer):
+            for i in range(count):
+                aid = self.next_account_id
+                self.next_account_id += 1
+                bank, code = BANKS[aid % len(BANKS)]
+                accounts.append((aid, cid, f'5{aid:011d}', bank, f'{code}0{aid % 1000000:06d}',
+                                 _pick(rng, ['Savings', 'Current', 'Credit'], 1, [70, 25, 5])[0],
+                                 round(float(rng.lognormal(np.log(40000), 1.0)), 2),
+                                 _dates(rng, now - timedelta(days=8 * 365), now - timedelta(days=30), 1)[0].date(),
+                                 'Active' if rng.random() < 0.97 else 'Closed', int(i == 0)))
+
+        # Loans: Poisson(0.6) per customer, with monthly payment history
+        loans, payments = [], []
+        for cid, count in zip(customer_ids, rng.poisson(0.6, size=n_customers)):
+            for _ in range(count):
+                lid = self.next_loan_id
+                self.next_loan_id += 1
+                loan_type = _pick(rng, ['Personal', 'Mortgage', 'Auto', 'Education', 'CreditCard'], 1, [35, 15, 20, 10, 20])[0]
+                principal = round(float(rng.lognormal(np.log(300000 if loan_type == 'Mortgage' else 80000), 0.5)), 2)
+                issue = _dates(rng, now - timedelta(days=6 * 365), now - timedelta(days=30), 1)[0].date()
+                term_months = int(rng.choice([12, 24, 36, 60, 120]))
+                status = _pick(rng, ['Active', 'Closed', 'Defaulted'], 1, [70, 25, 5])[0]
+                loans.append((lid, cid, loan_type, principal, round(float(rng.uniform(7, 16)), 2), issue,
+                              issue + timedelta(days=term_months * 30), status))
+
+                paid_months = min(term_months, (now.date() - issue).days // 30, 36)
+                if paid_months:
+                    statuses = _pick(rng, ['On-Time', 'Late', 'Missed'], paid_months,
+                                     [60, 25, 15] if status == 'Defaulted' else [88, 9, 3])
+                    emi = round(principal / term_months * 1.08, 2)
+                    payments.extend((lid, issue + timedelta(days=30 * (m + 1)), 0.0 if s == 'Missed' else emi, s)
+                                    for m, s in enumerate(statuses))
+
+        # Transactions: Poisson count per account, merchant mix and log-normal amounts
+        weights = np.array([m[3] for m in MERCHANTS], dtype=float)
+        weights /= weights.sum()
+        transactions = []
+        for account in accounts:
+            count = int(rng.poisson(self.transactions_per_account))
+            if not count:
+                continue
+            picks = rng.choice(len(MERCHANTS), size=count, p=weights)
+            amounts = rng.lognormal(0, 0.5, size=count)
+            dates = _dates(rng, max(self.history_start, datetime.combine(account[7], datetime.min.time())), now, count)
+            for merchant_index, factor, when in zip(picks, amounts, dates):
+                merchant, category, ttype, _, median = MERCHANTS[merchant_index]
+                is_transfer = category == 'Transfer'
+                transactions.append((
+                    account[0], account[1], when, ttype, round(median * float(factor), 2), merchant, category,
+                    f'{merchant} {"payment" if ttype == "Debit" else "credit"}',
+                    'IMPS' if is_transfer else None,
+                    f'SYN{account[0]:010d}{when:%y%m%d%H%M%S}' if is_transfer else None,
+                    'Completed' if is_transfer else None,
+                    when if is_transfer else None, when if is_transfer else None,
+                ))
+
+        # Loan applications: about one customer in three has applied
+        loan_applications = []
+        for cid, employment in zip(customer_ids, employment_info):
+            if rng.random() >= 0.3:
+                continue
+            loan_type = _pick(rng, ['Personal', 'Home', 'Car', 'Education', 'Business', 'Credit'], 1)[0]
+            monthly_income = round(employment[3] / 12, 2)
+            loan_applications.append((
+                cid, loan_type, round(float(rng.lognormal(np.log(200000), 0.7)), 2), int(rng.choice([12, 24, 36, 60])),
+                f'{loan_type} loan', 'Salaried' if employment[5] == 'Salaried' else 'Self-Employed',
+                employment[1], monthly_income, 0.0, 0.0,
+                _pick(rng, ['Pending', 'Under Review', 'Approved', 'Rejected', 'Cancelled'], 1, [20, 15, 40, 20, 5])[0],
+                int(np.clip(rng.normal(680, 80), 300, 900)), _dates(rng, now - timedelta(days=730), now, 1)[0],
+            ))
+
+        return {
+            'customers': customers,
+            'accounts': accounts,
+            'employment_info': employment_info,
+            'loans': loans,
+            'payments': payments,
+            'transactions': transactions,
+            'loan_applications': loan_applications,
+        }
+
+
+class BulkLoader:
+    """Loads row blocks with chunked executemany or LOAD DATA LOCAL INFILE, committing per chunk."""
+
+    def __init__(self, method, chunk_size):
+        self.method = method
+        self.chunk_size = chunk_size
+        self.loaded = {table: 0 for table in TABLE_COLUMNS}
+        self.seconds = {table: 0.0 for table in TABLE_COLUMNS}
+
+        if method == 'infile':
+            # Pooled connections do not enable LOCAL INFILE
+            self.conn = mysql.connector.connect(**DB_CONFIG, allow_local_infile=True)
+        else:
+            self.conn = get_db_connection()
+        self.cursor = self.conn.cursor()
+
+        # The generator keeps keys consistent, so skip per-row checks while loading
+        if is_sqlite():
+            self.cursor.execute('PRAGMA foreign_keys=OFF')
+            self.cursor.execute('PRAGMA synchronous=OFF')
+        else:
+            self.cursor.execute('SET SESSION unique_checks = 0, foreign_key_checks = 0')
+
+    def next_ids(self):
+        """First free customer, account and loan ids, so runs can be appended."""
+        ids = []
+        for table, column in (('customers', 'customer_id'), ('accounts', 'account_id'), ('loans', 'loan_id')):
+            self.cursor.execute(f'SELECT MAX({column}) FROM {table}')
+            ids.append((self.cursor.fetchall()[0][0] or 0) + 1)
+        return ids
+
+    def load(self, table, rows):
+        columns = TABLE_COLUMNS[table]
+        start = time.perf_counter()
+        for offset in range(0, len(rows), self.chunk_size):
+            chunk = rows[offset:offset + self.chunk_size]
+            if self.method == 'infile':
+                self._load_infile(table, columns, chunk)
+            else:
+                placeholders = ', '.join(['%s'] * len(columns))
+                self.cursor.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", chunk)
+            self.conn.commit()
+            self.loaded[table] += len(chunk)
+        self.seconds[table] += time.perf_counter() - start
+
+    def _load_infile(self, table, columns, rows):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', newline='', encoding='utf-8', delete=False) as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerows(['\\N' if value is None else value for value in row] for row in rows)
+            path = f.name
+        try:
+            self.cursor.execute(
+                f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} "
+                "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' "
+                f"LINES TERMINATED BY '\\n' ({', '.join(columns)})", (path,))
+        finally:
+            os.remove(path)
+
+    def close(self):
+        if not is_sqlite():
+            self.cursor.execute('SET SESSION unique_checks = 1, foreign_key_checks = 1')
+        else:
+            self.cursor.execute('PRAGMA foreign_keys=ON')
+            self.cursor.execute('PRAGMA synchronous=NORMAL')
+        self.cursor.close()
+        self.conn.close()
+
+
+def generate(args):
+    """Generate and load `args.customers` customers; returns the per-table row counts."""
+    loader = BulkLoader(args.method, args.chunk_size)
+    first_ids = loader.next_ids()
+    loader.cursor.execute('SELECT MAX(transaction_id) FROM transactions')
+    first_transaction_id = (loader.cursor.fetchall()[0][0] or 0) + 1
+    generator = DataGenerator(args.seed, args.transactions_per_account, args.history_days, first_ids)
+    start = time.perf_counter()
+    done = 0
+
+    try:
+        while done < args.customers:
+            n = min(args.block_size, args.customers - done)
+            for table, rows in generator.block(n).items():
+                loader.load(table, rows)
+            done += n
+
+            elapsed = time.perf_counter() - start
+            total_rows = sum(loader.loaded.values())
+            print(f"{done:>10,}/{args.customers:,} customers  {total_rows:>13,} rows  "
+                  f"{total_rows / elapsed:>10,.0f} rows/s  {elapsed:>8.1f}s", flush=True)
+    finally:
+        loader.close()
+
+    print("\nTable                 Rows        Rows/s")
+    for table, rows in loader.loaded.items():
+        rate = rows / loader.seconds[table] if loader.seconds[table] else 0
+        print(f"{table:<18} {rows:>12,} {rate:>13,.0f}")
+
+    # Bulk loads bypass the per-insert rollup, search index and ETag counter updates, so catch them up
+    print()
+    backfill(first=first_ids[1])
+    search_index.backfill(first=first_transaction_id)
+    customer_versions.invalidate_all()
+    return loader.loaded
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Generate and bulk-load synthetic credit scoring data')
+    parser.add_argument('--customers', type=int, default=10000)
+    parser.add_argument('--transactions-per-account', type=float, default=65,
+                        help='mean transactions per account (Poisson); ~100 per customer at the default')
+    parser.add_argument('--history-days', type=int, default=730, help='transaction history window')
+    parser.add_argument('--method', choices=['executemany', 'infile'], default='executemany',
+                        help='infile = LOAD DATA LOCAL INFILE (MySQL only)')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='rows per INSERT batch / commit')
+    parser.add_argument('--block-size', type=int, default=2000, help='customers generated per block')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+    if args.method == 'infile' and is_sqlite():
+        parser.error('--method infile needs MySQL')
+    return args
+
+if __name__ == "__main__":
+    generate(parse_args())
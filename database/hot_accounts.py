@@ -0,0 +1,356 @@
+# 🔥 Hot-account mode: contention-free credits for busy merchant accounts
+"""
+Every ledger transfer updates the receiver's accounts row, so an account
+that thousands of payers credit at once (a popular QR merchant) serialises
+them all on one row lock, plus its daily rollup row and customer_versions
+row. Accounts flagged in hot_accounts are credited differently: the payer's
+transaction checks the receiver's status with a plain non-locking read,
+inserts only the payer's debit row (with no counterparty_account_id, whose
+foreign key would share-lock the hot row) and appends a pending_credits row.
+Nothing it locks belongs to the hot account. A receiver closed between that
+read and the payer's commit still gets the credit, as if the payment had
+committed first.
+
+A background sweeper (start_sweeper(), every HOT_SWEEP_INTERVAL seconds)
+folds each account's pending credits into accounts.balance in batches of
+HOT_SWEEP_BATCH. In one transaction it deletes exactly the rows it read,
+adds their sum to the balance, inserts their Credit rows into transactions
+(dated like the payers' debits), points the debits at the account, adds the
+credits to account_daily_summary and the search index, and bumps the
+customers' counters, so listings and their ETags change together. Balance
+reads add the unswept amount (database/queries.py balance_sql()), so
+customers never see the difference; a debit from a hot account sweeps it
+first, so the ledger's balance check covers every credit received so far.
+
+The hot set is reloaded by the sweeper, so flagging takes effect within one
+interval in every process that runs it. Processes without a sweeper credit
+hot accounts the normal way, which is always correct, only slower.
+Sweepers in several processes are safe: a batch another one folded first
+deletes fewer rows than it read and is rolled back. Unswept credits are
+not in account_daily_summary yet, so run `sweep` before
+`python database/daily_summary.py check`.
+
+Usage (from the repository root):
+    python database/hot_accounts.py flag 1234
+    python database/hot_accounts.py unflag 1234
+    python database/hot_accounts.py list
+    python database/hot_accounts.py sweep
+"""
+
+import argparse
+import sys
+import os
+import threading
+import time
+from decimal import Decimal
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.db_config import get_db_connection, DB_ERRORS
+from database import customer_versions, search_index, transaction_events
+from database.daily_summary import rollup_statement
+from database.queries import inserted_ids
+
+HOT_SWEEP_INTERVAL = float(os.environ.get('HOT_SWEEP_INTERVAL', 1.0))  # seconds between sweeps
+HOT_SWEEP_BATCH = int(os.environ.get('HOT_SWEEP_BATCH', 1000))  # pending credits folded per transaction
+
+_HOT_IDS = '''
+    SELECT h.account_id FROM hot_accounts h JOIN accounts a ON a.account_id = h.account_id
+    WHERE a.status = 'Active'
+'''
+_PENDING_ACCOUNTS = 'SELECT DISTINCT account_id FROM pending_credits'
+# Pending credits with what their Credit rows copy from the payer's debit row
+_PENDING_ROWS = '''
+    SELECT p.credit_id, p.customer_id, p.amount, p.transaction_id, p.description, d.account_id, d.merchant,
+           d.transfer_type, d.reference_number, d.remarks, d.transaction_date, d.initiated_at
+    FROM pending_credits p
+    JOIN transactions d ON d.transaction_id = p.transaction_id
+    WHERE p.account_id = %s ORDER BY p.credit_id LIMIT %s
+'''
+_PENDING_INSERT = 'INSERT INTO pending_credits (account_id, customer_id, amount, transaction_id, description) VALUES '
+_ACTIVE = "SELECT account_id FROM accounts WHERE status = 'Active' AND account_id IN "
+_CREDIT_ROWS = '''
+    INSERT INTO transactions (account_id, customer_id, transaction_date, transaction_type, amount, merchant, category,
+                              description, counterparty_account_id, transfer_type, reference_number, status, remarks,
+                              initiated_at, completed_at)
+    VALUES '''
+_CREDIT_ROW = "(%s, %s, %s, 'Credit', %s, %s, 'Transfer', %s, %s, %s, %s, 'Completed', %s, %s, NOW())"
+
+_hot_ids = frozenset()  # replaced whole by refresh(), so readers need no lock
+_lock = threading.Lock()
+_stats = {'sweeps': 0, 'credits_swept': 0, 'amount_swept': 0.0, 'conflicts': 0, 'errors': 0, 'last_sweep_at': None}
+_sweeper = None
+_stop = threading.Event()
+
+
+def is_hot(account_id):
+    return account_id in _hot_ids
+
+
+def refresh(conn):
+    """Reload the set of active flagged accounts."""
+    global _hot_ids
+    cursor = conn.cursor()
+    try:
+        cursor.execute(_HOT_IDS)
+        _hot_ids = frozenset(row[0] for row in cursor.fetchall())
+    finally:
+        cursor.close()
+    conn.commit()
+
+
+def pending_statement(credits):
+    """(sql, params) appending (account_id, customer_id, amount, debit transaction_id, description) pending credits."""
+    return (_PENDING_INSERT + ', '.join(['(%s, %s, %s, %s, %s)'] * len(credits)),
+            [value for row in credits for value in row])
+
+
+def active_statement(account_ids):
+    """(sql, params) selecting which of these accounts are active; run it as a plain read, which
+    takes no lock on the rows (database/ledger.py read())."""
+    return _ACTIVE + f"({', '.join(['%s'] * len(account_ids))})", list(account_ids)
+
+
+def fold_statements(account_id, rows):
+    """The first statements folding these _PENDING_ROWS rows into the account, and their total.
+
+    The DELETE comes first: it must remove len(rows) rows, or another
+    sweeper folded some of them already and the batch is rolled back. The
+    last statement inserts the Credit rows, whose ids swept_statements() needs.
+    """
+    placeholders = ', '.join(['%s'] * len(rows))
+    total = sum((Decimal(str(row[2])) for row in rows), Decimal(0))
+    credit_rows = [(account_id, row[1], row[10], row[2], row[6], row[4], row[5], row[7], row[8], row[9], row[11])
+                   for row in rows]
+    return [
+        (f'DELETE FROM pending_credits WHERE credit_id IN ({placeholders})', [row[0] for row in rows]),
+        ('UPDATE accounts SET balance = balance + %s WHERE account_id = %s', (total, account_id)),
+        (_CREDIT_ROWS + ', '.join([_CREDIT_ROW] * len(rows)), [value for row in credit_rows for value in row]),
+    ], total
+
+
+def _customers(rows):
+    return sorted({row[1] for row in rows if row[1] is not None})
+
+
+def swept_statements(account_id, rows, credit_ids):
+    """The rest of the fold once the Credit rows have `credit_ids`: the debits' counterparty,
+    the rollup, the search terms and the customers' counters."""
+    placeholders = ', '.join(['%s'] * len(rows))
+    statements = [
+        (f'UPDATE transactions SET counterparty_account_id = %s WHERE transaction_id IN ({placeholders})',
+         [account_id] + [row[3] for row in rows]),
+        rollup_statement(credit_ids),
+    ]
+    sources = [(credit_id, row[1], row[6], 'Transfer', row[4]) for credit_id, row in zip(credit_ids, rows)]
+    statements.extend(search_index.insert_statements(search_index.term_rows(sources)))
+    customer_ids = _customers(rows)
+    if customer_ids:
+        statements.append(customer_versions.bump_statement('transactions', customer_ids))
+    return statements
+
+
+def _announce(rows):
+    """After commit: tell the receivers' open streams to re-fetch (their Credit rows just appeared)."""
+    customer_ids = _customers(rows)
+    if transaction_events.has_subscribers(customer_ids):
+        for customer_id in customer_ids:
+            transaction_events.publish(customer_id, 'resync', {'reason': 'hot_credit'})
+
+
+def _record(rows, total):
+    with _lock:
+        if rows is None:
+            _stats['conflicts'] += 1
+        else:
+            _stats['sweeps'] += 1
+            _stats['credits_swept'] += len(rows)
+            _stats['amount_swept'] += float(total)
+
+
+def _sweep_batch(conn, account_id, limit):
+    """Fold up to `limit` pending credits in one transaction; returns how many were read."""
+    conn.rollback()
+    cursor = conn.cursor()
+    try:
+        conn.start_transaction()
+        cursor.execute(_PENDING_ROWS, (account_id, limit))
+        rows = cursor.fetchall()
+        if not rows:
+            conn.rollback()
+            return 0
+        (delete, balance, credits), total = fold_statements(account_id, rows)
+        cursor.execute(*delete)
+        if cursor.rowcount != len(rows):
+            conn.rollback()
+            _record(None, 0)
+            return 0
+        cursor.execute(*balance)
+        cursor.execute(*credits)
+        for sql, params in swept_statements(account_id, rows, inserted_ids(cursor.lastrowid, len(rows))):
+            cursor.execute(sql, params)
+        conn.commit()
+        _record(rows, total)
+        _announce(rows)
+        return len(rows)
+    except DB_ERRORS:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def sweep_account(conn, account_id, limit=HOT_SWEEP_BATCH):
+    """Fold all of the account's pending credits into its balance; returns how many."""
+    swept = 0
+    while True:
+        count = _sweep_batch(conn, account_id, limit)
+        swept += count
+        if count < limit:
+            return swept
+
+
+async def _sweep_batch_async(conn, account_id, limit):
+    try:
+        await conn.begin()
+        rows = await conn.fetchall(_PENDING_ROWS, (account_id, limit))
+        if not rows:
+            await conn.rollback()
+            return 0
+        (delete, balance, credits), total = fold_statements(account_id, rows)
+        rowcount, _ = await conn.execute(*delete)
+        if rowcount != len(rows):
+            await conn.rollback()
+            _record(None, 0)
+            return 0
+        await conn.execute(*balance)
+        _, lastrowid = await conn.execute(*credits)
+        for sql, params in swept_statements(account_id, rows, inserted_ids(lastrowid, len(rows))):
+            await conn.execute(sql, params)
+        await conn.commit()
+        _record(rows, total)
+        _announce(rows)
+        return len(rows)
+    except Exception:
+        await conn.rollback()
+        raise
+
+
+async def sweep_account_async(conn, account_id, limit=HOT_SWEEP_BATCH):
+    """sweep_account() on a config/async_db.py connection."""
+    swept = 0
+    while True:
+        count = await _sweep_batch_async(conn, account_id, limit)
+        swept += count
+        if count < limit:
+            return swept
+
+
+def sweep_all(conn):
+    """Refresh the hot set and fold every account's pending credits (flagged or not any more)."""
+    refresh(conn)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(_PENDING_ACCOUNTS)
+        account_ids = [row[0] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+    conn.commit()
+    swept = sum(sweep_account(conn, account_id) for account_id in account_ids)
+    with _lock:
+        _stats['last_sweep_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+    return swept
+
+
+def _sweep_loop():
+    while not _stop.wait(HOT_SWEEP_INTERVAL):
+        conn = get_db_connection()
+        try:
+            sweep_all(conn)
+        except Exception as e:
+            with _lock:
+                _stats['errors'] += 1
+            print(f"Hot-account sweep failed: {e}")
+        finally:
+            conn.close()
+
+
+def start_sweeper():
+    """Start this process's background sweeper thread (idempotent)."""
+    global _sweeper
+    with _lock:
+        if _sweeper is None or not _sweeper.is_alive():
+            _stop.clear()
+            _sweeper = threading.Thread(target=_sweep_loop, name='hot-account-sweeper', daemon=True)
+            _sweeper.start()
+
+
+def stop_sweeper():
+    global _sweeper
+    _stop.set()
+    if _sweeper is not None:
+        _sweeper.join(timeout=HOT_SWEEP_INTERVAL + 5)
+        _sweeper = None
+
+
+def get_hot_account_stats():
+    with _lock:
+        return dict(_stats, hot=len(_hot_ids), sweeper=_sweeper is not None and _sweeper.is_alive())
+
+
+def flag(conn, account_id):
+    cursor = conn.cursor()
+    try:
+        cursor.execute('DELETE FROM hot_accounts WHERE account_id = %s', (account_id,))
+        cursor.execute('INSERT INTO hot_accounts (account_id) VALUES (%s)', (account_id,))
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def unflag(conn, account_id):
+    """Stop deferring the account's credits and fold what is pending."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute('DELETE FROM hot_accounts WHERE account_id = %s', (account_id,))
+        conn.commit()
+    finally:
+        cursor.close()
+    sweep_account(conn, account_id)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='hot-account maintenance')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    for name, help_text in (('flag', 'defer credits to an account through pending_credits'),
+                            ('unflag', 'credit an account directly again (sweeps what is pending)')):
+        subcommands.add_parser(name, help=help_text).add_argument('account_id', type=int)
+    subcommands.add_parser('list', help='flagged accounts and their unswept credits')
+    subcommands.add_parser('sweep', help='fold every pending credit now')
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    try:
+        if args.command == 'flag':
+            flag(conn, args.account_id)
+            print(f"Account {args.account_id} is hot; running sweepers pick it up within {HOT_SWEEP_INTERVAL}s.")
+        elif args.command == 'unflag':
+            unflag(conn, args.account_id)
+            print(f"Account {args.account_id} is credited directly again.")
+        elif args.command == 'list':
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT h.account_id, a.status, COUNT(p.credit_id), COALESCE(SUM(p.amount), 0)
+                FROM hot_accounts h
+                JOIN accounts a ON a.account_id = h.account_id
+                LEFT JOIN pending_credits p ON p.account_id = h.account_id
+                GROUP BY h.account_id, a.status
+            ''')
+            for account_id, status, pending, amount in cursor.fetchall():
+                print(f"{account_id:>10}  {status:<10} {pending:>8} pending  {float(amount):>14.2f}")
+            cursor.close()
+        else:
+            print(f"Folded {sweep_all(conn)} pending credits.")
+    finally:
+        conn.close()
@@ -0,0 +1,395 @@
+# 💸 Ledger: the one implementation of moving money between two accounts
+"""
+Every transfer path (/api/transfer on both apps, /transfer, /qr_pay and
+/mobile_transfer) describes its transfer with new_transfer() and applies it
+with execute_transfer() (or execute_transfer_async()). One database
+transaction then runs:
+
+1. a single conditional UPDATE that debits the sender only if it is active,
+   owned by the expected customer and holds enough balance, and credits the
+   receiver. Both rows are matched through the primary key, so they are
+   locked in account_id order whichever way the money moves, and two
+   opposite transfers can no longer deadlock on the pair;
+2. one multi-row INSERT of the debit and credit transactions;
+3. the daily rollup, the search terms (built from the values in hand) and
+   the customer_versions bump.
+
+If the UPDATE does not touch both rows the transaction is rolled back and
+the accounts are read once to say why (TransferError). Deadlocks and lock
+wait timeouts (busy database on SQLite) are retried up to
+LEDGER_MAX_RETRIES times with jittered backoff; get_ledger_stats() counts
+them. Publishing events, cache invalidation and read-your-writes pinning
+stay with the caller, after the commit.
+
+Credits to hot accounts (database/hot_accounts.py) lock nothing of the
+receiver's: a plain (non-locking) read checks the receiver is still active,
+the UPDATE debits only the sender, and only the debit row is inserted, with
+counterparty_account_id left empty because its foreign key would share-lock
+the hot row. The credit goes to pending_credits; the sweeper writes its
+transactions row, rollup and counter with the balance, so payers to one
+busy merchant never queue on its row or on the sweeper. A debit from a hot
+account sweeps it first.
+
+run_transaction() is the driver behind execute_transfer(): any plan in the
+same shape (database/bulk_transfers.py applies whole chunks of a batch)
+gets the same transaction handling, retries and stats.
+"""
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+import time
+from decimal import Decimal, ROUND_HALF_UP
+
+from config.db_config import DB_ERRORS
+from database.queries import HOT_QUERIES, fetch_all, inserted_ids
+from database.daily_summary import rollup_statement
+from database import customer_versions, hot_accounts, search_index
+
+LEDGER_MAX_RETRIES = int(os.environ.get('LEDGER_MAX_RETRIES', 3))
+LEDGER_RETRY_DELAY = float(os.environ.get('LEDGER_RETRY_DELAY', 0.01))  # seconds, doubled per retry
+
+TRANSFER_TYPES = ('IMPS', 'NEFT', 'RTGS', 'UPI', 'MOBILE')
+CENT = Decimal('0.01')
+
+# Debit the sender (if active, owned and covered) and credit the receiver (if active) in one statement
+_MOVE = '''
+    UPDATE accounts
+    SET balance = balance + CASE WHEN account_id = %s THEN -%s ELSE %s END
+    WHERE account_id IN (%s, %s) AND status = 'Active'
+      AND (account_id <> %s OR (customer_id = %s AND balance >= %s))
+'''
+# Debit only the sender (the receiver is hot, see database/hot_accounts.py)
+_DEBIT = '''
+    UPDATE accounts SET balance = balance - %s
+    WHERE account_id = %s AND customer_id = %s AND status = 'Active' AND balance >= %s
+'''
+_INSERT_ROWS = '''
+    INSERT INTO transactions (account_id, customer_id, transaction_date, transaction_type, amount, merchant, category,
+                              description, counterparty_account_id, counterparty_account_number, counterparty_bank_name,
+                              counterparty_ifsc_code, transfer_type, reference_number, status, remarks, initiated_at, completed_at)
+    VALUES '''
+_ROW = "(%s, %s, NOW(), %s, %s, %s, 'Transfer', %s, %s, %s, %s, %s, %s, %s, 'Completed', %s, NOW(), NOW())"
+
+# MySQL error numbers worth retrying the whole transaction for
+_RETRYABLE_ERRNOS = {1213: 'deadlocks', 1205: 'lock_timeouts'}
+
+_lock = threading.Lock()
+_stats = {'committed': 0, 'transfers': 0, 'refused': 0, 'failed': 0, 'retries': 0, 'deadlocks': 0, 'lock_timeouts': 0,
+          'total_ms': 0.0, 'max_ms': 0.0}
+
+
+class TransferError(Exception):
+    """A transfer the ledger refused; `status` is the HTTP status the API answers with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def to_amount(value):
+    """`value` as a Decimal rounded to paise; TransferError unless it is positive."""
+    try:
+        amount = Decimal(str(value)).quantize(CENT, rounding=ROUND_HALF_UP)
+    except ArithmeticError:
+        raise TransferError('Invalid amount')
+    if not amount > 0:
+        raise TransferError('Amount must be greater than 0')
+    return amount
+
+
+def new_transfer(sender_account_id, sender_customer_id, receiver_account_id, receiver_customer_id, amount,
+                 transfer_type, reference_number, merchant, debit_description, credit_description,
+                 counterparty_account_number=None, counterparty_bank_name=None, counterparty_ifsc_code=None,
+                 remarks=None):
+    """Validated transfer dict for execute_transfer(); TransferError for a transfer that cannot be valid.
+
+    The counterparty_* details are recorded on the sender's row (the receiver's
+    row only points back at the sender's account).
+    """
+    if transfer_type not in TRANSFER_TYPES:
+        raise TransferError('Invalid transfer type')
+    if sender_account_id == receiver_account_id:
+        raise TransferError('Cannot transfer to the same account')
+    return {
+        'sender_account_id': sender_account_id,
+        'sender_customer_id': sender_customer_id,
+        'receiver_account_id': receiver_account_id,
+        'receiver_customer_id': receiver_customer_id,
+        'amount': to_amount(amount),
+        'transfer_type': transfer_type,
+        'reference_number': reference_number,
+        'merchant': merchant,
+        'debit_description': debit_description,
+        'credit_description': credit_description,
+        'counterparty': (counterparty_account_number, counterparty_bank_name, counterparty_ifsc_code),
+        'remarks': remarks or None,
+        'sender_hot': hot_accounts.is_hot(sender_account_id),
+        'receiver_hot': hot_accounts.is_hot(receiver_account_id),
+    }
+
+
+def move_statement(transfer):
+    sender, receiver, amount = transfer['sender_account_id'], transfer['receiver_account_id'], transfer['amount']
+    return _MOVE, (sender, amount, amount, sender, receiver, sender, transfer['sender_customer_id'], amount)
+
+
+def debit_statement(account_id, customer_id, amount):
+    """(sql, params) debiting an active, owned account that holds at least `amount`."""
+    return _DEBIT, (amount, account_id, customer_id, amount)
+
+
+def transfer_rows(transfer):
+    """The transactions rows `transfer` inserts, as insert_statement() parameters: the debit and
+    the credit, or only the debit (without the hot row as counterparty) when the receiver is hot."""
+    t = transfer
+    if t['receiver_hot']:
+        return [(t['sender_account_id'], t['sender_customer_id'], 'Debit', t['amount'], t['merchant'],
+                 t['debit_description'], None, *t['counterparty'], t['transfer_type'], t['reference_number'],
+                 t['remarks'])]
+    return [
+        (t['sender_account_id'], t['sender_customer_id'], 'Debit', t['amount'], t['merchant'], t['debit_description'],
+         t['receiver_account_id'], *t['counterparty'], t['transfer_type'], t['reference_number'], t['remarks']),
+        (t['receiver_account_id'], t['receiver_customer_id'], 'Credit', t['amount'], t['merchant'], t['credit_description'],
+         t['sender_account_id'], None, None, None, t['transfer_type'], t['reference_number'], t['remarks']),
+    ]
+
+
+def insert_statement(rows):
+    """(sql, params) of one multi-row INSERT of transfer_rows() rows."""
+    return _INSERT_ROWS + ', '.join([_ROW] * len(rows)), [value for row in rows for value in row]
+
+
+def term_sources(transfer, debit_id, credit_id=None):
+    """search_index.term_rows() input for the rows of `transfer` (no credit_id: only the debit was inserted)."""
+    t = transfer
+    sources = [(debit_id, t['sender_customer_id'], t['merchant'], 'Transfer', t['debit_description'])]
+    if credit_id is not None:
+        sources.append((credit_id, t['receiver_customer_id'], t['merchant'], 'Transfer', t['credit_description']))
+    return sources
+
+
+def pending_credit(transfer, debit_id):
+    """hot_accounts.pending_statement() row deferring the credit of `transfer` to the sweeper."""
+    t = transfer
+    return t['receiver_account_id'], t['receiver_customer_id'], t['amount'], debit_id, t['credit_description']
+
+
+def many(sql, seq_params):
+    """A plan statement the drivers run with executemany(): `sql` once per parameter tuple."""
+    return sql, seq_params, 'many'
+
+
+def read(sql, params):
+    """A plan statement whose result rows are fetched: the plan is sent back (row count, None)."""
+    return sql, params, 'read'
+
+
+def transfer_plan(transfer):
+    """The statements of one transfer, shared by the sync and async drivers.
+
+    A generator: yields (sql, params) (or many() / read() statements), is sent
+    back (rowcount, lastrowid), and returns [debit_id, credit_id], or None when
+    the balance UPDATE (or a hot receiver's status check) was refused. A hot
+    receiver's credit_id is None: the sweeper inserts that row.
+    """
+    t = transfer
+    if t['receiver_hot']:
+        # Consistent read, no lock: the hot row stays free for the sweeper and other payers
+        active, _ = yield read(*hot_accounts.active_statement([t['receiver_account_id']]))
+        if active != 1:
+            return None
+        rowcount, _ = yield debit_statement(t['sender_account_id'], t['sender_customer_id'], t['amount'])
+        if rowcount != 1:
+            return None
+    else:
+        rowcount, _ = yield move_statement(t)
+        if rowcount != 2:
+            return None
+
+    rows = transfer_rows(t)
+    _, lastrowid = yield insert_statement(rows)
+    ids = inserted_ids(lastrowid, len(rows))
+    if t['receiver_hot']:
+        yield hot_accounts.pending_statement([pending_credit(t, ids[0])])
+
+    # Daily rollup, search index and ETag counters, committed with the rows they cover
+    yield rollup_statement(ids)
+    for statement in search_index.insert_statements(search_index.term_rows(term_sources(t, *ids))):
+        yield statement
+    customer_ids = [t['sender_customer_id']] if t['receiver_hot'] else [t['sender_customer_id'], t['receiver_customer_id']]
+    yield customer_versions.bump_statement('transactions', customer_ids)
+    return [ids[0], ids[1] if len(ids) > 1 else None]
+
+
+def refusal(transfer, rows):
+    """TransferError explaining a refused UPDATE from the HOT_QUERIES['ledger_accounts'] rows."""
+    accounts = {row[0]: row for row in rows}
+    sender = accounts.get(transfer['sender_account_id'])
+    receiver = accounts.get(transfer['receiver_account_id'])
+    if sender is None or sender[1] != transfer['sender_customer_id'] or sender[3] != 'Active':
+        return TransferError('Invalid sender account', 404)
+    if receiver is None or receiver[3] != 'Active':
+        return TransferError('Receiver account not available', 404)
+    if sender[2] < transfer['amount']:
+        return TransferError('Insufficient balance', 400)
+    # Both fine now: a concurrent transfer changed them in between
+    return TransferError('Accounts changed during the transfer, please retry', 409)
+
+
+def _retry_reason(error):
+    """Stats key when `error` means the transaction should simply be run again, else None."""
+    errno = getattr(error, 'errno', None)
+    if errno is None and error.args and isinstance(error.args[0], int):
+        errno = error.args[0]  # pymysql (aiomysql) errors
+    if errno in _RETRYABLE_ERRNOS:
+        return _RETRYABLE_ERRNOS[errno]
+    if isinstance(error, sqlite3.OperationalError) and 'locked' in str(error):
+        return 'lock_timeouts'
+    return None
+
+
+def _retry_delay(attempt):
+    return LEDGER_RETRY_DELAY * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+def _record(outcome, started=None, transfers=0):
+    with _lock:
+        _stats[outcome] += 1
+        _stats['transfers'] += transfers
+        if started is not None:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            _stats['total_ms'] += elapsed_ms
+            _stats['max_ms'] = max(_stats['max_ms'], elapsed_ms)
+
+
+def _record_retry(reason):
+    with _lock:
+        _stats['retries'] += 1
+        _stats[reason] += 1
+
+
+def _drive(cursor, plan):
+    """Run `plan`'s statements on a DB-API cursor; returns the plan's result."""
+    try:
+        statement = next(plan)
+        while True:
+            sql, params, *kind = statement
+            if kind == ['many']:
+                cursor.executemany(sql, params)
+            elif kind == ['read']:
+                cursor.execute(sql, params)
+                statement = plan.send((len(cursor.fetchall()), None))
+                continue
+            else:
+                cursor.execute(sql, params)
+            statement = plan.send((cursor.rowcount, cursor.lastrowid))
+    except StopIteration as done:
+        return done.value
+
+
+async def _drive_async(conn, plan):
+    try:
+        statement = next(plan)
+        while True:
+            sql, params, *kind = statement
+            if kind == ['many']:
+                statement = plan.send(await conn.executemany(sql, params))
+            elif kind == ['read']:
+                statement = plan.send((len(await conn.fetchall(sql, params)), None))
+            else:
+                statement = plan.send(await conn.execute(sql, params))
+    except StopIteration as done:
+        return done.value
+
+
+def run_transaction(conn, make_plan, transfers=1):
+    """Run the plan make_plan() returns in its own transaction on `conn` and commit it; returns
+    the plan's result, or None (rolled back) when the plan refused. `transfers` is how many
+    transfers the plan applies, for the stats.
+
+    Raises the database error once it is not retryable or LEDGER_MAX_RETRIES retries are used up.
+    """
+    started = time.perf_counter()
+    for attempt in range(LEDGER_MAX_RETRIES + 1):
+        conn.rollback()
+        cursor = conn.cursor()
+        try:
+            conn.start_transaction()
+            result = _drive(cursor, make_plan())
+            if result is None:
+                conn.rollback()
+                return None
+            conn.commit()
+            _record('committed', started, transfers)
+            return result
+        except DB_ERRORS as e:
+            conn.rollback()
+            reason = _retry_reason(e)
+            if reason is None or attempt == LEDGER_MAX_RETRIES:
+                _record('failed')
+                raise
+            _record_retry(reason)
+        finally:
+            cursor.close()
+        time.sleep(_retry_delay(attempt))
+
+
+async def run_transaction_async(conn, make_plan, transfers=1):
+    """run_transaction() on a config/async_db.py connection."""
+    started = time.perf_counter()
+    for attempt in range(LEDGER_MAX_RETRIES + 1):
+        try:
+            await conn.begin()
+            result = await _drive_async(conn, make_plan())
+            if result is None:
+                await conn.rollback()
+                return None
+            await conn.commit()
+            _record('committed', started, transfers)
+            return result
+        except Exception as e:
+            await conn.rollback()
+            reason = _retry_reason(e)
+            if reason is None or attempt == LEDGER_MAX_RETRIES:
+                _record('failed')
+                raise
+            _record_retry(reason)
+        await asyncio.sleep(_retry_delay(attempt))
+
+
+def execute_transfer(conn, transfer):
+    """Apply `transfer` in its own transaction on `conn`; returns [debit_id, credit_id]
+    (credit_id None for a hot receiver, whose row the sweeper writes).
+
+    Raises TransferError when the accounts refuse it, or the database error
+    once it is not retryable or LEDGER_MAX_RETRIES retries are used up.
+    """
+    if transfer['sender_hot']:
+        hot_accounts.sweep_account(conn, transfer['sender_account_id'])
+    ids = run_transaction(conn, lambda: transfer_plan(transfer))
+    if ids is None:
+        _record('refused')
+        raise refusal(transfer, fetch_all(conn, 'ledger_accounts',
+                                          (transfer['sender_account_id'], transfer['receiver_account_id'])))
+    return ids
+
+
+async def execute_transfer_async(conn, transfer):
+    """execute_transfer() on a config/async_db.py connection."""
+    if transfer['sender_hot']:
+        await hot_accounts.sweep_account_async(conn, transfer['sender_account_id'])
+    ids = await run_transaction_async(conn, lambda: transfer_plan(transfer))
+    if ids is None:
+        _record('refused')
+        raise refusal(transfer, await conn.fetchall(HOT_QUERIES['ledger_accounts'],
+                                                    (transfer['sender_account_id'], transfer['receiver_account_id'])))
+    return ids
+
+
+def get_ledger_stats():
+    with _lock:
+        stats = dict(_stats)
+    stats['avg_ms'] = round(stats['total_ms'] / stats['committed'], 3) if stats['committed'] else 0.0
+    return stats
@@ -0,0 +1,451 @@
+# 🧬 Versioned schema migrations
+"""
+Each migration runs once and is recorded in the schema_version table, so
+process startup only needs a single version query (see ensure_schema) instead
+of replaying schema.sql and the sample data.
+
+Applied migrations never change: each one carries its own DDL (migration 1
+reads the frozen schema_v1.sql), while schema.sql documents the current
+schema and is not run by anything.
+
+Usage (from the repository root):
+    python database/migrations.py            # apply pending migrations
+    python database/migrations.py --status   # show current and latest version
+"""
+
+import argparse
+import sys
+import os
+from contextlib import contextmanager
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.db_config import get_db_connection, is_sqlite, DB_ERRORS
+from config import sqlite_db
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+MIGRATION_LOCK_TIMEOUT = 60  # seconds a booting worker waits for another one's migration
+
+SCHEMA_VERSION_TABLE = '''
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INT PRIMARY KEY,
+        description VARCHAR(255) NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+
+def read_statements(filename):
+    """Read a .sql file from this directory and split it into statements."""
+    with open(os.path.join(SCRIPT_DIR, filename), 'r', encoding='utf-8') as f:
+        sql = f.read()
+    return [stmt.strip() for stmt in sql.split(';') if stmt.strip()]
+
+
+# ============================
+# Helpers shared by migrations
+# ============================
+def table_exists(cursor, table):
+    if is_sqlite():
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = %s", (table,))
+    else:
+        cursor.execute("SHOW TABLES LIKE %s", (table,))
+    return bool(cursor.fetchall())
+
+
+def column_type(cursor, table, column):
+    """Declared type of `column`, or None when the column does not exist."""
+    if is_sqlite():
+        cursor.execute(f"PRAGMA table_info({table})")
+        types = {row[1]: row[2] for row in cursor.fetchall()}
+        return types.get(column)
+    cursor.execute(f"SHOW COLUMNS FROM {table} LIKE %s", (column,))
+    rows = cursor.fetchall()
+    if not rows:
+        return None
+    return rows[0][1].decode() if isinstance(rows[0][1], bytes) else rows[0][1]
+
+
+def index_exists(cursor, table, index_name):
+    if is_sqlite():
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name = %s", (index_name,))
+    else:
+        cursor.execute(f"SHOW INDEX FROM {table} WHERE Key_name = %s", (index_name,))
+    return bool(cursor.fetchall())
+
+
+def execute_ddl(cursor, statement):
+    """Run one MySQL DDL statement, translated when running on SQLite."""
+    if is_sqlite():
+        for part in sqlite_db.translate_schema(statement):
+            cursor.execute(part)
+    else:
+        cursor.execute(statement)
+
+
+# ============================
+# Migrations
+# ============================
+def create_initial_schema(cursor):
+    """Every table in schema_v1.sql (CREATE TABLE IF NOT EXISTS, so safe on existing databases)."""
+    for statement in read_statements('schema_v1.sql'):
+        execute_ddl(cursor, statement)
+
+
+def upgrade_legacy_columns(cursor):
+    """Columns older databases may lack (formerly add_column.py, fix_transactions_table.py and alter_transfer_type.py)."""
+    columns_to_add = [
+        ('accounts', 'is_primary', 'BOOLEAN DEFAULT FALSE'),
+        ('accounts', 'bank_name', 'VARCHAR(100)'),
+        ('accounts', 'ifsc_code', 'VARCHAR(20)'),
+        ('transactions', 'counterparty_account_id', 'INT NULL'),
+        ('transactions', 'counterparty_account_number', 'VARCHAR(30) NULL'),
+        ('transactions', 'counterparty_bank_name', 'VARCHAR(100) NULL'),
+        ('transactions', 'counterparty_ifsc_code', 'VARCHAR(20) NULL'),
+        ('transactions', 'transfer_type', "ENUM('IMPS', 'NEFT', 'RTGS', 'UPI', 'MOBILE') NULL"),
+        ('transactions', 'reference_number', 'VARCHAR(50) NULL'),
+        ('transactions', 'status', "ENUM('Pending', 'Completed', 'Failed', 'Cancelled') NULL"),
+        ('transactions', 'initiated_at', 'TIMESTAMP NULL'),
+        ('transactions', 'completed_at', 'TIMESTAMP NULL'),
+        ('transactions', 'remarks', 'VARCHAR(255) NULL'),
+    ]
+    for table, column, definition in columns_to_add:
+        if column_type(cursor, table, column) is None:
+            print(f"  Adding {table}.{column}")
+            execute_ddl(cursor, f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            if (table, column) == ('transactions', 'counterparty_account_id') and not is_sqlite():
+                cursor.execute("ALTER TABLE transactions ADD CONSTRAINT fk_counterparty_account "
+                               "FOREIGN KEY (counterparty_account_id) REFERENCES accounts(account_id)")
+
+    if is_sqlite():
+        return  # SQLite databases are always created from schema_v1.sql, which has every legacy column
+
+    # MOBILE transfers were added after the first release
+    transfer_type = column_type(cursor, 'transactions', 'transfer_type')
+    if 'MOBILE' not in transfer_type:
+        print("  Adding MOBILE to transactions.transfer_type")
+        cursor.execute("ALTER TABLE transactions MODIFY COLUMN transfer_type "
+                       "ENUM('IMPS', 'NEFT', 'RTGS', 'UPI', 'MOBILE') NULL")
+
+    # Transfers used to reference a beneficiaries table
+    if column_type(cursor, 'transactions', 'beneficiary_id') is not None:
+        print("  Removing transactions.beneficiary_id")
+        cursor.execute("ALTER TABLE transactions DROP FOREIGN KEY fk_beneficiary_id")
+        cursor.execute("ALTER TABLE transactions DROP COLUMN beneficiary_id")
+
+# (table, index name, columns) - new databases get these from the INDEX clauses in schema_v1.sql
+SECONDARY_INDEXES = [
+    # Account lookups by owner: balances, primary account, account lists
+    ('accounts', 'idx_accounts_customer_status', '(customer_id, status, is_primary)'),
+    # Transaction history and exports, newest first
+    ('transactions', 'idx_transactions_account_date', '(account_id, transaction_date)'),
+    # Recent transfers per customer
+    ('transactions', 'idx_transactions_account_category_date', '(account_id, category, transaction_date)'),
+    ('transactions', 'idx_transactions_category', '(category)'),
+    ('predictions', 'idx_predictions_customer_created', '(customer_id, created_at)'),
+    ('payments', 'idx_payments_loan_status', '(loan_id, payment_status)'),
+    ('loans', 'idx_loans_customer_status', '(customer_id, status)'),
+    ('credit_scores', 'idx_credit_scores_customer_calculated', '(customer_id, calculated_at)'),
+    ('loan_applications', 'idx_loan_applications_customer_status_applied', '(customer_id, application_status, applied_date)'),
+    ('employment_info', 'idx_employment_customer', '(customer_id)'),
+]
+
+
+def add_secondary_indexes(cursor):
+    """Indexes for the per-customer access paths on databases created before they were in schema_v1.sql."""
+    # Build indexes online on MySQL so large tables keep taking writes
+    online = '' if is_sqlite() else ' ALGORITHM=INPLACE LOCK=NONE'
+    for table, index_name, columns in SECONDARY_INDEXES:
+        if not index_exists(cursor, table, index_name):
+            print(f"  Creating {index_name} on {table} {columns}")
+            cursor.execute(f"CREATE INDEX {index_name} ON {table} {columns}{online}")
+
+
+def load_sample_data(cursor):
+    """Seed sample_data.sql into an empty database."""
+    cursor.execute("SELECT COUNT(*) FROM customers")
+    if cursor.fetchall()[0][0]:
+        print("  Customers already present, skipping sample data")
+        return
+    for statement in read_statements('sample_data.sql'):
+        cursor.execute(statement)
+
+BACKFILL_CHUNK_ROWS = 50000  # transaction_id range per backfill UPDATE
+
+
+def denormalise_transaction_customer(cursor):
+    """transactions.customer_id, backfilled from accounts, with the per-customer listing index."""
+    if column_type(cursor, 'transactions', 'customer_id') is None:
+        print("  Adding transactions.customer_id")
+        execute_ddl(cursor, "ALTER TABLE transactions ADD COLUMN customer_id INT NULL")
+
+    cursor.execute("SELECT MIN(transaction_id), MAX(transaction_id) FROM transactions WHERE customer_id IS NULL")
+    low, high = cursor.fetchall()[0]
+    if low is not None:
+        print(f"  Backfilling transactions.customer_id for ids {low}..{high}")
+    if is_sqlite():
+        backfill = '''
+            UPDATE transactions SET customer_id = (
+                SELECT a.customer_id FROM accounts a WHERE a.account_id = transactions.account_id)
+            WHERE customer_id IS NULL AND transaction_id BETWEEN %s AND %s
+        '''
+    else:
+        backfill = '''
+            UPDATE transactions t JOIN accounts a ON t.account_id = a.account_id
+            SET t.customer_id = a.customer_id
+            WHERE t.customer_id IS NULL AND t.transaction_id BETWEEN %s AND %s
+        '''
+    # Bounded primary-key ranges keep each statement's row locks and undo small
+    while low is not None and low <= high:
+        cursor.execute(backfill, (low, low + BACKFILL_CHUNK_ROWS - 1))
+        low += BACKFILL_CHUNK_ROWS
+
+    if not index_exists(cursor, 'transactions', 'idx_transactions_customer_date'):
+        print("  Creating idx_transactions_customer_date on transactions")
+        online = '' if is_sqlite() else ' ALGORITHM=INPLACE LOCK=NONE'
+        cursor.execute("CREATE INDEX idx_transactions_customer_date ON transactions "
+                       f"(customer_id, transaction_date DESC, transaction_id DESC){online}")
+
+ACCOUNT_DAILY_SUMMARY_TABLE = '''
+    CREATE TABLE IF NOT EXISTS account_daily_summary (
+        account_id INT NOT NULL,
+        customer_id INT,
+        summary_date DATE NOT NULL,
+        total_credits DECIMAL(15,2) NOT NULL DEFAULT 0,
+        total_debits DECIMAL(15,2) NOT NULL DEFAULT 0,
+        transaction_count INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (account_id, summary_date),
+        INDEX idx_account_daily_summary_customer_date (customer_id, summary_date),
+        FOREIGN KEY (account_id) REFERENCES accounts(account_id)
+    )
+'''
+
+
+def create_account_daily_summary(cursor):
+    """account_daily_summary, built from the existing transactions."""
+    from database.daily_summary import rebuild_all
+    if not table_exists(cursor, 'account_daily_summary'):
+        print("  Creating account_daily_summary")
+        execute_ddl(cursor, ACCOUNT_DAILY_SUMMARY_TABLE)
+    print("  Building account_daily_summary from transactions")
+    rebuild_all(cursor)
+
+TRANSACTION_SEARCH_TERMS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS transaction_search_terms (
+        customer_id INT NOT NULL,
+        term VARCHAR(32) NOT NULL,
+        transaction_id BIGINT NOT NULL,
+        weight TINYINT NOT NULL,
+        PRIMARY KEY (customer_id, term, transaction_id),
+        INDEX idx_transaction_search_terms_transaction (transaction_id)
+    )
+'''
+
+
+def create_transaction_search_terms(cursor):
+    """transaction_search_terms, the word index behind transaction search, built from existing rows."""
+    from database.search_index import rebuild_all
+    if not table_exists(cursor, 'transaction_search_terms'):
+        print("  Creating transaction_search_terms")
+        execute_ddl(cursor, TRANSACTION_SEARCH_TERMS_TABLE)
+    print("  Indexing transactions for search")
+    rebuild_all(cursor)
+
+CUSTOMER_VERSIONS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS customer_versions (
+        customer_id INT PRIMARY KEY,
+        transactions_version BIGINT NOT NULL DEFAULT 0,
+        loan_applications_version BIGINT NOT NULL DEFAULT 0
+    )
+'''
+
+
+def create_customer_versions(cursor):
+    """customer_versions, the change counters behind API ETags (no rows needed: missing counts as 0)."""
+    if not table_exists(cursor, 'customer_versions'):
+        print("  Creating customer_versions")
+        execute_ddl(cursor, CUSTOMER_VERSIONS_TABLE)
+
+HOT_ACCOUNT_TABLES = {
+    'hot_accounts': '''
+        CREATE TABLE IF NOT EXISTS hot_accounts (
+            account_id INT PRIMARY KEY,
+            flagged_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (account_id) REFERENCES accounts(account_id)
+        )
+    ''',
+    'pending_credits': '''
+        CREATE TABLE IF NOT EXISTS pending_credits (
+            credit_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            account_id INT NOT NULL,
+            customer_id INT,
+            amount DECIMAL(15,2) NOT NULL,
+            transaction_id BIGINT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_pending_credits_account (account_id, amount)
+        )
+    ''',
+}
+
+
+def create_hot_account_tables(cursor):
+    """hot_accounts and pending_credits (no account is hot until flagged)."""
+    for table, statement in HOT_ACCOUNT_TABLES.items():
+        if not table_exists(cursor, table):
+            print(f"  Creating {table}")
+            execute_ddl(cursor, statement)
+
+LEGACY_FOLD_ROWS = 1000  # pending credits per rollup/DELETE statement in migration 10
+
+
+def defer_hot_credit_rows(cursor):
+    """pending_credits.description, for the Credit rows the sweeper now writes. Credits pending from
+    before this version already have their Credit rows, so they are folded in here instead."""
+    from decimal import Decimal
+    from database.customer_versions import bump_statement
+    from database.daily_summary import rollup_statement
+    if column_type(cursor, 'pending_credits', 'description') is None:
+        print("  Adding pending_credits.description")
+        execute_ddl(cursor, "ALTER TABLE pending_credits ADD COLUMN description VARCHAR(255) NULL")
+
+    cursor.execute("SELECT credit_id, account_id, customer_id, amount, transaction_id FROM pending_credits")
+    rows = cursor.fetchall()
+    if not rows:
+        return
+    print(f"  Folding {len(rows)} pending credits written before the sweeper wrote Credit rows")
+    totals = {}
+    for _, account_id, _, amount, _ in rows:
+        totals[account_id] = totals.get(account_id, Decimal(0)) + Decimal(str(amount))
+    for account_id in sorted(totals):
+        cursor.execute("UPDATE accounts SET balance = balance + %s WHERE account_id = %s", (totals[account_id], account_id))
+    for start in range(0, len(rows), LEGACY_FOLD_ROWS):
+        chunk = rows[start:start + LEGACY_FOLD_ROWS]
+        cursor.execute(*rollup_statement([row[4] for row in chunk]))
+        cursor.execute(f"DELETE FROM pending_credits WHERE credit_id IN ({', '.join(['%s'] * len(chunk))})",
+                       [row[0] for row in chunk])
+    customer_ids = {row[2] for row in rows if row[2] is not None}
+    if customer_ids:
+        cursor.execute(*bump_statement('transactions', customer_ids))
+
+# (version, description, function) - append new migrations, never edit applied ones
+MIGRATIONS = [
+    (1, 'initial schema', create_initial_schema),
+    (2, 'legacy column upgrades', upgrade_legacy_columns),
+    (3, 'secondary indexes', add_secondary_indexes),
+    (4, 'sample data', load_sample_data),
+    (5, 'transactions.customer_id', denormalise_transaction_customer),
+    (6, 'account_daily_summary rollup', create_account_daily_summary),
+    (7, 'transaction search index', create_transaction_search_terms),
+    (8, 'customer_versions change counters', create_customer_versions),
+    (9, 'hot accounts and pending credits', create_hot_account_tables),
+    (10, 'pending credit rows written by the sweeper', defer_hot_credit_rows),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# ============================
+# Runner
+# ============================
+def get_schema_version(cursor):
+    """Highest applied migration, or 0 for a database without schema_version."""
+    try:
+        cursor.execute("SELECT MAX(version) FROM schema_version")
+        return cursor.fetchall()[0][0] or 0
+    except DB_ERRORS:
+        return 0
+
+
+@contextmanager
+def migration_lock(conn):
+    """Serialise migrations between workers booting at the same time."""
+    if is_sqlite():
+        # Each migration takes SQLite's write lock (BEGIN IMMEDIATE) instead
+        yield
+        return
+    cursor = conn.cursor()
+    cursor.execute("SELECT GET_LOCK('schema_migrations', %s)", (MIGRATION_LOCK_TIMEOUT,))
+    if cursor.fetchall()[0][0] != 1:
+        raise RuntimeError('Timed out waiting for another process to finish migrating')
+    try:
+        yield
+    finally:
+        cursor.execute("SELECT RELEASE_LOCK('schema_migrations')")
+        cursor.fetchall()
+
+
+def migrate(target=None):
+    """Apply every pending migration up to `target` (default: all). Returns the final version."""
+    target = LATEST_VERSION if target is None else target
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        with migration_lock(conn):
+            cursor.execute(SCHEMA_VERSION_TABLE)
+            conn.commit()
+
+            for version, description, apply in MIGRATIONS:
+                if version > target:
+                    break
+                # Re-read inside the transaction: another worker may have got here first
+                conn.rollback()
+                conn.start_transaction()
+                if get_schema_version(cursor) >= version:
+                    conn.rollback()
+                    continue
+
+                print(f"Applying migration {version}: {description}...")
+                apply(cursor)
+                cursor.execute("INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                               (version, description))
+                # MySQL commits DDL implicitly; on SQLite the whole migration commits here
+                conn.commit()
+
+            conn.rollback()
+            return get_schema_version(cursor)
+
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def ensure_schema():
+    """Startup check: one version query when the schema is current, otherwise migrate.
+
+    Returns True when migrations were applied.
+    """
+    try:
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor()
+            version = get_schema_version(cursor)
+            cursor.close()
+        finally:
+            conn.close()
+        if version >= LATEST_VERSION:
+            return False
+    except DB_ERRORS:
+        pass  # e.g. the database itself does not exist yet
+
+    from database.db_init import initialize_database
+    initialize_database()
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Apply versioned schema migrations')
+    parser.add_argument('--status', action='store_true', help='only print the current schema version')
+    parser.add_argument('--target', type=int, help='migrate up to this version')
+    args = parser.parse_args()
+
+    if args.status:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        print(f"Schema version {get_schema_version(cursor)} (latest {LATEST_VERSION})")
+        cursor.close()
+        conn.close()
+    else:
+        print(f"Schema is at version {migrate(args.target)}.")
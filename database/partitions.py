@@ -0,0 +1,300 @@
+# 🗂️ Monthly partitioning and cold archival for the transactions table
+"""
+MySQL: transactions is RANGE COLUMNS partitioned on transaction_date, one
+partition per month (pYYYYMM) plus a catch-all p_future, so date-filtered
+listings only touch the months they ask for. RANGE partitions have no lower
+bound, so the oldest partition is the catch-all the other way: back-dated
+rows older than every month land there (they are never rejected) and are
+archived with it. SQLite has no partitioning; there the archive command
+moves whole months out with DELETE instead.
+
+Archiving a partition drops it first and then, in one transaction, removes
+its search terms and rollup rows. DROP PARTITION commits on its own, so if
+the second step fails the leftover search terms match nothing (search joins
+transactions) and `python database/daily_summary.py backfill` rebuilds the
+rollup; no transaction is ever left without its search terms.
+
+Usage (from the repository root):
+    python database/partitions.py status
+    python database/partitions.py enable           # one-off: partition the existing table (MySQL)
+    python database/partitions.py create-future    # run daily/monthly from cron
+    python database/partitions.py archive --older-than 24
+"""
+
+import argparse
+import sys
+import os
+from datetime import date, datetime
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.db_config import get_db_connection, is_sqlite, DB_PARTITION_MONTHS_AHEAD, DB_ARCHIVE_AFTER_MONTHS
+from database.archive import ARCHIVE_COLUMNS, archive_files, write_archive
+from database import customer_versions
+
+ARCHIVE_DELETE_CHUNK = 10000  # search-term transaction ids per DELETE after dropping a partition
+
+
+def add_months(month, months):
+    """First day of the month `months` after `month` (negative goes back)."""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_start(value):
+    # SQLite returns MIN()/MAX() of a DATETIME column as text
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return date(value.year, value.month, 1)
+
+
+def partition_name(month):
+    return f"p{month:%Y%m}"
+
+
+def partition_definition(month):
+    """Partition holding `month` (bounded above by the first of the next month)."""
+    return f"PARTITION {partition_name(month)} VALUES LESS THAN ('{add_months(month, 1):%Y-%m-%d}')"
+
+
+def partition_bound(description):
+    """A partition's upper bound as a date, whichever form information_schema reports it in
+    ('2024-01-01', a quoted DATETIME or a TO_DAYS() day number); None for MAXVALUE."""
+    if isinstance(description, bytes):
+        description = description.decode()
+    value = str(description).strip().strip("'\"")
+    if value.upper() == 'MAXVALUE':
+        return None
+    if value.isdigit():
+        return date.fromordinal(int(value) - 365)  # TO_DAYS() counts from year 0, toordinal() from year 1
+    return datetime.fromisoformat(value).date()
+
+
+def list_partitions(cursor):
+    """[(name, upper bound, approximate rows)] in order; empty when the table is not partitioned."""
+    if is_sqlite():
+        return []
+    cursor.execute('''
+        SELECT PARTITION_NAME, PARTITION_DESCRIPTION, TABLE_ROWS
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'transactions'
+        ORDER BY PARTITION_ORDINAL_POSITION
+    ''')
+    return [(name, bound, rows) for name, bound, rows in cursor.fetchall() if name is not None]
+
+
+def enable_partitioning(months_ahead=DB_PARTITION_MONTHS_AHEAD):
+    """Rebuild transactions as a monthly partitioned table (MySQL).
+
+    MySQL requires the partitioning column in every unique key and does not
+    allow foreign keys on partitioned tables, so the primary key becomes
+    (transaction_id, transaction_date) and the table's foreign keys are dropped.
+    """
+    if is_sqlite():
+        print("SQLite has no table partitioning; use 'archive' to keep transactions small.")
+        return
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        if list_partitions(cursor):
+            print("transactions is already partitioned.")
+            return
+
+        cursor.execute('''
+            SELECT CONSTRAINT_NAME FROM information_schema.REFERENTIAL_CONSTRAINTS
+            WHERE CONSTRAINT_SCHEMA = DATABASE() AND TABLE_NAME = 'transactions'
+        ''')
+        for (constraint,) in cursor.fetchall():
+            print(f"Dropping foreign key {constraint}...")
+            cursor.execute(f"ALTER TABLE transactions DROP FOREIGN KEY {constraint}")
+
+        # The partitioning column must be NOT NULL and part of the primary key
+        cursor.execute("UPDATE transactions SET transaction_date = COALESCE(initiated_at, NOW()) WHERE transaction_date IS NULL")
+        conn.commit()
+        print("Rebuilding primary key as (transaction_id, transaction_date)...")
+        cursor.execute('''
+            ALTER TABLE transactions
+            MODIFY transaction_date DATETIME NOT NULL,
+            DROP PRIMARY KEY,
+            ADD PRIMARY KEY (transaction_id, transaction_date)
+        ''')
+
+        cursor.execute("SELECT MIN(transaction_date) FROM transactions")
+        oldest = cursor.fetchall()[0][0]
+        current = month_start(date.today())
+        month = month_start(oldest) if oldest else current
+
+        definitions = []
+        while month <= add_months(current, months_ahead):
+            definitions.append(partition_definition(month))
+            month = add_months(month, 1)
+        definitions.append("PARTITION p_future VALUES LESS THAN (MAXVALUE)")
+
+        print(f"Partitioning transactions into {len(definitions)} partitions...")
+        cursor.execute(f"ALTER TABLE transactions PARTITION BY RANGE COLUMNS(transaction_date) ({', '.join(definitions)})")
+        print("transactions is now partitioned by month.")
+
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def create_future_partitions(months_ahead=DB_PARTITION_MONTHS_AHEAD):
+    """Split p_future so every month up to `months_ahead` from now has its own partition."""
+    if is_sqlite():
+        print("SQLite has no table partitioning; nothing to do.")
+        return []
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    created = []
+
+    try:
+        partitions = list_partitions(cursor)
+        if not partitions:
+            print("transactions is not partitioned; run 'enable' first.")
+            return created
+
+        existing = {name for name, _, _ in partitions}
+        current = month_start(date.today())
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            if partition_name(month) in existing:
+                continue
+            # p_future is empty in normal operation, so this split is metadata-only
+            cursor.execute(f'''
+                ALTER TABLE transactions REORGANIZE PARTITION p_future INTO (
+                    {partition_definition(month)},
+                    PARTITION p_future VALUES LESS THAN (MAXVALUE)
+                )
+            ''')
+            created.append(partition_name(month))
+            print(f"Created partition {partition_name(month)}.")
+
+        if not created:
+            print(f"Partitions exist through {partition_name(add_months(current, months_ahead))}.")
+        return created
+
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def archive_old_months(older_than=DB_ARCHIVE_AFTER_MONTHS):
+    """Move months older than `older_than` months to Parquet files, then drop them from the table."""
+    cutoff = add_months(month_start(date.today()), -older_than)
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    select_columns = ', '.join(ARCHIVE_COLUMNS)
+    archived = []
+
+    try:
+        partitions = list_partitions(cursor)
+        if partitions:
+            # Partitioned MySQL table: export each old partition and drop it
+            for name, description, _ in partitions:
+                bound = partition_bound(description)
+                if bound is None or bound > cutoff:
+                    continue
+                month = add_months(bound, -1)
+                cursor.execute(f"SELECT {select_columns} FROM transactions PARTITION ({name})")
+                path, rows = write_archive(cursor, month)
+                cursor.execute(f"SELECT transaction_id FROM transactions PARTITION ({name})")
+                transaction_ids = [row[0] for row in cursor.fetchall()]
+                conn.commit()
+                cursor.execute(f"ALTER TABLE transactions DROP PARTITION {name}")
+                # Search terms and summary stats cover what is still in the table
+                # (the oldest partition may hold back-dated rows from earlier months too)
+                conn.start_transaction()
+                for start in range(0, len(transaction_ids), ARCHIVE_DELETE_CHUNK):
+                    chunk = transaction_ids[start:start + ARCHIVE_DELETE_CHUNK]
+                    cursor.execute("DELETE FROM transaction_search_terms WHERE transaction_id IN "
+                                   f"({', '.join(['%s'] * len(chunk))})", chunk)
+                cursor.execute("DELETE FROM account_daily_summary WHERE summary_date < %s", (bound,))
+                customer_versions.bump_all(cursor, ['transactions'])
+                conn.commit()
+                archived.append((name, rows, path))
+                print(f"Archived {name}: {rows} rows -> {path}")
+        else:
+            # Unpartitioned (SQLite, or MySQL before 'enable'): move one month at a time
+            cursor.execute("SELECT MIN(transaction_date) FROM transactions WHERE transaction_date < %s", (cutoff,))
+            oldest = cursor.fetchall()[0][0]
+            month = month_start(oldest) if oldest else cutoff
+            while month < cutoff:
+                next_month = add_months(month, 1)
+                # The first month also sweeps up anything older than it
+                lower = "transaction_date >= %s AND " if archived else ""
+                summary_lower = "summary_date >= %s AND " if archived else ""
+                params = ((month,) if archived else ()) + (next_month,)
+                cursor.execute(f"SELECT {select_columns} FROM transactions WHERE {lower}transaction_date < %s "
+                               "ORDER BY transaction_date", params)
+                path, rows = write_archive(cursor, month)
+                # One transaction per month: the rows either all leave the table or none do
+                conn.rollback()
+                conn.start_transaction()
+                cursor.execute("DELETE FROM transaction_search_terms WHERE transaction_id IN "
+                               f"(SELECT transaction_id FROM transactions WHERE {lower}transaction_date < %s)", params)
+                cursor.execute(f"DELETE FROM transactions WHERE {lower}transaction_date < %s", params)
+                cursor.execute(f"DELETE FROM account_daily_summary WHERE {summary_lower}summary_date < %s", params)
+                customer_versions.bump_all(cursor, ['transactions'])
+                conn.commit()
+                archived.append((partition_name(month), rows, path))
+                print(f"Archived {partition_name(month)}: {rows} rows -> {path}")
+                month = next_month
+
+        if not archived:
+            print(f"Nothing older than {cutoff:%Y-%m} to archive.")
+        return archived
+
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def print_status():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        partitions = list_partitions(cursor)
+        if partitions:
+            print(f"{'Partition':<12} {'Less than':<14} {'Rows (approx)':>14}")
+            for name, bound, rows in partitions:
+                bound = partition_bound(bound)
+                print(f"{name:<12} {bound.isoformat() if bound else 'MAXVALUE':<14} {rows:>14,}")
+        else:
+            print("transactions is not partitioned.")
+    finally:
+        cursor.close()
+        conn.close()
+
+    files = archive_files()
+    print(f"{len(files)} archive file(s)")
+    for path in files:
+        print(f"  {path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='transactions partition maintenance and archival')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    subcommands.add_parser('status', help='list partitions and archive files')
+    enable = subcommands.add_parser('enable', help='partition the existing table by month (MySQL)')
+    enable.add_argument('--months-ahead', type=int, default=DB_PARTITION_MONTHS_AHEAD)
+    future = subcommands.add_parser('create-future', help='create partitions for the coming months')
+    future.add_argument('--months-ahead', type=int, default=DB_PARTITION_MONTHS_AHEAD)
+    archive = subcommands.add_parser('archive', help='move old months to compressed Parquet files')
+    archive.add_argument('--older-than', type=int, default=DB_ARCHIVE_AFTER_MONTHS, metavar='MONTHS')
+    args = parser.parse_args()
+
+    if args.command == 'status':
+        print_status()
+    elif args.command == 'enable':
+        enable_partitioning(args.months_ahead)
+    elif args.command == 'create-future':
+        create_future_partitions(args.months_ahead)
+    else:
+        archive_old_months(args.older_than)
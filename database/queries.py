@@ -0,0 +1,347 @@
+# ⚡ Hot query registry (server-side prepared statements)
+"""
+Statements that run thousands of times a minute, executed through
+server-side prepared cursors that are cached per pooled connection.
+
+Every SQL string handed to the connector here is a module-level constant
+(the connector only reuses a prepared statement for the identical string
+object), including the fixed set of transaction listing variants that
+replace the f-string filters in /api/transactions and the export.
+
+Per-customer transaction queries filter on the denormalised
+transactions.customer_id, so each one is a range scan of
+idx_transactions_customer_date (customer_id, transaction_date DESC,
+transaction_id DESC) rather than a join through accounts. Credit/debit
+summary stats add up account_daily_summary rows (one per account per day)
+instead of the raw transactions, and searches are index range lookups in
+transaction_search_terms (see database/search_index.py).
+"""
+import base64
+import json
+from datetime import date, datetime, time, timedelta
+from config.db_config import execute_prepared, is_sqlite
+from database.search_index import SEARCH_MAX_TERMS, search_terms, prefix_bounds
+
+
+def balance_sql(table='accounts'):
+    """`table`'s balance plus its credits not yet folded in by the hot-account sweeper (database/hot_accounts.py)."""
+    return (f'({table}.balance + COALESCE((SELECT SUM(p.amount) FROM pending_credits p '
+            f'WHERE p.account_id = {table}.account_id), 0))')
+
+
+ACCOUNT_BALANCE = balance_sql()
+
+HOT_QUERIES = {
+    # Balance lookups (including unswept hot-account credits)
+    'active_account_balance': f"SELECT {ACCOUNT_BALANCE}, customer_id FROM accounts WHERE account_id = %s AND status = 'Active'",
+    'owned_account_balance': f"SELECT {ACCOUNT_BALANCE} FROM accounts WHERE account_id = %s AND customer_id = %s AND status = 'Active'",
+    'primary_account_balance': f"SELECT account_id, {ACCOUNT_BALANCE} FROM accounts WHERE customer_id = %s AND is_primary = TRUE AND status = 'Active' LIMIT 1",
+    'lock_account_balance': "SELECT balance FROM accounts WHERE account_id = %s FOR UPDATE",
+    # Receiver lookups
+    'primary_account_id': "SELECT account_id FROM accounts WHERE customer_id = %s AND is_primary = TRUE AND status = 'Active' LIMIT 1",
+    'receiver_by_account_number': "SELECT account_id, customer_id FROM accounts WHERE account_number = %s AND status = 'Active'",
+    'account_ids_by_customer': "SELECT account_id FROM accounts WHERE customer_id = %s",
+    # Predictions
+    'insert_prediction': '''
+        INSERT INTO predictions (customer_id, score, decision, confidence, shap_values)
+        VALUES (%s, %s, %s, %s, %s)
+    ''',
+    # Customer features (model/feature_engineering.py)
+    'customer_by_id': 'SELECT * FROM customers WHERE customer_id = %s',
+    'employment_by_customer': 'SELECT * FROM employment_info WHERE customer_id = %s',
+    'count_loans': 'SELECT COUNT(*) FROM loans WHERE customer_id = %s',
+    'count_loans_by_status': 'SELECT COUNT(*) FROM loans WHERE customer_id = %s AND status = %s',
+    'count_payments': 'SELECT COUNT(*) FROM payments WHERE loan_id IN (SELECT loan_id FROM loans WHERE customer_id = %s)',
+    'count_payments_by_status': 'SELECT COUNT(*) FROM payments WHERE loan_id IN (SELECT loan_id FROM loans WHERE customer_id = %s) AND payment_status = %s',
+    'count_transactions': 'SELECT COUNT(*) FROM transactions WHERE customer_id = %s',
+    'avg_transaction_amount_by_type': 'SELECT AVG(amount) FROM transactions WHERE customer_id = %s AND transaction_type = %s',
+    # Change counters behind the API ETags: the global epoch row and the customer's (database/customer_versions.py)
+    'customer_versions': '''
+        SELECT customer_id, transactions_version, loan_applications_version
+        FROM customer_versions WHERE customer_id IN (%s, %s)
+    ''',
+    # Sender and receiver names for /api/transfer MOBILE descriptions
+    'customer_names': "SELECT customer_id, full_name FROM customers WHERE customer_id IN (%s, %s)",
+    # Why the ledger refused a transfer (database/ledger.py)
+    'ledger_accounts': "SELECT account_id, customer_id, balance, status FROM accounts WHERE account_id IN (%s, %s)",
+    # A committed transfer's two rows for the event stream (database/transaction_events.py publish_transfer)
+    'transactions_by_ids': '''
+        SELECT t.customer_id, t.transaction_id, t.transaction_date, t.transaction_type, t.amount,
+               t.merchant, t.category, t.description, a.account_number, a.account_type
+        FROM transactions t
+        JOIN accounts a ON a.account_id = t.account_id
+        WHERE t.transaction_id IN (%s, %s)
+    ''',
+    # Summary stats from the account_daily_summary rollup (see summary_stats_query)
+    'summary_stats': '''
+        SELECT SUM(total_credits), SUM(total_debits), SUM(transaction_count)
+        FROM account_daily_summary WHERE customer_id = %s
+    ''',
+    'summary_stats_since': '''
+        SELECT SUM(total_credits), SUM(total_debits), SUM(transaction_count)
+        FROM account_daily_summary WHERE customer_id = %s AND summary_date >= %s
+    ''',
+}
+
+
+def run_query(conn, name, params=()):
+    """Execute registered statement `name` and return its cursor."""
+    return execute_prepared(conn, HOT_QUERIES[name], params)
+
+
+def fetch_one(conn, name, params=()):
+    """Execute registered statement `name` and return its first row (or None)."""
+    rows = run_query(conn, name, params).fetchall()
+    return rows[0] if rows else None
+
+
+def fetch_all(conn, name, params=()):
+    """Execute registered statement `name` and return all rows."""
+    return run_query(conn, name, params).fetchall()
+
+
+def inserted_ids(lastrowid, count):
+    """Ids of the rows of one multi-row INSERT: MySQL reports the first (InnoDB hands a simple
+    INSERT consecutive ids), SQLite the last."""
+    first = lastrowid - count + 1 if is_sqlite() else lastrowid
+    return list(range(first, first + count))
+
+
+# ============================
+# Transaction listing variants
+# ============================
+DATE_RANGE_DAYS = {'today': 0, 'week': 7, 'month': 30, '3months': 90}
+
+# transaction_type filter value -> (column, value)
+TRANSACTION_TYPE_FILTERS = {
+    'credit': ('transaction_type', 'Credit'),
+    'debit': ('transaction_type', 'Debit'),
+    'transfer': ('category', 'Transfer'),
+}
+
+_DATE_CLAUSE = "AND t.transaction_date >= %s"
+_SUMMARY_DATE_CLAUSE = "AND r.summary_date >= %s"
+_TYPE_CLAUSES = {
+    'transaction_type': "AND t.transaction_type = %s",
+    'category': "AND t.category = %s",
+}
+# One indexed prefix range per search word; a transaction has to match every word
+_TERM_IDS = '''SELECT DISTINCT s.transaction_id FROM transaction_search_terms s
+                WHERE s.customer_id = %s AND s.term >= %s AND s.term < %s'''
+_TERM_WEIGHTS = '''SELECT s.transaction_id, MAX(s.weight) AS weight FROM transaction_search_terms s
+                WHERE s.customer_id = %s AND s.term >= %s AND s.term < %s
+                GROUP BY s.transaction_id'''
+
+
+def _search_hits(terms, scored=False):
+    """Transaction ids (with a relevance score when `scored`) matching all of `terms` search words."""
+    if terms == 1 and not scored:
+        return _TERM_IDS
+    per_term = ' UNION ALL '.join([_TERM_WEIGHTS if scored else _TERM_IDS] * terms)
+    score = ', SUM(h.weight) AS score' if scored else ''
+    return (f"SELECT h.transaction_id{score} FROM ({per_term}) h "
+            f"GROUP BY h.transaction_id HAVING COUNT(*) = {terms}")
+
+_PAGE_COLUMNS = '''
+            t.transaction_id,
+            t.transaction_date,
+            t.transaction_type,
+            t.amount,
+            t.merchant,
+            t.category,
+            t.description,
+            a.account_number,
+            a.account_type'''
+# Names of the _PAGE_COLUMNS, the fields of /api/transactions items and 'transaction' events
+TRANSACTION_FIELDS = ('transaction_id', 'transaction_date', 'transaction_type', 'amount', 'merchant', 'category',
+                      'description', 'account_number', 'account_type')
+
+
+def transaction_values(row):
+    """Field values of a page row in TRANSACTION_FIELDS order (datetime/Decimal left to the JSON encoder)."""
+    return (row[0], row[1], row[2], row[3], row[4] or '', row[5] or '', row[6] or '', row[7], row[8])
+
+_TRANSACTION_SHAPES = {
+    'count': '''
+        SELECT COUNT(*) as total
+        FROM transactions t
+        WHERE t.customer_id = %s {filters}
+    ''',
+    'page': '''
+        SELECT{columns}
+        FROM transactions t
+        JOIN accounts a ON a.account_id = t.account_id
+        WHERE t.customer_id = %s {filters}
+        ORDER BY t.transaction_date DESC, t.transaction_id DESC
+        LIMIT %s OFFSET %s
+    ''',
+    # Keyset page: rows after the cursor's (transaction_date, transaction_id), a seek instead of OFFSET
+    'page_after': '''
+        SELECT{columns}
+        FROM transactions t
+        JOIN accounts a ON a.account_id = t.account_id
+        WHERE t.customer_id = %s {filters}
+          AND (t.transaction_date < %s OR (t.transaction_date = %s AND t.transaction_id < %s))
+        ORDER BY t.transaction_date DESC, t.transaction_id DESC
+        LIMIT %s
+    ''',
+    # Page + filtered total + date-range summary in one round trip: the date range bounds the scan,
+    # the type/search filters only mark rows, the window count sees every row before LIMIT, and the
+    # summary comes from the account_daily_summary rollup.
+    'listing': '''
+        SELECT
+            x.transaction_id,
+            x.transaction_date,
+            x.transaction_type,
+            x.amount,
+            x.merchant,
+            x.category,
+            x.description,
+            a.account_number,
+            a.account_type,
+            x.total_count,
+            s.total_credits,
+            s.total_debits,
+            s.total_transactions
+        FROM (
+            SELECT m.*, SUM(m.matched) OVER () AS total_count
+            FROM (
+                SELECT t.transaction_id, t.account_id, t.transaction_date, t.transaction_type, t.amount,
+                       t.merchant, t.category, t.description,
+                       CASE WHEN 1 = 1 {match} THEN 1 ELSE 0 END AS matched
+                FROM transactions t
+                WHERE t.customer_id = %s {date_filter}
+            ) m
+        ) x
+        JOIN accounts a ON a.account_id = x.account_id
+        CROSS JOIN (
+            SELECT SUM(r.total_credits) AS total_credits, SUM(r.total_debits) AS total_debits,
+                   SUM(r.transaction_count) AS total_transactions
+            FROM account_daily_summary r
+            WHERE r.customer_id = %s {summary_date_filter}
+        ) s
+        WHERE x.matched = 1
+        ORDER BY x.transaction_date DESC, x.transaction_id DESC
+        LIMIT %s OFFSET %s
+    ''',
+    # Search results by relevance (summed field weights of the matched words), then newest first
+    'page_ranked': '''
+        SELECT{columns}
+        FROM ({ranked_hits}) r
+        JOIN transactions t ON t.transaction_id = r.transaction_id
+        JOIN accounts a ON a.account_id = t.account_id
+        WHERE t.customer_id = %s {base_filters}
+        ORDER BY r.score DESC, t.transaction_date DESC, t.transaction_id DESC
+        LIMIT %s OFFSET %s
+    ''',
+    'export': '''
+        SELECT t.transaction_date, t.transaction_type, t.amount,
+               t.merchant, t.category, t.description
+        FROM transactions t
+        WHERE t.customer_id = %s {filters}
+        ORDER BY t.transaction_date DESC, t.transaction_id DESC
+    ''',
+}
+
+
+# Placeholder groups in binding order (default: customer, date, type, search); see transaction_query
+_SHAPE_PARAM_ORDER = {
+    # Type/search filters are evaluated in the select list, ahead of the WHERE; the rollup binds last
+    'listing': ('type', 'search', 'customer', 'date', 'summary'),
+    'page_ranked': ('search', 'customer', 'date', 'type'),
+}
+_DEFAULT_PARAM_ORDER = ('customer', 'date', 'type', 'search')
+
+
+def _build_transaction_variants():
+    """Pre-render every (shape, date?, type column, search words) combination once."""
+    variants = {}
+    for shape, template in _TRANSACTION_SHAPES.items():
+        for has_date in (False, True):
+            for type_column in (None, 'transaction_type', 'category'):
+                for terms in range(SEARCH_MAX_TERMS + 1):
+                    if shape == 'page_ranked' and not terms:
+                        continue
+                    date_filter = _DATE_CLAUSE if has_date else ''
+                    type_filter = _TYPE_CLAUSES[type_column] if type_column else ''
+                    search_filter = f"AND t.transaction_id IN ({_search_hits(terms)})" if terms else ''
+                    match = ' '.join(clause for clause in (type_filter, search_filter) if clause)
+                    variants[(shape, has_date, type_column, terms)] = template.format(
+                        filters=' '.join(clause for clause in (date_filter, match) if clause),
+                        base_filters=' '.join(clause for clause in (date_filter, type_filter) if clause),
+                        date_filter=date_filter, match=match, columns=_PAGE_COLUMNS,
+                        ranked_hits=_search_hits(terms, scored=True) if terms else '',
+                        summary_date_filter=_SUMMARY_DATE_CLAUSE if has_date else '')
+    return variants
+
+
+TRANSACTION_VARIANTS = _build_transaction_variants()
+
+
+def date_range_start(date_range, today=None):
+    """Start of a named date range as a datetime, or None for 'all'/unknown ranges."""
+    today = today or date.today()
+    if date_range == 'year':
+        try:
+            start = today.replace(year=today.year - 1)
+        except ValueError:  # 29 February
+            start = today.replace(year=today.year - 1, day=28)
+    elif date_range in DATE_RANGE_DAYS:
+        start = today - timedelta(days=DATE_RANGE_DAYS[date_range])
+    else:
+        return None
+    return datetime.combine(start, time.min)
+
+
+def transaction_query(shape, customer_id, date_range='all', transaction_type='all', search=''):
+    """Pick the prepared variant for these filters and build its parameters.
+
+    Returns (sql, params); 'page', 'page_ranked' and 'listing' callers append
+    LIMIT and OFFSET values, 'page_after' callers append cursor_params(cursor)
+    and LIMIT. 'page_ranked' needs at least one search word.
+    """
+    start = date_range_start(date_range)
+    type_filter = TRANSACTION_TYPE_FILTERS.get(transaction_type)
+    terms = search_terms(search)
+
+    groups = {
+        'customer': [customer_id],
+        'date': [start] if start is not None else [],
+        'type': [type_filter[1]] if type_filter else [],
+        'search': [value for term in terms for value in (customer_id, *prefix_bounds(term))],
+    }
+    if shape == 'listing':
+        groups['summary'] = summary_stats_query(customer_id, date_range)[1]
+    params = [value for group in _SHAPE_PARAM_ORDER.get(shape, _DEFAULT_PARAM_ORDER) for value in groups[group]]
+
+    key = (shape, start is not None, type_filter[0] if type_filter else None, len(terms))
+    return TRANSACTION_VARIANTS[key], params
+
+
+def summary_stats_query(customer_id, date_range='all'):
+    """(sql, params) for the credit/debit totals and count over a date range, from the rollup."""
+    start = date_range_start(date_range)
+    if start is None:
+        return HOT_QUERIES['summary_stats'], [customer_id]
+    return HOT_QUERIES['summary_stats_since'], [customer_id, start.date()]
+
+
+def encode_cursor(row):
+    """Opaque next-page cursor for the last row of a 'page'/'page_after' result."""
+    raw = json.dumps([row[1].isoformat() if row[1] else None, row[0]], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """(transaction_date, transaction_id) from encode_cursor; ValueError when malformed."""
+    try:
+        when, transaction_id = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        return datetime.fromisoformat(when), int(transaction_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError('invalid cursor') from e
+
+
+def cursor_params(cursor):
+    """Parameters for the 'page_after' keyset predicate."""
+    when, transaction_id = cursor
+    return [when, when, transaction_id]
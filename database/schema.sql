@@ -28,6 +28,7 @@ CREATE TABLE IF NOT EXISTS accounts (
     opened_date DATE,
     status ENUM('Active', 'Closed', 'Suspended') DEFAULT 'Active',
     is_primary BOOLEAN DEFAULT FALSE,
+    INDEX idx_accounts_customer_status (customer_id, status, is_primary),
     FOREIGN KEY (customer_id) REFERENCES customers(customer_id)
 );
 
@@ -37,6 +38,7 @@ CREATE TABLE IF NOT EXISTS accounts (
 CREATE TABLE IF NOT EXISTS transactions (
     transaction_id BIGINT AUTO_INCREMENT PRIMARY KEY,
     account_id INT,
+    customer_id INT,  -- denormalised from accounts so per-customer listings skip the join
     transaction_date DATETIME,
     transaction_type ENUM('Credit', 'Debit'),
     amount DECIMAL(15,2),
@@ -53,11 +55,38 @@ CREATE TABLE IF NOT EXISTS transactions (
     initiated_at TIMESTAMP NULL,
     completed_at TIMESTAMP NULL,
     remarks VARCHAR(255) NULL,
+    INDEX idx_transactions_customer_date (customer_id, transaction_date DESC, transaction_id DESC),
+    INDEX idx_transactions_account_date (account_id, transaction_date),
+    INDEX idx_transactions_account_category_date (account_id, category, transaction_date),
+    INDEX idx_transactions_category (category),
     FOREIGN KEY (account_id) REFERENCES accounts(account_id),
     FOREIGN KEY (counterparty_account_id) REFERENCES accounts(account_id)
 );
 
 
+-- Per-account daily rollup of transactions for summary stats (kept in step by database/daily_summary.py)
+CREATE TABLE IF NOT EXISTS account_daily_summary (
+    account_id INT NOT NULL,
+    customer_id INT,
+    summary_date DATE NOT NULL,
+    total_credits DECIMAL(15,2) NOT NULL DEFAULT 0,
+    total_debits DECIMAL(15,2) NOT NULL DEFAULT 0,
+    transaction_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (account_id, summary_date),
+    INDEX idx_account_daily_summary_customer_date (customer_id, summary_date),
+    FOREIGN KEY (account_id) REFERENCES accounts(account_id)
+);
+
+-- Word index over transactions' merchant, category and description for search (database/search_index.py)
+CREATE TABLE IF NOT EXISTS transaction_search_terms (
+    customer_id INT NOT NULL,
+    term VARCHAR(32) NOT NULL,
+    transaction_id BIGINT NOT NULL,
+    weight TINYINT NOT NULL,
+    PRIMARY KEY (customer_id, term, transaction_id),
+    INDEX idx_transaction_search_terms_transaction (transaction_id)
+);
+
 -- ============================
 -- 4. Loans Table
 -- ============================
@@ -70,6 +99,7 @@ CREATE TABLE IF NOT EXISTS loans (
     issue_date DATE,
     due_date DATE,
     status ENUM('Active', 'Closed', 'Defaulted') DEFAULT 'Active',
+    INDEX idx_loans_customer_status (customer_id, status),
     FOREIGN KEY (customer_id) REFERENCES customers(customer_id)
 );
 
@@ -103,6 +133,7 @@ CREATE TABLE IF NOT EXISTS loan_applications (
     reviewed_date TIMESTAMP NULL,
     reviewer_notes TEXT,
     rejection_reason VARCHAR(255),
+    INDEX idx_loan_applications_customer_status_applied (customer_id, application_status, applied_date),
     FOREIGN KEY (customer_id) REFERENCES customers(customer_id)
 );
 
@@ -115,6 +146,7 @@ CREATE TABLE IF NOT EXISTS payments (
     payment_date DATE,
     amount_paid DECIMAL(15,2),
     payment_status ENUM('On-Time', 'Late', 'Missed'),
+    INDEX idx_payments_loan_status (loan_id, payment_status),
     FOREIGN KEY (loan_id) REFERENCES loans(loan_id)
 );
 
@@ -129,6 +161,7 @@ CREATE TABLE IF NOT EXISTS employment_info (
     annual_income DECIMAL(15,2),
     years_at_job INT,
     employment_type ENUM('Salaried', 'Self-Employed', 'Unemployed'),
+    INDEX idx_employment_customer (customer_id),
     FOREIGN KEY (customer_id) REFERENCES customers(customer_id)
 );
 
@@ -142,6 +175,7 @@ CREATE TABLE IF NOT EXISTS credit_scores (
     model_version VARCHAR(50),
     calculated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     risk_level ENUM('Low', 'Medium', 'High'),
+    INDEX idx_credit_scores_customer_calculated (customer_id, calculated_at),
     FOREIGN KEY (customer_id) REFERENCES customers(customer_id)
 );
 
@@ -161,3 +195,50 @@ CREATE TABLE IF NOT EXISTS model_features (
     last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (customer_id) REFERENCES customers(customer_id)
 );
+
+-- ============================
+-- 9. Predictions Table (credit score predictions)
+-- ============================
+CREATE TABLE IF NOT EXISTS predictions (
+    prediction_id INT AUTO_INCREMENT PRIMARY KEY,
+    customer_id INT NOT NULL,
+    score DECIMAL(6,2) NOT NULL,
+    decision ENUM('Approved', 'Declined', 'Review') NOT NULL,
+    confidence DECIMAL(3,2) NOT NULL,
+    shap_values JSON,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_predictions_customer_created (customer_id, created_at),
+    FOREIGN KEY (customer_id) REFERENCES customers(customer_id)
+);
+
+-- ============================
+-- 10. Customer Versions (change counters behind API ETags, see database/customer_versions.py)
+-- ============================
+-- customer_id 0 holds the global epoch bumped by bulk loads and archival
+CREATE TABLE IF NOT EXISTS customer_versions (
+    customer_id INT PRIMARY KEY,
+    transactions_version BIGINT NOT NULL DEFAULT 0,
+    loan_applications_version BIGINT NOT NULL DEFAULT 0
+);
+
+-- ============================
+-- 11. Hot Accounts (credits deferred through pending_credits, see database/hot_accounts.py)
+-- ============================
+CREATE TABLE IF NOT EXISTS hot_accounts (
+    account_id INT PRIMARY KEY,
+    flagged_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (account_id) REFERENCES accounts(account_id)
+);
+
+-- Append-only, and without a foreign key to accounts (its check would share-lock the hot row).
+-- transaction_id is the payer's Debit row, the sweeper writes the Credit row
+CREATE TABLE IF NOT EXISTS pending_credits (
+    credit_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    account_id INT NOT NULL,
+    customer_id INT,
+    amount DECIMAL(15,2) NOT NULL,
+    transaction_id BIGINT NOT NULL,
+    description VARCHAR(255) NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_pending_credits_account (account_id, amount)
+);
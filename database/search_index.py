@@ -0,0 +1,185 @@
+# 🔎 Word index for transaction search (transaction_search_terms)
+"""
+Each transaction's merchant, category and description are split into
+lower-case ASCII words, stored once per (customer, word, transaction) with a
+weight for the fields the word appears in (merchant 3, category 2,
+description 1). A search word matches every indexed word it is a prefix of
+through an index range on (customer_id, term), so a lookup reads only that
+customer's matching words however long their history is. Multi-word
+searches need every word to match and rank by the summed weights.
+
+Every path that inserts transactions passes the new ids to
+index_transactions() before committing; the backfill command rebuilds the
+index from the transactions table.
+
+Usage (from the repository root):
+    python database/search_index.py backfill
+    python database/search_index.py backfill --ids 1 100000
+    python database/search_index.py terms "Grocery Store #12"
+"""
+
+import argparse
+import re
+import sys
+import os
+import unicodedata
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.db_config import get_db_connection
+
+SEARCH_FIELD_WEIGHTS = (('merchant', 3), ('category', 2), ('description', 1))
+SEARCH_MAX_TERMS = 4        # words of a search that are used, the rest are ignored
+SEARCH_TERM_LENGTH = 32     # indexed words are truncated to the column width
+MIN_INDEXED_LENGTH = 2      # single characters are not indexed (but work as search prefixes)
+BACKFILL_CHUNK_ROWS = 50000  # transaction_id range per backfill transaction
+INSERT_BATCH_ROWS = 1000     # term rows per multi-row INSERT
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+# Alphabet order shared by MySQL's default collation and SQLite's BINARY one
+_ALPHABET = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def words(text):
+    """Lower-case ASCII words of `text` (accents folded, punctuation dropped)."""
+    if not text:
+        return []
+    folded = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode().lower()
+    return [word[:SEARCH_TERM_LENGTH] for word in _WORD_RE.findall(folded)]
+
+
+def search_terms(search):
+    """Distinct words of a search string, at most SEARCH_MAX_TERMS of them."""
+    terms = []
+    for word in words(search):
+        if word not in terms:
+            terms.append(word)
+    return terms[:SEARCH_MAX_TERMS]
+
+
+def prefix_bounds(term):
+    """(low, high) such that low <= word < high holds exactly for the words starting with `term`."""
+    stem = term.rstrip(_ALPHABET[-1])
+    if not stem:
+        # 'z', 'zz', ...: everything from `term` up, below a value longer than any indexed word
+        return term, _ALPHABET[-1] * (SEARCH_TERM_LENGTH + 1)
+    return term, stem[:-1] + _ALPHABET[_ALPHABET.index(stem[-1]) + 1]
+
+
+def matches(search, values):
+    """Python version of the indexed match, for rows outside the table (archived months)."""
+    terms = search_terms(search)
+    indexed = {word for value in values for word in words(value)}
+    return all(any(word.startswith(term) for word in indexed) for term in terms)
+
+
+def term_rows(transactions):
+    """(customer_id, term, transaction_id, weight) rows for (transaction_id, customer_id, merchant, category, description) rows."""
+    rows = []
+    for transaction_id, customer_id, *fields in transactions:
+        if customer_id is None:
+            continue
+        weights = {}
+        for (_, weight), value in zip(SEARCH_FIELD_WEIGHTS, fields):
+            for word in set(words(value)):
+                if len(word) >= MIN_INDEXED_LENGTH:
+                    weights[word] = weights.get(word, 0) + weight
+        rows.extend((customer_id, word, transaction_id, weight) for word, weight in weights.items())
+    return rows
+
+_SOURCE_COLUMNS = 'transaction_id, customer_id, ' + ', '.join(field for field, _ in SEARCH_FIELD_WEIGHTS)
+_INSERT = 'INSERT INTO transaction_search_terms (customer_id, term, transaction_id, weight) VALUES '
+
+
+def source_statement(transaction_ids):
+    """(sql, params) reading the indexed fields of these transactions."""
+    placeholders = ', '.join(['%s'] * len(transaction_ids))
+    return (f"SELECT {_SOURCE_COLUMNS} FROM transactions WHERE transaction_id IN ({placeholders})",
+            list(transaction_ids))
+
+
+def insert_statements(rows):
+    """Multi-row INSERT (sql, params) pairs for term rows, INSERT_BATCH_ROWS at a time."""
+    for offset in range(0, len(rows), INSERT_BATCH_ROWS):
+        batch = rows[offset:offset + INSERT_BATCH_ROWS]
+        yield _INSERT + ', '.join(['(%s, %s, %s, %s)'] * len(batch)), [value for row in batch for value in row]
+
+
+def index_transactions(cursor, transaction_ids):
+    """Index new transactions; call in the transaction that inserted them."""
+    if not transaction_ids:
+        return
+    cursor.execute(*source_statement(transaction_ids))
+    for statement in insert_statements(term_rows(cursor.fetchall())):
+        cursor.execute(*statement)
+
+
+def rebuild_range(cursor, low, high):
+    """Re-index transactions low..high (by transaction_id); returns the number of term rows."""
+    cursor.execute("DELETE FROM transaction_search_terms WHERE transaction_id BETWEEN %s AND %s", (low, high))
+    cursor.execute(f"SELECT {_SOURCE_COLUMNS} FROM transactions WHERE transaction_id BETWEEN %s AND %s", (low, high))
+    rows = term_rows(cursor.fetchall())
+    for statement in insert_statements(rows):
+        cursor.execute(*statement)
+    return len(rows)
+
+
+def transaction_range(cursor, first=None, last=None):
+    cursor.execute("SELECT MIN(transaction_id), MAX(transaction_id) FROM transactions")
+    low, high = cursor.fetchall()[0]
+    if low is None:
+        return None, None
+    return max(low, first or low), min(high, last or high)
+
+
+def rebuild_all(cursor, chunk=BACKFILL_CHUNK_ROWS):
+    """Re-index every transaction in bounded chunks inside the caller's transaction."""
+    low, high = transaction_range(cursor)
+    while low is not None and low <= high:
+        rebuild_range(cursor, low, min(low + chunk - 1, high))
+        low += chunk
+
+
+def backfill(first=None, last=None, chunk=BACKFILL_CHUNK_ROWS):
+    """Rebuild the index for transaction ids first..last (default: all), one transaction per chunk."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        low, high = transaction_range(cursor, first, last)
+        if low is None:
+            print("No transactions to index.")
+            return
+        print(f"Indexing transactions {low}..{high}")
+        while low <= high:
+            upper = min(low + chunk - 1, high)
+            conn.rollback()
+            conn.start_transaction()
+            terms = rebuild_range(cursor, low, upper)
+            conn.commit()
+            print(f"  transactions {low}..{upper}: {terms:,} terms", flush=True)
+            low = upper + 1
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='transaction search index maintenance')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    rebuild = subcommands.add_parser('backfill', help='rebuild the search index from transactions')
+    rebuild.add_argument('--ids', type=int, nargs=2, metavar=('FIRST', 'LAST'),
+                         help='only re-index this transaction_id range')
+    rebuild.add_argument('--chunk', type=int, default=BACKFILL_CHUNK_ROWS, help='transactions per transaction')
+    show = subcommands.add_parser('terms', help='print the search words of a text')
+    show.add_argument('text')
+    args = parser.parse_args()
+
+    if args.command == 'backfill':
+        first, last = args.ids or (None, None)
+        backfill(first, last, args.chunk)
+        print("Backfill complete.")
+    else:
+        print(' '.join(words(args.text)))
@@ -0,0 +1,202 @@
+# 📡 In-process publish/subscribe hub for transaction and transfer events
+"""
+Feeds GET /api/stream/transactions (Server-Sent Events). Each open stream
+subscribes for its customer and gets a bounded queue; the transfer paths
+publish the committed rows to both customers and the completion to the
+sender. Publishing is a dictionary lookup when nobody is listening, so the
+transfer paths check has_subscribers() before reading anything back.
+
+A subscriber that falls EVENTS_QUEUE_SIZE events behind loses its queue and
+receives a single 'resync' event instead, telling the client to re-fetch
+/api/transactions. Subscriptions work from threads (Flask) and from an
+asyncio loop (Quart): pass the loop to subscribe() and use wait() there.
+
+The transfer paths of both blueprints (and the async one) publish through
+publish_transfer() / publish_transfer_async() and publish_batch() after
+they commit.
+
+The hub only sees transfers made by this process. With several worker
+processes, clients whose stream landed on another worker still get the rows
+when they reconnect (every EVENTS_MAX_STREAM_SECONDS) through the resync.
+"""
+import asyncio
+import itertools
+import os
+import threading
+from collections import deque
+
+from database.queries import HOT_QUERIES, fetch_all, TRANSACTION_FIELDS, transaction_values
+
+EVENTS_QUEUE_SIZE = int(os.environ.get('EVENTS_QUEUE_SIZE', 100))  # pending events per subscriber
+EVENTS_HEARTBEAT = float(os.environ.get('EVENTS_HEARTBEAT', 15))  # seconds between keep-alive comments
+EVENTS_MAX_STREAM_SECONDS = float(os.environ.get('EVENTS_MAX_STREAM_SECONDS', 300))  # clients then reconnect
+EVENTS_RETRY_MS = int(os.environ.get('EVENTS_RETRY_MS', 3000))  # reconnect delay sent to EventSource
+EVENTS_MAX_SUBSCRIBERS = int(os.environ.get('EVENTS_MAX_SUBSCRIBERS', 500))
+EVENTS_MAX_SUBSCRIBERS_PER_CUSTOMER = int(os.environ.get('EVENTS_MAX_SUBSCRIBERS_PER_CUSTOMER', 5))
+
+_subscribers = {}  # customer_id -> set of Subscription
+_lock = threading.Lock()
+_event_ids = itertools.count(1)
+_stats = {'published': 0, 'delivered': 0, 'overflows': 0, 'publish_errors': 0}
+
+
+class SubscriberLimitError(Exception):
+    """Raised by subscribe() when a subscriber limit rejects the stream."""
+
+
+class Subscription:
+    """One stream's bounded queue of (event id, event name, data) tuples."""
+
+    def __init__(self, customer_id, loop=None):
+        self.customer_id = customer_id
+        self.events = deque()
+        self.overflowed = False
+        self._loop = loop
+        self._ready = threading.Event() if loop is None else asyncio.Event()
+
+    def _push(self, event):
+        """Queue `event` (called with the hub lock held)."""
+        if len(self.events) >= EVENTS_QUEUE_SIZE:
+            self.events.clear()
+            self.overflowed = True
+            _stats['overflows'] += 1
+        else:
+            self.events.append(event)
+        if self._loop is None:
+            self._ready.set()
+        else:
+            try:
+                self._loop.call_soon_threadsafe(self._ready.set)
+            except RuntimeError:
+                pass  # the stream's loop has shut down
+
+    def _drain(self):
+        with _lock:
+            self._ready.clear()
+            events = list(self.events)
+            self.events.clear()
+            if self.overflowed:
+                self.overflowed = False
+                events = [(next(_event_ids), 'resync', {'reason': 'overflow'})]
+            _stats['delivered'] += len(events)
+        return events
+
+    def get(self, timeout):
+        """Pending events, waiting up to `timeout` seconds for the first; [] on timeout."""
+        if not self.events and not self.overflowed:
+            self._ready.wait(timeout)
+        return self._drain()
+
+    async def wait(self, timeout):
+        """get() for subscriptions made with an event loop."""
+        if not self.events and not self.overflowed:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self._drain()
+
+
+def subscribe(customer_id, loop=None):
+    """Register a stream for `customer_id`; SubscriberLimitError when a limit is reached."""
+    subscription = Subscription(customer_id, loop)
+    with _lock:
+        if sum(len(subscriptions) for subscriptions in _subscribers.values()) >= EVENTS_MAX_SUBSCRIBERS:
+            raise SubscriberLimitError('Too many open streams, please try again shortly')
+        if len(_subscribers.get(customer_id, ())) >= EVENTS_MAX_SUBSCRIBERS_PER_CUSTOMER:
+            raise SubscriberLimitError(f'At most {EVENTS_MAX_SUBSCRIBERS_PER_CUSTOMER} streams can be open at once')
+        _subscribers.setdefault(customer_id, set()).add(subscription)
+    return subscription
+
+
+def unsubscribe(subscription):
+    with _lock:
+        subscriptions = _subscribers.get(subscription.customer_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del _subscribers[subscription.customer_id]
+
+
+def has_subscribers(customer_ids):
+    return any(customer_id in _subscribers for customer_id in customer_ids)
+
+
+def publish(customer_id, event, data):
+    """Queue `event` with `data` for every stream of `customer_id`."""
+    with _lock:
+        subscriptions = _subscribers.get(customer_id)
+        if not subscriptions:
+            return
+        message = (next(_event_ids), event, data)
+        for subscription in subscriptions:
+            subscription._push(message)
+        _stats['published'] += 1
+
+
+def _publish_rows(transactions, sender_customer_id, transfer):
+    """Publish a committed transfer: each (customer_id, row dict) as 'transaction', then `transfer` to the sender."""
+    for customer_id, row in transactions:
+        publish(customer_id, 'transaction', row)
+    publish(sender_customer_id, 'transfer', transfer)
+
+
+def transfer_event(reference_number, amount, transfer_type, transaction_id):
+    """'transfer' event data for the sender of a completed transfer."""
+    return {'reference_number': reference_number, 'status': 'Completed', 'amount': amount,
+            'transfer_type': transfer_type, 'transaction_id': transaction_id}
+
+
+def transfer_event_rows(rows):
+    """(customer_id, transaction dict) pairs from HOT_QUERIES['transactions_by_ids'] rows."""
+    return [(row[0], dict(zip(TRANSACTION_FIELDS, transaction_values(row[1:])))) for row in rows]
+
+
+def publish_transfer(conn, transaction_ids, customer_ids, transfer):
+    """After commit: push the transfer's two rows and its completion to the customers' open
+    streams. Reads nothing when nobody is listening and never raises (the transfer is committed)."""
+    if not has_subscribers(customer_ids):
+        return
+    try:
+        rows = fetch_all(conn, 'transactions_by_ids', transaction_ids)
+        _publish_rows(transfer_event_rows(rows), customer_ids[0], transfer)
+    except Exception:
+        publish_failed()
+
+
+async def publish_transfer_async(conn, transaction_ids, customer_ids, transfer):
+    """publish_transfer() on a config/async_db.py connection."""
+    if not has_subscribers(customer_ids):
+        return
+    try:
+        rows = await conn.fetchall(HOT_QUERIES['transactions_by_ids'], transaction_ids)
+        _publish_rows(transfer_event_rows(rows), customer_ids[0], transfer)
+    except Exception:
+        publish_failed()
+
+
+def publish_batch(customer_ids, sender_customer_id, payload):
+    """Push a committed bulk batch: 'resync' to every customer it touched (rather than
+    thousands of row events) and the counts to the sender as 'bulk_transfer'."""
+    if not customer_ids:
+        return
+    for customer_id in customer_ids:
+        publish(customer_id, 'resync', {'reason': 'bulk_transfer'})
+    publish(sender_customer_id, 'bulk_transfer',
+            {key: payload[key] for key in ('batch_reference', 'completed', 'failed', 'total_amount')})
+
+
+def next_event_id():
+    return next(_event_ids)
+
+
+def publish_failed():
+    with _lock:
+        _stats['publish_errors'] += 1
+
+
+def get_event_stats():
+    with _lock:
+        return dict(_stats, customers=len(_subscribers),
+                    subscribers=sum(len(subscriptions) for subscriptions in _subscribers.values()))
+
@@ -4,12 +4,14 @@ import numpy as np
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 import joblib
 from config.db_config import get_db_connection
+from database.queries import run_query, fetch_one
+from config import model_config
 from datetime import datetime
 
 def load_model_artifacts():
     """Load trained model and preprocessing artifacts."""
     try:
-        model_artifacts = joblib.load('model/credit_model.pkl')
+        model_artifacts = joblib.load(model_config.MODEL_PATH)
         return model_artifacts
     except FileNotFoundError:
         print("Model artifacts not found. Please train the model first.")
@@ -114,7 +116,7 @@ def predict_credit_score(customer_data):
 
     # Generate SHAP values for explainability
     try:
-        explainer = joblib.load('model/shap_explainer.pkl')
+        explainer = joblib.load(model_config.SHAP_EXPLAINER_PATH)
         shap_values = explainer.shap_values(X)[0]  # Get SHAP values for first (only) sample
 
         # Create feature importance dict
@@ -145,95 +147,113 @@ def predict_credit_score(customer_data):
         'shap_values': top_shap
     }
 
+# (feature, registered hot query, extra parameters after customer_id)
+FEATURE_COUNT_QUERIES = [
+    ('total_loans', 'count_loans', ()),
+    ('active_loans', 'count_loans_by_status', ('Active',)),
+    ('loan_defaults_count', 'count_loans_by_status', ('Defaulted',)),
+    ('total_payments', 'count_payments', ()),
+    ('ontime_payments', 'count_payments_by_status', ('On-Time',)),
+    ('missed_payments', 'count_payments_by_status', ('Missed',)),
+    ('transaction_count', 'count_transactions', ()),
+    ('avg_credit', 'avg_transaction_amount_by_type', ('Credit',)),
+]
+
 def get_customer_features(customer_id):
     """Get comprehensive customer features from database."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    conn = get_db_connection(readonly=True)
 
     try:
         # Get basic customer info
-        cursor.execute('SELECT * FROM customers WHERE customer_id = %s', (customer_id,))
-        customer_row = cursor.fetchone()
-        if not customer_row:
+        cursor = run_query(conn, 'customer_by_id', (customer_id,))
+        customer_rows = cursor.fetchall()
+        if not customer_rows:
             return None
 
-        customer = dict(zip([desc[0] for desc in cursor.description], customer_row))
-
-        # Calculate age
-        if customer['dob']:
-            customer['age'] = (datetime.now().date() - customer['dob']).days // 365
-        else:
-            customer['age'] = 30  # Default
+        customer = dict(zip([desc[0] for desc in cursor.description], customer_rows[0]))
 
         # Get employment info
-        cursor.execute('SELECT * FROM employment_info WHERE customer_id = %s', (customer_id,))
-        emp_row = cursor.fetchone()
-        if emp_row:
-            emp = dict(zip([desc[0] for desc in cursor.description], emp_row))
-            customer['annual_income'] = emp['annual_income'] or 0
-            customer['employment_years'] = emp['years_at_job'] or 0
-        else:
-            customer['annual_income'] = 0
-            customer['employment_years'] = 0
-
-        # Get loan info
-        cursor.execute('SELECT COUNT(*) FROM loans WHERE customer_id = %s', (customer_id,))
-        customer['total_loans'] = cursor.fetchone()[0]
-
-        cursor.execute('SELECT COUNT(*) FROM loans WHERE customer_id = %s AND status = "Active"', (customer_id,))
-        customer['active_loans'] = cursor.fetchone()[0]
-
-        cursor.execute('SELECT COUNT(*) FROM loans WHERE customer_id = %s AND status = "Defaulted"', (customer_id,))
-        customer['loan_defaults_count'] = cursor.fetchone()[0]
-
-        # Get payment info
-        cursor.execute('SELECT COUNT(*) FROM payments WHERE loan_id IN (SELECT loan_id FROM loans WHERE customer_id = %s)', (customer_id,))
-        customer['total_payments'] = cursor.fetchone()[0]
-
-        cursor.execute('SELECT COUNT(*) FROM payments WHERE loan_id IN (SELECT loan_id FROM loans WHERE customer_id = %s) AND payment_status = "On-Time"', (customer_id,))
-        customer['ontime_payments'] = cursor.fetchone()[0]
-
-        cursor.execute('SELECT COUNT(*) FROM payments WHERE loan_id IN (SELECT loan_id FROM loans WHERE customer_id = %s) AND payment_status = "Missed"', (customer_id,))
-        customer['missed_payments'] = cursor.fetchone()[0]
-
-        # Calculate ratios
-        customer['on_time_payment_ratio'] = customer['ontime_payments'] / customer['total_payments'] if customer['total_payments'] > 0 else 0
-        customer['missed_payment_ratio'] = customer['missed_payments'] / customer['total_payments'] if customer['total_payments'] > 0 else 0
-
-        # Get transaction info
-        cursor.execute('SELECT COUNT(*) FROM transactions WHERE account_id IN (SELECT account_id FROM accounts WHERE customer_id = %s)', (customer_id,))
-        customer['transaction_count'] = cursor.fetchone()[0]
-
-        cursor.execute('SELECT AVG(amount) FROM transactions WHERE account_id IN (SELECT account_id FROM accounts WHERE customer_id = %s) AND transaction_type = "Credit"', (customer_id,))
-        avg_credit = cursor.fetchone()[0]
-        customer['avg_monthly_balance'] = avg_credit or 0
-
-        # Placeholders for missing features
-        customer['credit_utilization_ratio'] = 0.3  # Placeholder
-        customer['total_credit_limit'] = 10000  # Placeholder
-        customer['total_credit_balance'] = 3000  # Placeholder
-        customer['income_to_loan_ratio'] = customer['annual_income'] / (customer['total_loans'] * 10000 + 1) if customer['total_loans'] > 0 else 0
-        customer['salary_stability_ratio'] = min(customer['employment_years'] / 10, 1)  # Based on years
-        customer['age_of_credit_history'] = customer['employment_years'] * 12  # Months
-        customer['new_credit_inquiries'] = 0  # Placeholder
-        customer['rejection_rate'] = 0  # Placeholder
-        customer['high_value_transaction_flags'] = 0  # Placeholder
-        customer['employment_stability_score'] = customer['employment_years'] / 5  # Simple score
-
-        # Map to model features (placeholders for missing ones)
-        customer['income'] = customer['annual_income']
-        customer['credit_score'] = 650  # Placeholder, since model uses it as feature
-        customer['debt_to_income'] = customer['missed_payment_ratio']  # Approximation
-        customer['loan_amount'] = customer['total_loans'] * 10000  # Approximation
-        customer['loan_term'] = 360  # Default
-        customer['home_ownership'] = 'RENT'  # Default
-        customer['purpose'] = 'PERSONAL'  # Default
-
-        return customer
+        cursor = run_query(conn, 'employment_by_customer', (customer_id,))
+        emp_rows = cursor.fetchall()
+        emp = dict(zip([desc[0] for desc in cursor.description], emp_rows[0])) if emp_rows else None
+
+        # Get loan, payment and transaction info
+        counts = {feature: fetch_one(conn, name, (customer_id,) + extra)[0]
+                  for feature, name, extra in FEATURE_COUNT_QUERIES}
+
+        return build_customer_features(customer, emp, counts)
 
     finally:
         conn.close()
 
+def build_customer_features(customer, emp, counts):
+    """
+    Derive model inputs from the database rows.
+
+    Args:
+        customer (dict): customers row
+        emp (dict): employment_info row, or None
+        counts (dict): FEATURE_COUNT_QUERIES results keyed by feature
+
+    Returns:
+        dict: Customer features accepted by score_customer
+    """
+    customer = dict(customer)
+
+    # Calculate age
+    if customer['dob']:
+        customer['age'] = (datetime.now().date() - customer['dob']).days // 365
+    else:
+        customer['age'] = 30  # Default
+
+    if emp:
+        customer['annual_income'] = emp['annual_income'] or 0
+        customer['employment_years'] = emp['years_at_job'] or 0
+    else:
+        customer['annual_income'] = 0
+        customer['employment_years'] = 0
+
+    # Get loan info
+    customer['total_loans'] = counts['total_loans']
+    customer['active_loans'] = counts['active_loans']
+    customer['loan_defaults_count'] = counts['loan_defaults_count']
+
+    # Get payment info
+    customer['total_payments'] = counts['total_payments']
+    customer['ontime_payments'] = counts['ontime_payments']
+    customer['missed_payments'] = counts['missed_payments']
+
+    # Calculate ratios
+    customer['on_time_payment_ratio'] = customer['ontime_payments'] / customer['total_payments'] if customer['total_payments'] > 0 else 0
+    customer['missed_payment_ratio'] = customer['missed_payments'] / customer['total_payments'] if customer['total_payments'] > 0 else 0
+
+    # Get transaction info
+    customer['transaction_count'] = counts['transaction_count']
+    customer['avg_monthly_balance'] = counts['avg_credit'] or 0
+
+    # Placeholders for missing features
+    customer['credit_utilization_ratio'] = 0.3  # Placeholder
+    customer['total_credit_limit'] = 10000  # Placeholder
+    customer['total_credit_balance'] = 3000  # Placeholder
+    customer['income_to_loan_ratio'] = customer['annual_income'] / (customer['total_loans'] * 10000 + 1) if customer['total_loans'] > 0 else 0
+    customer['salary_stability_ratio'] = min(customer['employment_years'] / 10, 1)  # Based on years
+    customer['age_of_credit_history'] = customer['employment_years'] * 12  # Months
+    customer['new_credit_inquiries'] = 0  # Placeholder
+    customer['rejection_rate'] = 0  # Placeholder
+    customer['high_value_transaction_flags'] = 0  # Placeholder
+    customer['employment_stability_score'] = customer['employment_years'] / 5  # Simple score
+
+    # Map to model features (placeholders for missing ones)
+    customer['income'] = customer['annual_income']
+    customer['credit_score'] = 650  # Placeholder, since model uses it as feature
+    customer['debt_to_income'] = customer['missed_payment_ratio']  # Approximation
+    customer['loan_amount'] = customer['total_loans'] * 10000  # Approximation
+    customer['loan_term'] = 360  # Default
+    customer['home_ownership'] = 'RENT'  # Default
+    customer['purpose'] = 'PERSONAL'  # Default
+
+    return customer
+
 def get_reason(factor, impact):
     """Get reason for a factor's impact."""
     reasons = {
@@ -282,8 +302,18 @@ def predict_credit_score(customer_id):
     Returns:
         dict: JSON output with predicted_score, risk_level, data_sufficiency, explanations, improvement_tips
     """
-    # Get customer features
-    customer = get_customer_features(customer_id)
+    return score_customer(get_customer_features(customer_id))
+
+def score_customer(customer):
+    """
+    Score already-fetched customer features (no database access, so it can run in an executor).
+
+    Args:
+        customer (dict): Output of get_customer_features / build_customer_features, or None
+
+    Returns:
+        dict: Same shape as predict_credit_score
+    """
     if not customer:
         return {
             "predicted_score": -1,
@@ -346,7 +376,7 @@ def predict_credit_score(customer_id):
     # Get SHAP values for top factors
     explanations = []
     try:
-        explainer = joblib.load('model/shap_explainer.pkl')
+        explainer = joblib.load(model_config.SHAP_EXPLAINER_PATH)
         shap_values = explainer.shap_values(X)[0]
 
         feature_names = artifacts['features']
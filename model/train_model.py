@@ -8,6 +8,11 @@ import os
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report
 from sklearn.preprocessing import StandardScaler, LabelEncoder
+import sys
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import model_config
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -138,12 +143,12 @@ def train_model():
         'rmse': rmse
     }
 
-    joblib.dump(model_artifacts, 'model/credit_model.pkl')
-    joblib.dump(explainer, 'model/shap_explainer.pkl')
+    joblib.dump(model_artifacts, model_config.MODEL_PATH)
+    joblib.dump(explainer, model_config.SHAP_EXPLAINER_PATH)
 
     print("Model training completed successfully!")
-    print(f"Model saved to: model/credit_model.pkl")
-    print(f"SHAP explainer saved to: model/shap_explainer.pkl")
+    print(f"Model saved to: {model_config.MODEL_PATH}")
+    print(f"SHAP explainer saved to: {model_config.SHAP_EXPLAINER_PATH}")
 
     return model_artifacts
 
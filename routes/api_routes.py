@@ -1,18 +1,36 @@
 # 🔌 Optional REST API for integration
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, send_file
 from flask import session
+import hashlib
 import json
+import os
+import time
 import bcrypt
-from config.db_config import get_db_connection
+from config.db_config import get_db_connection, get_pool_stats, get_sql_metrics, execute_prepared, mark_recent_write
+from database.queries import (HOT_QUERIES, run_query, fetch_one, fetch_all, transaction_query, summary_stats_query,
+                              date_range_start, encode_cursor, decode_cursor, cursor_params, TRANSACTION_FIELDS,
+                              transaction_values)
+from database.search_index import search_terms
+from database import (bulk_transfers, customer_cache, customer_versions, export_jobs, hot_accounts, ledger,
+                      transaction_events)
 from model.feature_engineering import predict_credit_score
-from datetime import datetime
+from datetime import datetime, date
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 api_bp = Blueprint('api', __name__)
 
 @api_bp.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'service': 'AI Credit Scoring API'})
+    return jsonify({'status': 'healthy', 'service': 'AI Credit Scoring API', 'db_pool': get_pool_stats(),
+                    'sql': get_sql_metrics(), 'events': transaction_events.get_event_stats(),
+                    'ledger': ledger.get_ledger_stats(), 'hot_accounts': hot_accounts.get_hot_account_stats(),
+                    'customer_cache': customer_cache.get_cache_stats()})
 
 @api_bp.route('/predict', methods=['POST'])
 def predict_api():
@@ -35,45 +53,44 @@ def predict_api():
     if prediction_result and prediction_result['data_sufficiency']:
         # Save prediction to database
         conn = get_db_connection()
-        cursor = conn.cursor()
-
-        # Convert explanations to shap_values format for database
-        shap_values = [{'feature': exp['factor'], 'value': 0.1 if exp['impact'] == 'positive' else -0.1}
-                      for exp in prediction_result['explanations'][:5]]
-        shap_json = json.dumps(shap_values)
-
-        # Map risk level to decision
-        decision_map = {
-            'Low Risk': 'Approved',
-            'Medium Risk': 'Approved',
-            'High Risk': 'Declined'
-        }
-        decision = decision_map.get(prediction_result['risk_level'], 'Review')
-
-        cursor.execute('''
-            INSERT INTO predictions (customer_id, score, decision, confidence, shap_values)
-            VALUES (%s, %s, %s, %s, %s)
-        ''', (customer_id, prediction_result['predicted_score'], decision, 0.85, shap_json))
-
+        run_query(conn, 'insert_prediction', prediction_record(customer_id, prediction_result))
         conn.commit()
+        mark_recent_write()
         conn.close()
 
-        # Format response for frontend compatibility
-        response = {
-            'predicted_score': prediction_result['predicted_score'],
-            'decision': decision,
-            'confidence': 0.85,
-            'shap_values': {exp['factor']: 0.1 if exp['impact'] == 'positive' else -0.1
-                           for exp in prediction_result['explanations'][:5]},
-            'risk_level': prediction_result['risk_level'],
-            'data_sufficiency': prediction_result['data_sufficiency'],
-            'explanations': prediction_result['explanations'],
-            'improvement_tips': prediction_result['improvement_tips']
-        }
-        return jsonify(response)
+        return jsonify(prediction_response(prediction_result))
     else:
         return jsonify({'error': 'Insufficient data for credit score prediction'}), 400
 
+# Map risk level to decision
+DECISION_MAP = {
+    'Low Risk': 'Approved',
+    'Medium Risk': 'Approved',
+    'High Risk': 'Declined'
+}
+
+def prediction_record(customer_id, prediction_result):
+    """insert_prediction parameters for a sufficient-data prediction."""
+    # Convert explanations to shap_values format for database
+    shap_values = [{'feature': exp['factor'], 'value': 0.1 if exp['impact'] == 'positive' else -0.1}
+                  for exp in prediction_result['explanations'][:5]]
+    decision = DECISION_MAP.get(prediction_result['risk_level'], 'Review')
+    return (customer_id, prediction_result['predicted_score'], decision, 0.85, json.dumps(shap_values))
+
+def prediction_response(prediction_result):
+    """Format a prediction for frontend compatibility."""
+    return {
+        'predicted_score': prediction_result['predicted_score'],
+        'decision': DECISION_MAP.get(prediction_result['risk_level'], 'Review'),
+        'confidence': 0.85,
+        'shap_values': {exp['factor']: 0.1 if exp['impact'] == 'positive' else -0.1
+                       for exp in prediction_result['explanations'][:5]},
+        'risk_level': prediction_result['risk_level'],
+        'data_sufficiency': prediction_result['data_sufficiency'],
+        'explanations': prediction_result['explanations'],
+        'improvement_tips': prediction_result['improvement_tips']
+    }
+
 @api_bp.route('/signup', methods=['POST'])
 def signup():
     """User registration endpoint"""
@@ -181,20 +198,19 @@ def transfer_money():
         if amount <= 0:
             return jsonify({'error': 'Amount must be greater than 0'}), 400
 
-        if transfer_type not in ['IMPS', 'NEFT', 'RTGS', 'UPI', 'MOBILE']:
+        if transfer_type not in ledger.TRANSFER_TYPES:
             return jsonify({'error': 'Invalid transfer type'}), 400
 
         conn = get_db_connection()
-        cursor = conn.cursor()
 
-        # Verify sender account exists and belongs to authenticated user
-        cursor.execute('SELECT balance FROM accounts WHERE account_id = %s AND status = "Active"', (sender_account_id,))
-        sender_row = cursor.fetchone()
+        # Sender's customer (and a cheap early balance check; the ledger re-checks under lock)
+        sender_row = fetch_one(conn, 'active_account_balance', (sender_account_id,))
         if not sender_row:
             conn.close()
             return jsonify({'error': 'Invalid sender account'}), 404
 
         sender_balance = sender_row[0]
+        sender_customer_id = sender_row[1]
 
         # Check sufficient balance
         if sender_balance < amount:
@@ -202,8 +218,7 @@ def transfer_money():
             return jsonify({'error': 'Insufficient balance'}), 400
 
         # Find receiver account
-        cursor.execute('SELECT account_id, customer_id FROM accounts WHERE account_number = %s AND status = "Active"', (receiver_account_number,))
-        receiver_row = cursor.fetchone()
+        receiver_row = fetch_one(conn, 'receiver_by_account_number', (receiver_account_number,))
         if not receiver_row:
             conn.close()
             return jsonify({'error': 'Receiver account not found'}), 404
@@ -211,56 +226,24 @@ def transfer_money():
         receiver_account_id = receiver_row[0]
         receiver_customer_id = receiver_row[1]
 
-        # Get receiver customer name for mobile transfers
-        receiver_name = receiver_account_number
-        sender_name = sender_account_id  # Default to account ID
+        # Both customers' names for mobile transfers, in one lookup
+        names = {}
         if transfer_type == 'MOBILE':
-            # Get receiver name
-            cursor.execute('SELECT full_name FROM customers WHERE customer_id = %s', (receiver_customer_id,))
-            name_row = cursor.fetchone()
-            if name_row:
-                receiver_name = name_row[0]
-
-            # Get sender name
-            cursor.execute('SELECT c.full_name FROM customers c JOIN accounts a ON c.customer_id = a.customer_id WHERE a.account_id = %s', (sender_account_id,))
-            sender_row = cursor.fetchone()
-            if sender_row:
-                sender_name = sender_row[0]
+            names = dict(fetch_all(conn, 'customer_names', (sender_customer_id, receiver_customer_id)))
 
         # Generate unique reference number
         import uuid
         reference_number = f"TXN{uuid.uuid4().hex[:16].upper()}"
 
-        # Start transaction
-        conn.start_transaction()
-
         try:
-            # Debit sender
-            cursor.execute('UPDATE accounts SET balance = balance - %s WHERE account_id = %s', (amount, sender_account_id))
-
-            # Credit receiver
-            cursor.execute('UPDATE accounts SET balance = balance + %s WHERE account_id = %s', (amount, receiver_account_id))
-
-            # Record transfer
-            cursor.execute('''
-                INSERT INTO transfers (sender_account_id, receiver_account_id, amount, transfer_type, reference_number, status, remarks, completed_at)
-                VALUES (%s, %s, %s, %s, %s, 'Completed', %s, %s)
-            ''', (sender_account_id, receiver_account_id, amount, transfer_type, reference_number, remarks, datetime.now()))
-
-            # Record transactions for both accounts
-            debit_description = f'Mobile transfer to {receiver_name}' if transfer_type == 'MOBILE' else f'Transfer to {receiver_account_number}'
-            cursor.execute('''
-                INSERT INTO transactions (account_id, transaction_date, transaction_type, amount, merchant, category, description)
-                VALUES (%s, %s, 'Debit', %s, 'Money Transfer', 'Transfer', %s)
-            ''', (sender_account_id, datetime.now(), amount, debit_description))
-
-            credit_description = f'Received from {sender_name}' if transfer_type == 'MOBILE' else f'Received from transfer'
-            cursor.execute('''
-                INSERT INTO transactions (account_id, transaction_date, transaction_type, amount, merchant, category, description)
-                VALUES (%s, %s, 'Credit', %s, 'Money Transfer', 'Transfer', %s)
-            ''', (receiver_account_id, datetime.now(), amount, credit_description))
-
-            conn.commit()
+            debit_id, credit_id = ledger.execute_transfer(conn, transfer_request(
+                sender_account_id, sender_customer_id, receiver_account_id, receiver_customer_id, amount,
+                transfer_type, reference_number, receiver_account_number, receiver_ifsc, remarks, names))
+            mark_recent_write()
+            customer_cache.invalidate_customer(sender_customer_id, receiver_customer_id)
+            transaction_events.publish_transfer(
+                conn, [debit_id, credit_id], [sender_customer_id, receiver_customer_id],
+                transaction_events.transfer_event(reference_number, amount, transfer_type, debit_id))
 
             return jsonify({
                 'message': 'Transfer completed successfully',
@@ -270,8 +253,10 @@ def transfer_money():
                 'status': 'Completed'
             }), 200
 
+        except ledger.TransferError as e:
+            return jsonify({'error': str(e)}), e.status
+
         except Exception as e:
-            conn.rollback()
             return jsonify({'error': f'Transfer failed: {str(e)}'}), 500
 
         finally:
@@ -282,6 +267,61 @@ def transfer_money():
     except Exception as e:
         return jsonify({'error': f'Transfer processing failed: {str(e)}'}), 500
 
+def transfer_request(sender_account_id, sender_customer_id, receiver_account_id, receiver_customer_id, amount,
+                     transfer_type, reference_number, receiver_account_number, receiver_ifsc, remarks, names):
+    """ledger.new_transfer() for an /api/transfer request; `names` maps customer_id to full_name
+    (MOBILE transfers only), shared by the Flask and Quart routes."""
+    if transfer_type == 'MOBILE':
+        debit_description = f"Mobile transfer to {names.get(receiver_customer_id, receiver_account_number)}"
+        credit_description = f"Received from {names.get(sender_customer_id, sender_account_id)}"
+    else:
+        debit_description = f'Transfer to {receiver_account_number}'
+        credit_description = 'Received from transfer'
+    return ledger.new_transfer(sender_account_id, sender_customer_id, receiver_account_id, receiver_customer_id,
+                               amount, transfer_type, reference_number, 'Money Transfer', debit_description,
+                               credit_description, receiver_account_number, None, receiver_ifsc, remarks)
+
+@api_bp.route('/transfers/bulk', methods=['POST'])
+def bulk_transfer():
+    """Payroll/disbursement batch: many transfers from one of the signed-in customer's accounts"""
+    if 'customer_id' not in session:
+        return jsonify({'error': 'Authentication required'}), 401
+
+    try:
+        batch = bulk_batch(request.get_json(silent=True), session['customer_id'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    conn = get_db_connection()
+    try:
+        bulk_transfers.prepare_batch(conn, batch)
+        customer_ids = bulk_transfers.execute_batch(conn, batch)
+    except ledger.TransferError as e:
+        return jsonify({'error': str(e)}), e.status
+    except Exception as e:
+        return jsonify({'error': f'Bulk transfer failed: {str(e)}'}), 500
+    finally:
+        conn.close()
+
+    if customer_ids:
+        mark_recent_write()
+        customer_cache.invalidate_customer(*customer_ids)
+    payload = bulk_transfers.batch_response(batch)
+    transaction_events.publish_batch(customer_ids, batch['sender_customer_id'], payload)
+    return jsonify(payload), 200
+
+def bulk_batch(data, customer_id):
+    """bulk_transfers.new_batch() for a POST /api/transfers/bulk body; ValueError carries the 400 message."""
+    if not isinstance(data, dict) or 'sender_account_id' not in data or 'items' not in data:
+        raise ValueError('Required fields: sender_account_id, items')
+    try:
+        sender_account_id = int(data['sender_account_id'])
+    except (TypeError, ValueError):
+        raise ValueError('Invalid sender_account_id')
+    return bulk_transfers.new_batch(sender_account_id, customer_id, data['items'],
+                                    str(data.get('transfer_type') or 'IMPS').upper(),
+                                    str(data.get('remarks') or '').strip() or None)
+
 @api_bp.route('/search_mobile', methods=['POST'])
 def search_mobile():
     """API endpoint to search customers by mobile number"""
@@ -322,167 +362,224 @@ def search_mobile():
 
 @api_bp.route('/transactions', methods=['GET'])
 def get_transactions():
-    """API endpoint for fetching user transactions with filtering"""
-    customer_id = request.args.get('customer_id')
-    date_range = request.args.get('date_range', 'month')
-    transaction_type = request.args.get('transaction_type', 'all')
-    search = request.args.get('search', '').strip()
-    page = int(request.args.get('page', 1))
-    limit = int(request.args.get('limit', 20))
-
-    if not customer_id:
-        return jsonify({'error': 'customer_id is required'}), 400
-
+    """API endpoint for fetching user transactions with filtering.
+
+    Pass the previous response's pagination.next_cursor as `cursor` to page
+    by keyset; `page` (OFFSET paging) is kept for older clients. The filtered
+    total is only computed without a cursor, and skipped with include_total=0.
+    `search` matches word prefixes (every word must match); sort=relevance
+    orders the matches by where the words were found instead of by date.
+    layout=compact (rows once, in date groups) or layout=columnar (one array
+    per field) roughly halve the payload of the default layout.
+    """
     try:
-        customer_id = int(customer_id)
-        if page < 1 or limit < 1 or limit > 100:
-            return jsonify({'error': 'Invalid page or limit parameters'}), 400
-    except ValueError:
-        return jsonify({'error': 'Invalid customer_id, page, or limit'}), 400
-
-    # Build date filter
-    date_filter = ""
-    if date_range == 'today':
-        date_filter = "AND DATE(t.transaction_date) >= CURDATE()"
-    elif date_range == 'week':
-        date_filter = "AND DATE(t.transaction_date) >= DATE_SUB(CURDATE(), INTERVAL 7 DAY)"
-    elif date_range == 'month':
-        date_filter = "AND DATE(t.transaction_date) >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)"
-    elif date_range == '3months':
-        date_filter = "AND DATE(t.transaction_date) >= DATE_SUB(CURDATE(), INTERVAL 90 DAY)"
-    elif date_range == 'year':
-        date_filter = "AND DATE(t.transaction_date) >= DATE_SUB(CURDATE(), INTERVAL 1 YEAR)"
-    # 'all' means no date filter
-
-    # Build type filter
-    type_filter = ""
-    if transaction_type == 'credit':
-        type_filter = "AND t.transaction_type = 'Credit'"
-    elif transaction_type == 'debit':
-        type_filter = "AND t.transaction_type = 'Debit'"
-    elif transaction_type == 'transfer':
-        type_filter = "AND t.category = 'Transfer'"
-
-    # Build search filter
-    search_filter = ""
-    if search:
-        search_filter = f"AND (t.description LIKE '%{search}%' OR t.merchant LIKE '%{search}%' OR t.category LIKE '%{search}%')"
+        args = transactions_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        # Get total count for pagination
-        count_query = f'''
-            SELECT COUNT(*) as total
-            FROM transactions t
-            JOIN accounts a ON t.account_id = a.account_id
-            WHERE a.customer_id = %s {date_filter} {type_filter} {search_filter}
-        '''
-        cursor.execute(count_query, (customer_id,))
-        total_count = cursor.fetchone()[0]
-
-        # Get transactions with pagination
-        offset = (page - 1) * limit
-        query = f'''
-            SELECT
-                t.transaction_id,
-                t.transaction_date,
-                t.transaction_type,
-                t.amount,
-                t.merchant,
-                t.category,
-                t.description,
-                a.account_number,
-                a.account_type
-            FROM transactions t
-            JOIN accounts a ON t.account_id = a.account_id
-            WHERE a.customer_id = %s {date_filter} {type_filter} {search_filter}
-            ORDER BY t.transaction_date DESC, t.transaction_id DESC
-            LIMIT %s OFFSET %s
-        '''
-        cursor.execute(query, (customer_id, limit, offset))
-
-        transactions = cursor.fetchall()
-
-        # Get summary stats
-        stats_query = f'''
-            SELECT
-                SUM(CASE WHEN transaction_type = 'Credit' THEN amount ELSE 0 END) as total_credits,
-                SUM(CASE WHEN transaction_type = 'Debit' THEN amount ELSE 0 END) as total_debits,
-                COUNT(*) as total_transactions
-            FROM transactions t
-            JOIN accounts a ON t.account_id = a.account_id
-            WHERE a.customer_id = %s {date_filter}
-        '''
-        cursor.execute(stats_query, (customer_id,))
-        stats_row = cursor.fetchone()
-        if stats_row:
-            total_credits = stats_row[0] or 0.0
-            total_debits = stats_row[1] or 0.0
-            total_transactions = stats_row[2] or 0
-        else:
-            total_credits = 0.0
-            total_debits = 0.0
-            total_transactions = 0
-        net_flow = total_credits - total_debits
+        conn = get_db_connection(readonly=True)
+        # Read before the data: a write landing in between only makes the next request miss
+        versions = execute_prepared(conn, HOT_QUERIES['customer_versions'],
+                                    customer_versions.versions_params(args['filters'][0])).fetchall()
+        version = customer_versions.version_token(versions, 'transactions', args['filters'][0])
+        etag = transactions_etag(version, args)
+        if request.if_none_match.contains_weak(etag):
+            conn.close()
+            return with_etag(Response(b'', status=304), etag)
 
+        plan = transactions_plan(dict(args, version=version))
+        try:
+            sql, params = next(plan)
+            while True:
+                sql, params = plan.send(execute_prepared(conn, sql, params).fetchall())
+        except StopIteration as done:
+            payload = done.value
         conn.close()
 
-        # Convert transactions to dict format
-        transactions_list = []
-        for row in transactions:
-            transactions_list.append({
-                'transaction_id': row[0],
-                'transaction_date': row[1].isoformat() if row[1] else None,
-                'transaction_type': row[2],
-                'amount': float(row[3]),
-                'merchant': row[4] or '',
-                'category': row[5] or '',
-                'description': row[6] or '',
-                'account_number': row[7],
-                'account_type': row[8]
-            })
-
-        # Group transactions by date for frontend display
-        grouped_transactions = {}
-        for transaction in transactions_list:
-            if transaction['transaction_date']:
-                # Parse date and format as DD-MM-YYYY
-                from datetime import datetime
-                date_obj = datetime.fromisoformat(transaction['transaction_date'][:19])  # Remove timezone if present
-                date_str = date_obj.strftime('%d-%m-%Y')
-            else:
-                date_str = 'Unknown'
-            if date_str not in grouped_transactions:
-                grouped_transactions[date_str] = []
-            grouped_transactions[date_str].append(transaction)
-
-        # Sort grouped transactions by date in descending order (latest first)
-        grouped_transactions = dict(sorted(grouped_transactions.items(), key=lambda x: datetime.strptime(x[0], '%d-%m-%Y') if x[0] != 'Unknown' else datetime.min, reverse=True))
-
-        response = {
-            'transactions': transactions_list,
-            'grouped_transactions': grouped_transactions,
-            'summary_stats': {
-                'total_credits': float(total_credits),
-                'total_debits': float(total_debits),
-                'total_transactions': total_transactions,
-                'net_flow': float(net_flow)
-            },
-            'pagination': {
-                'page': page,
-                'limit': limit,
-                'total': total_count,
-                'total_pages': (total_count + limit - 1) // limit
-            }
-        }
-
-        return jsonify(response), 200
+        return with_etag(Response(encode_json(payload), status=200, mimetype='application/json'), etag)
 
     except Exception as e:
         return jsonify({'error': f'Failed to fetch transactions: {str(e)}'}), 500
 
+def transactions_plan(args):
+    """The /api/transactions queries, shared by the Flask and Quart routes.
+
+    A generator: yields (sql, params), is sent back the fetched rows, and
+    returns the response payload. An offset page missing its summary or total
+    from customer_cache is a single 'listing' query (page, filtered total and
+    summary in one pass); otherwise only the page is read, with standalone
+    queries filling in whatever is still missing.
+    """
+    customer_id, date_range, transaction_type, search = args['filters']
+    # Keyed by the customer_versions token too, so an entry never outlives a write another process made
+    count_key = ('count', args.get('version'), date_range, transaction_type, search)
+    summary_key = ('summary', args.get('version'), date_range)
+    total_count = customer_cache.get(customer_id, count_key) if args['include_total'] else None
+    stats_row = customer_cache.get(customer_id, summary_key)
+
+    # One row past the page tells whether there is a next one
+    if not (args['cursor'] or args['ranked']) and (stats_row is None or (args['include_total'] and total_count is None)):
+        sql, params = transaction_query('listing', *args['filters'])
+        rows = yield sql, params + [args['limit'] + 1, (args['page'] - 1) * args['limit']]
+        transactions = [row[:9] for row in rows]
+        if rows:  # an empty page carries no window totals
+            total_count, stats_row = rows[0][9], tuple(rows[0][10:13])
+            customer_cache.put(customer_id, count_key, total_count)
+            customer_cache.put(customer_id, summary_key, stats_row)
+    else:
+        transactions = yield transactions_page_query(args)
+
+    if args['include_total'] and total_count is None:
+        count_query, count_params = transaction_query('count', *args['filters'])
+        total_count = (yield count_query, count_params)[0][0]
+        customer_cache.put(customer_id, count_key, total_count)
+
+    if stats_row is None:
+        stats_query, stats_params = summary_stats_query(customer_id, date_range)
+        stats_rows = yield stats_query, stats_params
+        stats_row = tuple(stats_rows[0]) if stats_rows else None
+        customer_cache.put(customer_id, summary_key, stats_row)
+
+    return transactions_response(transactions, stats_row, args,
+                                 total_count if args['include_total'] else None)
+
+# 'full': rows in `transactions` and again in `grouped_transactions` (the original format);
+# 'compact': rows once, inside date `groups`; 'columnar': one array per field plus group sizes
+TRANSACTION_LAYOUTS = ('full', 'compact', 'columnar')
+
+def transactions_args(args):
+    """Validated /api/transactions query parameters; ValueError carries the 400 message."""
+    if not args.get('customer_id'):
+        raise ValueError('customer_id is required')
+    try:
+        customer_id = int(args['customer_id'])
+        page = int(args.get('page', 1))
+        limit = int(args.get('limit', 20))
+    except ValueError:
+        raise ValueError('Invalid customer_id, page, or limit')
+    if page < 1 or limit < 1 or limit > 100:
+        raise ValueError('Invalid page or limit parameters')
+
+    cursor = args.get('cursor')
+    if cursor:
+        cursor = decode_cursor(cursor)  # ValueError('invalid cursor')
+    filters = (customer_id, args.get('date_range', 'month'), args.get('transaction_type', 'all'),
+               args.get('search', '').strip())
+    sort = args.get('sort', 'date')
+    if sort not in ('date', 'relevance'):
+        raise ValueError("sort must be 'date' or 'relevance'")
+    # Relevance only orders searches, and pages by offset (cursors follow the date order)
+    ranked = sort == 'relevance' and bool(search_terms(filters[3]))
+    if ranked and cursor:
+        raise ValueError('cursor paging follows the date order; use page with sort=relevance')
+    layout = args.get('layout', 'full')
+    if layout not in TRANSACTION_LAYOUTS:
+        raise ValueError(f"layout must be one of: {', '.join(TRANSACTION_LAYOUTS)}")
+    return {
+        'filters': filters,
+        'page': None if cursor else page,
+        'limit': limit,
+        'cursor': cursor,
+        'ranked': ranked,
+        'layout': layout,
+        'include_total': not cursor and args.get('include_total', '1').lower() not in ('0', 'false', 'no'),
+    }
+
+def transactions_page_query(args):
+    """(sql, params) for the requested page, fetching limit + 1 rows."""
+    if args['cursor']:
+        sql, params = transaction_query('page_after', *args['filters'])
+        return sql, params + cursor_params(args['cursor']) + [args['limit'] + 1]
+    sql, params = transaction_query('page_ranked' if args['ranked'] else 'page', *args['filters'])
+    return sql, params + [args['limit'] + 1, (args['page'] - 1) * args['limit']]
+
+def transactions_response(transactions, stats_row, args, total_count=None):
+    """/api/transactions payload from the page rows (limit + 1 fetched), the stats row and the optional total."""
+    if stats_row:
+        total_credits = stats_row[0] or 0.0
+        total_debits = stats_row[1] or 0.0
+        total_transactions = int(stats_row[2] or 0)
+    else:
+        total_credits = 0.0
+        total_debits = 0.0
+        total_transactions = 0
+    net_flow = total_credits - total_debits
+
+    limit = args['limit']
+    has_more = len(transactions) > limit
+    transactions = transactions[:limit]
+    pagination = {
+        'limit': limit,
+        'has_more': has_more,
+        'next_cursor': encode_cursor(transactions[-1]) if has_more and not args['ranked'] else None,
+    }
+    if args['page'] is not None:
+        pagination['page'] = args['page']
+    if total_count is not None:
+        pagination['total'] = total_count
+        pagination['total_pages'] = (total_count + limit - 1) // limit
+
+    # One pass over the native datetimes; date-ordered pages already arrive newest day first
+    layout = args['layout']
+    items, groups = [], {}
+    for row in transactions:
+        values = transaction_values(row)
+        item = values if layout == 'columnar' else dict(zip(TRANSACTION_FIELDS, values))
+        items.append(item)
+        groups.setdefault(row[1].date() if row[1] else None, []).append(item)
+    days = list(groups)
+    if args['ranked']:
+        days.sort(key=lambda day: day or date.min, reverse=True)
+
+    response = {
+        'summary_stats': {
+            'total_credits': round(float(total_credits), 2),
+            'total_debits': round(float(total_debits), 2),
+            'total_transactions': total_transactions,
+            'net_flow': round(float(net_flow), 2)
+        },
+        'pagination': pagination
+    }
+
+    if layout == 'columnar':
+        # One array per field, rows in group order; groups say how many rows each day takes
+        rows = [values for day in days for values in groups[day]]
+        columns = zip(*rows) if rows else [()] * len(TRANSACTION_FIELDS)
+        response['columns'] = {field: list(column) for field, column in zip(TRANSACTION_FIELDS, columns)}
+        response['groups'] = [{'date': group_label(day), 'count': len(groups[day])} for day in days]
+    elif layout == 'compact':
+        response['groups'] = [{'date': group_label(day), 'transactions': groups[day]} for day in days]
+    else:
+        # Full layout: every row in `transactions` and again under its DD-MM-YYYY group
+        response['transactions'] = items
+        response['grouped_transactions'] = {group_label(day): groups[day] for day in days}
+
+    return response
+
+def group_label(day):
+    return day.strftime('%d-%m-%Y') if day else 'Unknown'
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+def encode_json(payload):
+    """`payload` as compact JSON bytes: orjson when installed (datetimes natively), else the json module."""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_json_default)
+    return json.dumps(payload, default=_json_default, separators=(',', ':')).encode('utf-8')
+
+LOAN_APPLICATIONS_QUERY = '''
+    SELECT application_id, loan_type, requested_amount, tenure_months, applied_date, application_status, calculated_emi
+    FROM loan_applications
+    WHERE customer_id = %s
+    ORDER BY applied_date DESC
+'''
+
 @api_bp.route('/loan_applications', methods=['GET'])
 def get_loan_applications():
     """API endpoint for fetching user's loan applications"""
@@ -492,36 +589,171 @@ def get_loan_applications():
     customer_id = session['customer_id']
 
     try:
-        conn = get_db_connection()
+        conn = get_db_connection(readonly=True)
+        versions = execute_prepared(conn, HOT_QUERIES['customer_versions'],
+                                    customer_versions.versions_params(customer_id)).fetchall()
+        etag = loan_applications_etag(versions, customer_id)
+        if request.if_none_match.contains_weak(etag):
+            conn.close()
+            return with_etag(Response(b'', status=304), etag)
+
         cursor = conn.cursor()
 
-        cursor.execute('''
-            SELECT application_id, loan_type, requested_amount, tenure_months, applied_date, application_status, calculated_emi
-            FROM loan_applications
-            WHERE customer_id = %s
-            ORDER BY applied_date DESC
-        ''', (customer_id,))
+        cursor.execute(LOAN_APPLICATIONS_QUERY, (customer_id,))
 
         applications = cursor.fetchall()
         conn.close()
 
-        applications_list = []
-        for row in applications:
-            applications_list.append({
-                'application_id': row[0],
-                'loan_type': row[1],
-                'requested_amount': float(row[2]),
-                'tenure_months': row[3],
-                'applied_date': row[4].isoformat() if row[4] else None,
-                'application_status': row[5],
-                'calculated_emi': float(row[6]) if row[6] else None
-            })
-
-        return jsonify({'applications': applications_list}), 200
+        return with_etag(jsonify(loan_applications_response(applications)), etag)
 
     except Exception as e:
         return jsonify({'error': f'Failed to fetch loan applications: {str(e)}'}), 500
 
+def loan_applications_response(applications):
+    """/api/loan_applications payload from the LOAN_APPLICATIONS_QUERY rows."""
+    applications_list = []
+    for row in applications:
+        applications_list.append({
+            'application_id': row[0],
+            'loan_type': row[1],
+            'requested_amount': float(row[2]),
+            'tenure_months': row[3],
+            'applied_date': row[4].isoformat() if row[4] else None,
+            'application_status': row[5],
+            'calculated_emi': float(row[6]) if row[6] else None
+        })
+    return {'applications': applications_list}
+
+def transactions_etag(version, args):
+    """ETag of an /api/transactions response: the customer's transactions version, the day
+    relative date ranges resolve against, and the parsed request arguments."""
+    variant = repr((sorted(args.items()), date_range_start(args['filters'][1])))
+    return f"t{version}-{hashlib.blake2b(variant.encode(), digest_size=8).hexdigest()}"
+
+def loan_applications_etag(version_rows, customer_id):
+    return f"a{customer_versions.version_token(version_rows, 'loan_applications', customer_id)}"
+
+def with_etag(response, etag):
+    """Tag a response (or 304) for conditional GETs; no-cache makes clients revalidate every time."""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@api_bp.route('/exports', methods=['POST'])
+def create_export():
+    """Queue a background export (csv, html or pdf) of the signed-in customer's transactions"""
+    if 'customer_id' not in session:
+        return jsonify({'error': 'Authentication required'}), 401
+
+    try:
+        job = export_jobs.submit(session['customer_id'], **export_job_args(request.get_json(silent=True) or request.form))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except export_jobs.ExportLimitError as e:
+        return jsonify({'error': str(e)}), 429
+    return jsonify(export_job_response(job)), 202
+
+@api_bp.route('/exports/<job_id>', methods=['GET'])
+def get_export(job_id):
+    """Status of an export job; download_url is set once it is done"""
+    if 'customer_id' not in session:
+        return jsonify({'error': 'Authentication required'}), 401
+
+    job = owned_export_job(job_id, session['customer_id'])
+    if job is None:
+        return jsonify({'error': 'Export not found'}), 404
+    return jsonify(export_job_response(job)), 200
+
+@api_bp.route('/exports/<job_id>/download', methods=['GET'])
+def download_export(job_id):
+    """Download a finished export's file"""
+    if 'customer_id' not in session:
+        return jsonify({'error': 'Authentication required'}), 401
+
+    job = owned_export_job(job_id, session['customer_id'])
+    if job is None:
+        return jsonify({'error': 'Export not found'}), 404
+    if job['status'] != 'done':
+        return jsonify({'error': f"Export is {job['status']}"}), 409
+    path, mimetype, download_name = export_jobs.artifact(job)
+    try:
+        return send_file(os.path.abspath(path), mimetype=mimetype, as_attachment=True, download_name=download_name)
+    except FileNotFoundError:
+        return jsonify({'error': 'Export has expired'}), 410
+
+def export_job_args(data):
+    """submit() arguments from a POST /api/exports body; ValueError carries the 400 message."""
+    export_format = data.get('format', 'csv')
+    if export_format not in export_jobs.EXPORT_FORMATS:
+        raise ValueError(f'format must be one of: {", ".join(export_jobs.EXPORT_FORMATS)}')
+    return {
+        'export_format': export_format,
+        'date_range': data.get('date_range', 'month'),
+        'transaction_type': data.get('transaction_type', 'all'),
+        'search': (data.get('search') or '').strip(),
+    }
+
+def owned_export_job(job_id, customer_id):
+    """The job if it exists and belongs to this customer (others' jobs look missing), else None."""
+    job = export_jobs.get_job(job_id)
+    return job if job is not None and job['customer_id'] == customer_id else None
+
+def export_job_response(job):
+    """/api/exports payload for a job dict."""
+    return {
+        'job_id': job['job_id'],
+        'status': job['status'],
+        'format': job['format'],
+        'filters': job['filters'],
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'finished_at': job['finished_at'],
+        'rows': job['rows'],
+        'bytes': job['bytes'],
+        'error': job['error'],
+        'status_url': f"/api/exports/{job['job_id']}",
+        'download_url': f"/api/exports/{job['job_id']}/download" if job['status'] == 'done' else None,
+    }
+
+@api_bp.route('/stream/transactions', methods=['GET'])
+def stream_transactions():
+    """Server-Sent Events: the signed-in customer's new transactions and completed transfers"""
+    if 'customer_id' not in session:
+        return jsonify({'error': 'Authentication required'}), 401
+
+    try:
+        subscription = transaction_events.subscribe(session['customer_id'])
+    except transaction_events.SubscriberLimitError as e:
+        return jsonify({'error': str(e)}), 429
+    response = Response(transaction_stream(subscription, request.headers.get('Last-Event-ID')),
+                        mimetype='text/event-stream', headers=SSE_HEADERS)
+    # Runs even when the client goes away before the generator starts
+    response.call_on_close(lambda: transaction_events.unsubscribe(subscription))
+    return response
+
+def transaction_stream(subscription, last_event_id):
+    """SSE body: opening event, then queued events as they arrive with heartbeats in between, until
+    EVENTS_MAX_STREAM_SECONDS (the client reconnects and resyncs)."""
+    yield stream_opening(last_event_id)
+    deadline = time.monotonic() + transaction_events.EVENTS_MAX_STREAM_SECONDS
+    while time.monotonic() < deadline:
+        events = subscription.get(min(transaction_events.EVENTS_HEARTBEAT, deadline - time.monotonic()))
+        yield sse_messages(events) if events else SSE_HEARTBEAT
+
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+SSE_HEARTBEAT = b': heartbeat\n\n'
+
+def sse_messages(events):
+    """SSE wire format of (event id, event name, data) tuples."""
+    return b''.join(b'id: %d\nevent: %s\ndata: %s\n\n' % (event_id, event.encode(), encode_json(data))
+                    for event_id, event, data in events)
+
+def stream_opening(last_event_id):
+    """First message of a stream: the reconnect delay and 'ready', or 'resync' when the client is
+    reconnecting and may have missed events (it should re-fetch /api/transactions)."""
+    event, data = ('resync', {'reason': 'reconnect'}) if last_event_id else ('ready', {})
+    return b'retry: %d\n' % transaction_events.EVENTS_RETRY_MS + sse_messages([(transaction_events.next_event_id(), event, data)])
+
 @api_bp.route('/beneficiaries', methods=['GET', 'POST'])
 def manage_beneficiaries():
     """API endpoint for managing beneficiaries"""
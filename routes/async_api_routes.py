@@ -0,0 +1,525 @@
+# ⚡ Asyncio variant of the REST API (served by asgi.py)
+"""
+The /api endpoints of routes/api_routes.py on Quart: same paths, request
+formats and JSON responses, with database calls awaited on config/async_db.py
+pools and CPU-bound work (model scoring, bcrypt) moved off the event loop.
+Payload builders are shared with the sync blueprint so both stay identical.
+"""
+import asyncio
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import bcrypt
+from quart import Blueprint, Response, request, jsonify, send_file, session
+
+from config import model_config
+from config.async_db import async_connection, mark_recent_write_async, get_async_pool_stats
+from config.db_config import get_sql_metrics
+from database import (bulk_transfers, customer_cache, customer_versions, export_jobs, hot_accounts, ledger,
+                      transaction_events)
+from database.queries import HOT_QUERIES
+from model.feature_engineering import FEATURE_COUNT_QUERIES, build_customer_features, score_customer
+from routes.api_routes import (LOAN_APPLICATIONS_QUERY, prediction_record, prediction_response,
+                               transactions_args, transactions_plan, loan_applications_response,
+                               export_job_args, owned_export_job, export_job_response, encode_json,
+                               transactions_etag, loan_applications_etag, with_etag, SSE_HEADERS,
+                               SSE_HEARTBEAT, sse_messages, stream_opening, transfer_request, bulk_batch)
+
+api_bp = Blueprint('api', __name__)
+
+_model_executor = None
+
+
+def get_model_executor():
+    """Executor that runs score_customer (MODEL_EXECUTOR / MODEL_EXECUTOR_WORKERS)."""
+    global _model_executor
+    if _model_executor is None:
+        if model_config.MODEL_EXECUTOR == 'thread':
+            _model_executor = ThreadPoolExecutor(model_config.MODEL_EXECUTOR_WORKERS, thread_name_prefix='model')
+        else:
+            # spawn: forking a process that already runs an event loop and DB threads is unsafe
+            _model_executor = ProcessPoolExecutor(model_config.MODEL_EXECUTOR_WORKERS,
+                                                  mp_context=multiprocessing.get_context('spawn'))
+    return _model_executor
+
+
+def shutdown_model_executor():
+    global _model_executor
+    if _model_executor is not None:
+        _model_executor.shutdown(wait=False, cancel_futures=True)
+        _model_executor = None
+
+
+async def fetch_customer_features(customer_id):
+    """Async counterpart of feature_engineering.get_customer_features."""
+    async with async_connection(readonly=True, session=session) as conn:
+        customer = await conn.fetchone(HOT_QUERIES['customer_by_id'], (customer_id,), dictionary=True)
+        if not customer:
+            return None
+        emp = await conn.fetchone(HOT_QUERIES['employment_by_customer'], (customer_id,), dictionary=True)
+        counts = {}
+        for feature, name, extra in FEATURE_COUNT_QUERIES:
+            counts[feature] = (await conn.fetchone(HOT_QUERIES[name], (customer_id,) + extra))[0]
+    return build_customer_features(customer, emp, counts)
+
+
+@api_bp.route('/health', methods=['GET'])
+async def health():
+    """Health check endpoint"""
+    return jsonify({'status': 'healthy', 'service': 'AI Credit Scoring API', 'db_pool': get_async_pool_stats(),
+                    'sql': get_sql_metrics(), 'events': transaction_events.get_event_stats(),
+                    'ledger': ledger.get_ledger_stats(), 'hot_accounts': hot_accounts.get_hot_account_stats(),
+                    'customer_cache': customer_cache.get_cache_stats()})
+
+
+@api_bp.route('/predict', methods=['POST'])
+async def predict_api():
+    """API endpoint for credit score prediction"""
+    data = await request.get_json()
+
+    if not data or 'customer_id' not in data:
+        return jsonify({'error': 'customer_id is required'}), 400
+
+    try:
+        customer_id = int(data['customer_id'])
+    except ValueError:
+        return jsonify({'error': 'Invalid customer_id format'}), 400
+
+    customer = await fetch_customer_features(customer_id)
+    loop = asyncio.get_running_loop()
+    prediction_result = await loop.run_in_executor(get_model_executor(), score_customer, customer)
+
+    if prediction_result and prediction_result['data_sufficiency']:
+        # Save prediction to database
+        async with async_connection() as conn:
+            await conn.begin()
+            await conn.execute(HOT_QUERIES['insert_prediction'], prediction_record(customer_id, prediction_result))
+            await conn.commit()
+        mark_recent_write_async(session)
+
+        return jsonify(prediction_response(prediction_result))
+    else:
+        return jsonify({'error': 'Insufficient data for credit score prediction'}), 400
+
+
+@api_bp.route('/signup', methods=['POST'])
+async def signup():
+    """User registration endpoint"""
+    data = await request.get_json()
+
+    if not data or not all(k in data for k in ('username', 'email', 'password')):
+        return jsonify({'error': 'username, email, and password are required'}), 400
+
+    username = data['username'].strip()
+    email = data['email'].strip().lower()
+    password = data['password']
+
+    if len(username) < 3 or len(password) < 6:
+        return jsonify({'error': 'Username must be at least 3 characters and password at least 6 characters'}), 400
+
+    # bcrypt is deliberately slow; hash in a thread (it releases the GIL)
+    password_hash = (await asyncio.to_thread(bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt())).decode('utf-8')
+
+    try:
+        async with async_connection() as conn:
+            # Check if user already exists
+            if await conn.fetchone('SELECT id FROM users WHERE username = %s OR email = %s', (username, email)):
+                return jsonify({'error': 'Username or email already exists'}), 409
+
+            # Insert new user
+            await conn.begin()
+            _, user_id = await conn.execute('''
+                INSERT INTO users (username, email, password_hash)
+                VALUES (%s, %s, %s)
+            ''', (username, email, password_hash))
+            await conn.commit()
+
+        return jsonify({
+            'message': 'User registered successfully',
+            'user_id': user_id,
+            'username': username,
+            'email': email
+        }), 201
+
+    except Exception as e:
+        return jsonify({'error': f'Registration failed: {str(e)}'}), 500
+
+
+@api_bp.route('/signin', methods=['POST'])
+async def signin():
+    """User authentication endpoint"""
+    data = await request.get_json()
+
+    if not data or not all(k in data for k in ('username', 'password')):
+        return jsonify({'error': 'username and password are required'}), 400
+
+    username = data['username'].strip()
+    password = data['password']
+
+    try:
+        async with async_connection() as conn:
+            user_row = await conn.fetchone('SELECT id, username, email, password_hash FROM users WHERE username = %s',
+                                           (username,))
+
+        if not user_row:
+            return jsonify({'error': 'Invalid username or password'}), 401
+
+        # Verify password
+        if not await asyncio.to_thread(bcrypt.checkpw, password.encode('utf-8'), user_row[3].encode('utf-8')):
+            return jsonify({'error': 'Invalid username or password'}), 401
+
+        return jsonify({
+            'message': 'Login successful',
+            'user': {
+                'id': user_row[0],
+                'username': user_row[1],
+                'email': user_row[2]
+            }
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': f'Login failed: {str(e)}'}), 500
+
+
+@api_bp.route('/transfer', methods=['POST'])
+async def transfer_money():
+    """API endpoint for money transfer"""
+    data = await request.get_json()
+
+    required_fields = ['sender_account_id', 'receiver_account_number', 'receiver_ifsc', 'amount', 'transfer_type']
+    if not data or not all(k in data for k in required_fields):
+        return jsonify({'error': f'Required fields: {", ".join(required_fields)}'}), 400
+
+    try:
+        sender_account_id = int(data['sender_account_id'])
+        receiver_account_number = data['receiver_account_number'].strip()
+        receiver_ifsc = data['receiver_ifsc'].strip()
+        amount = float(data['amount'])
+        transfer_type = data['transfer_type'].upper()
+        remarks = data.get('remarks', '').strip()
+
+        if amount <= 0:
+            return jsonify({'error': 'Amount must be greater than 0'}), 400
+
+        if transfer_type not in ledger.TRANSFER_TYPES:
+            return jsonify({'error': 'Invalid transfer type'}), 400
+
+        async with async_connection() as conn:
+            # Verify sender account exists
+            sender_row = await conn.fetchone(HOT_QUERIES['active_account_balance'], (sender_account_id,))
+            if not sender_row:
+                return jsonify({'error': 'Invalid sender account'}), 404
+
+            sender_balance, sender_customer_id = sender_row
+
+            # Check sufficient balance
+            if sender_balance < amount:
+                return jsonify({'error': 'Insufficient balance'}), 400
+
+            # Find receiver account
+            receiver_row = await conn.fetchone(HOT_QUERIES['receiver_by_account_number'], (receiver_account_number,))
+            if not receiver_row:
+                return jsonify({'error': 'Receiver account not found'}), 404
+
+            receiver_account_id, receiver_customer_id = receiver_row
+
+            # Both customers' names for mobile transfers, in one lookup
+            names = {}
+            if transfer_type == 'MOBILE':
+                names = dict(await conn.fetchall(HOT_QUERIES['customer_names'], (sender_customer_id, receiver_customer_id)))
+
+            # Generate unique reference number
+            reference_number = f"TXN{uuid.uuid4().hex[:16].upper()}"
+
+            try:
+                debit_id, credit_id = await ledger.execute_transfer_async(conn, transfer_request(
+                    sender_account_id, sender_customer_id, receiver_account_id, receiver_customer_id, amount,
+                    transfer_type, reference_number, receiver_account_number, receiver_ifsc, remarks, names))
+            except ledger.TransferError as e:
+                return jsonify({'error': str(e)}), e.status
+            except Exception as e:
+                return jsonify({'error': f'Transfer failed: {str(e)}'}), 500
+
+            await transaction_events.publish_transfer_async(
+                conn, [debit_id, credit_id], [sender_customer_id, receiver_customer_id],
+                transaction_events.transfer_event(reference_number, amount, transfer_type, debit_id))
+
+        mark_recent_write_async(session)
+        customer_cache.invalidate_customer(sender_customer_id, receiver_customer_id)
+        return jsonify({
+            'message': 'Transfer completed successfully',
+            'reference_number': reference_number,
+            'amount': amount,
+            'transfer_type': transfer_type,
+            'status': 'Completed'
+        }), 200
+
+    except ValueError:
+        return jsonify({'error': 'Invalid numeric values'}), 400
+    except Exception as e:
+        return jsonify({'error': f'Transfer processing failed: {str(e)}'}), 500
+
+
+@api_bp.route('/transfers/bulk', methods=['POST'])
+async def bulk_transfer():
+    """Payroll/disbursement batch: many transfers from one of the signed-in customer's accounts"""
+    if 'customer_id' not in session:
+        return jsonify({'error': 'Authentication required'}), 401
+
+    try:
+        batch = bulk_batch(await request.get_json(silent=True), session['customer_id'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        async with async_connection() as conn:
+            await bulk_transfers.prepare_batch_async(conn, batch)
+            customer_ids = await bulk_transfers.execute_batch_async(conn, batch)
+    except ledger.TransferError as e:
+        return jsonify({'error': str(e)}), e.status
+    except Exception as e:
+        return jsonify({'error': f'Bulk transfer failed: {str(e)}'}), 500
+
+    if customer_ids:
+        mark_recent_write_async(session)
+        customer_cache.invalidate_customer(*customer_ids)
+    payload = bulk_transfers.batch_response(batch)
+    transaction_events.publish_batch(customer_ids, batch['sender_customer_id'], payload)
+    return jsonify(payload), 200
+
+
+@api_bp.route('/search_mobile', methods=['POST'])
+async def search_mobile():
+    """API endpoint to search customers by mobile number"""
+    data = await request.get_json()
+
+    if not data or 'mobile' not in data:
+        return jsonify({'error': 'mobile number is required'}), 400
+
+    mobile = data['mobile'].strip()
+
+    try:
+        async with async_connection() as conn:
+            customers = await conn.fetchall('''
+                SELECT customer_id, full_name, phone
+                FROM customers
+                WHERE phone LIKE %s
+                LIMIT 10
+            ''', (f'%{mobile}%',))
+
+        receivers = [{'customer_id': row[0], 'name': row[1], 'phone': row[2]} for row in customers]
+        return jsonify({'receivers': receivers}), 200
+
+    except Exception as e:
+        return jsonify({'error': f'Search failed: {str(e)}'}), 500
+
+
+@api_bp.route('/transactions', methods=['GET'])
+async def get_transactions():
+    """API endpoint for fetching user transactions with filtering (cursor or page, see api_routes)"""
+    try:
+        args = transactions_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        async with async_connection(readonly=True, session=session) as conn:
+            # Read before the data: a write landing in between only makes the next request miss
+            versions = await conn.fetchall(HOT_QUERIES['customer_versions'],
+                                           customer_versions.versions_params(args['filters'][0]))
+            version = customer_versions.version_token(versions, 'transactions', args['filters'][0])
+            etag = transactions_etag(version, args)
+            if request.if_none_match.contains_weak(etag):
+                return with_etag(Response(b'', status=304), etag)
+
+            plan = transactions_plan(dict(args, version=version))
+            try:
+                sql, params = next(plan)
+                while True:
+                    sql, params = plan.send(await conn.fetchall(sql, params))
+            except StopIteration as done:
+                payload = done.value
+
+        return with_etag(Response(encode_json(payload), status=200, mimetype='application/json'), etag)
+
+    except Exception as e:
+        return jsonify({'error': f'Failed to fetch transactions: {str(e)}'}), 500
+
+
+@api_bp.route('/loan_applications', methods=['GET'])
+async def get_loan_applications():
+    """API endpoint for fetching user's loan applications"""
+    if 'customer_id' not in session:
+        return jsonify({'error': 'Authentication required'}), 401
+
+    customer_id = session['customer_id']
+
+    try:
+        async with async_connection(readonly=True, session=session) as conn:
+            versions = await conn.fetchall(HOT_QUERIES['customer_versions'],
+                                           customer_versions.versions_params(customer_id))
+            etag = loan_applications_etag(versions, customer_id)
+            if request.if_none_match.contains_weak(etag):
+                return with_etag(Response(b'', status=304), etag)
+            applications = await conn.fetchall(LOAN_APPLICATIONS_QUERY, (customer_id,))
+
+        return with_etag(jsonify(loan_applications_response(applications)), etag)
+
+    except Exception as e:
+        return jsonify({'error': f'Failed to fetch loan applications: {str(e)}'}), 500
+
+
+@api_bp.route('/exports', methods=['POST'])
+async def create_export():
+    """Queue a background export (csv, html or pdf) of the signed-in customer's transactions"""
+    if 'customer_id' not in session:
+        return jsonify({'error': 'Authentication required'}), 401
+
+    data = await request.get_json(silent=True) or await request.form
+    try:
+        job = await asyncio.to_thread(export_jobs.submit, session['customer_id'], **export_job_args(data))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except export_jobs.ExportLimitError as e:
+        return jsonify({'error': str(e)}), 429
+    return jsonify(export_job_response(job)), 202
+
+
+@api_bp.route('/exports/<job_id>', methods=['GET'])
+async def get_export(job_id):
+    """Status of an export job; download_url is set once it is done"""
+    if 'customer_id' not in session:
+        return jsonify({'error': 'Authentication required'}), 401
+
+    job = owned_export_job(job_id, session['customer_id'])
+    if job is None:
+        return jsonify({'error': 'Export not found'}), 404
+    return jsonify(export_job_response(job)), 200
+
+
+@api_bp.route('/exports/<job_id>/download', methods=['GET'])
+async def download_export(job_id):
+    """Download a finished export's file"""
+    if 'customer_id' not in session:
+        return jsonify({'error': 'Authentication required'}), 401
+
+    job = owned_export_job(job_id, session['customer_id'])
+    if job is None:
+        return jsonify({'error': 'Export not found'}), 404
+    if job['status'] != 'done':
+        return jsonify({'error': f"Export is {job['status']}"}), 409
+    path, mimetype, download_name = export_jobs.artifact(job)
+    if not os.path.exists(path):
+        return jsonify({'error': 'Export has expired'}), 410
+    return await send_file(os.path.abspath(path), mimetype=mimetype, as_attachment=True,
+                           attachment_filename=download_name)
+
+
+@api_bp.route('/stream/transactions', methods=['GET'])
+async def stream_transactions():
+    """Server-Sent Events: the signed-in customer's new transactions and completed transfers"""
+    if 'customer_id' not in session:
+        return jsonify({'error': 'Authentication required'}), 401
+
+    try:
+        subscription = transaction_events.subscribe(session['customer_id'], asyncio.get_running_loop())
+    except transaction_events.SubscriberLimitError as e:
+        return jsonify({'error': str(e)}), 429
+    response = Response(transaction_stream(subscription, request.headers.get('Last-Event-ID')),
+                        mimetype='text/event-stream', headers=SSE_HEADERS)
+    response.timeout = None  # the stream ends itself after EVENTS_MAX_STREAM_SECONDS
+    return response
+
+
+async def transaction_stream(subscription, last_event_id):
+    """Async version of api_routes.transaction_stream."""
+    try:
+        yield stream_opening(last_event_id)
+        deadline = time.monotonic() + transaction_events.EVENTS_MAX_STREAM_SECONDS
+        while time.monotonic() < deadline:
+            events = await subscription.wait(min(transaction_events.EVENTS_HEARTBEAT, deadline - time.monotonic()))
+            yield sse_messages(events) if events else SSE_HEARTBEAT
+    finally:
+        transaction_events.unsubscribe(subscription)
+
+
+@api_bp.route('/beneficiaries', methods=['GET', 'POST'])
+async def manage_beneficiaries():
+    """API endpoint for managing beneficiaries"""
+    if request.method == 'GET':
+        # Get beneficiaries for authenticated user
+        customer_id = request.args.get('customer_id')
+        if not customer_id:
+            return jsonify({'error': 'customer_id is required'}), 400
+
+        try:
+            customer_id = int(customer_id)
+        except ValueError:
+            return jsonify({'error': 'Invalid customer_id'}), 400
+
+        async with async_connection() as conn:
+            beneficiaries = await conn.fetchall('''
+                SELECT beneficiary_id, name, account_number, bank_name, ifsc_code, phone, email, is_verified, added_at
+                FROM beneficiaries
+                WHERE customer_id = %s
+                ORDER BY added_at DESC
+            ''', (customer_id,))
+
+        beneficiary_list = []
+        for row in beneficiaries:
+            beneficiary_list.append({
+                'beneficiary_id': row[0],
+                'name': row[1],
+                'account_number': row[2],
+                'bank_name': row[3],
+                'ifsc_code': row[4],
+                'phone': row[5],
+                'email': row[6],
+                'is_verified': bool(row[7]),
+                'added_at': row[8].isoformat() if row[8] else None
+            })
+
+        return jsonify({'beneficiaries': beneficiary_list}), 200
+
+    # Add new beneficiary
+    data = await request.get_json()
+
+    required_fields = ['customer_id', 'name', 'account_number', 'bank_name', 'ifsc_code']
+    if not data or not all(k in data for k in required_fields):
+        return jsonify({'error': f'Required fields: {", ".join(required_fields)}'}), 400
+
+    try:
+        customer_id = int(data['customer_id'])
+        name = data['name'].strip()
+        account_number = data['account_number'].strip()
+        bank_name = data['bank_name'].strip()
+        ifsc_code = data['ifsc_code'].strip()
+        phone = data.get('phone', '').strip()
+        email = data.get('email', '').strip()
+
+        async with async_connection() as conn:
+            # Check if beneficiary already exists
+            if await conn.fetchone('''
+                SELECT beneficiary_id FROM beneficiaries
+                WHERE customer_id = %s AND account_number = %s AND ifsc_code = %s
+            ''', (customer_id, account_number, ifsc_code)):
+                return jsonify({'error': 'Beneficiary already exists'}), 409
+
+            # Add new beneficiary
+            await conn.begin()
+            _, beneficiary_id = await conn.execute('''
+                INSERT INTO beneficiaries (customer_id, name, account_number, bank_name, ifsc_code, phone, email, is_verified)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, FALSE)
+            ''', (customer_id, name, account_number, bank_name, ifsc_code, phone, email))
+            await conn.commit()
+
+        return jsonify({
+            'message': 'Beneficiary added successfully',
+            'beneficiary_id': beneficiary_id
+        }), 201
+
+    except Exception as e:
+        return jsonify({'error': f'Failed to add beneficiary: {str(e)}'}), 500
@@ -1,11 +1,14 @@
 # 🌐 Handles all Flask routes (views)
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+from flask import Blueprint, Response, render_template, request, redirect, url_for, flash, session, stream_with_context
 import pandas as pd
 import numpy as np
 import json
 
 import bcrypt
-from config.db_config import get_db_connection, get_db_cursor
+from config.db_config import get_db_connection, get_db_cursor, execute_prepared, mark_recent_write
+from database.queries import run_query, fetch_one, summary_stats_query, balance_sql, ACCOUNT_BALANCE
+from database.export import export_rows, csv_chunks, pdf_chunks, encode_chunks, gzip_chunks, EXPORT_GZIP
+from database import customer_cache, customer_versions, ledger, transaction_events
 from datetime import datetime, date
 
 main_bp = Blueprint('main', __name__)
@@ -25,9 +28,8 @@ def index():
         cursor.execute('''
             SELECT transaction_date, transaction_type, amount, description
             FROM transactions t
-            JOIN accounts a ON t.account_id = a.account_id
-            WHERE a.customer_id = %s AND t.category = 'Transfer'
-            ORDER BY t.transaction_date DESC
+            WHERE t.customer_id = %s AND t.category = 'Transfer'
+            ORDER BY t.transaction_date DESC, t.transaction_id DESC
             LIMIT 3
         ''', (customer_id,))
 
@@ -133,12 +135,11 @@ def predict():
 
     # Save prediction to database
     shap_json = json.dumps(shap_values)
-    cursor.execute('''
-        INSERT INTO predictions (customer_id, score, decision, confidence, shap_values)
-        VALUES (%s, %s, %s, %s, %s)
-    ''', (customer_id, prediction['predicted_score'], prediction['decision'], prediction['confidence'], shap_json))
+    run_query(conn, 'insert_prediction',
+              (customer_id, prediction['predicted_score'], prediction['decision'], prediction['confidence'], shap_json))
 
     conn.commit()
+    mark_recent_write()
     conn.close()
 
     return render_template('result.html',
@@ -274,8 +275,8 @@ def manage_accounts():
     conn = get_db_connection()
     cursor = conn.cursor()
 
-    cursor.execute('''
-        SELECT account_id, account_number, account_type, balance, opened_date, status, is_primary
+    cursor.execute(f'''
+        SELECT account_id, account_number, account_type, {ACCOUNT_BALANCE}, opened_date, status, is_primary
         FROM accounts
         WHERE customer_id = %s
         ORDER BY opened_date DESC
@@ -302,7 +303,7 @@ def manage_accounts():
 @main_bp.route('/history')
 def history():
     # Fetch predictions from database
-    conn = get_db_connection()
+    conn = get_db_connection(readonly=True)
     cursor = conn.cursor()
 
     cursor.execute('''
@@ -513,28 +514,10 @@ def transfer():
             flash('Amount must be greater than 0!', 'error')
             return redirect(url_for('main.transfer'))
 
-        # Verify sender account belongs to user
         conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.execute('SELECT balance FROM accounts WHERE account_id = %s AND customer_id = %s AND status = "Active"', (sender_account_id, customer_id))
-        account_row = cursor.fetchone()
-
-        if not account_row:
-            conn.close()
-            flash('Invalid sender account!', 'error')
-            return redirect(url_for('main.transfer'))
-
-        sender_balance = account_row[0]
-
-        if sender_balance < amount:
-            conn.close()
-            flash('Insufficient balance!', 'error')
-            return redirect(url_for('main.transfer'))
 
         # Check if receiver account exists
-        cursor.execute('SELECT account_id FROM accounts WHERE account_number = %s AND status = "Active"', (recipient_account,))
-        receiver_row = cursor.fetchone()
+        receiver_row = fetch_one(conn, 'receiver_by_account_number', (recipient_account,))
 
         if not receiver_row:
             conn.close()
@@ -542,39 +525,29 @@ def transfer():
             return redirect(url_for('main.transfer'))
 
         receiver_account_id = receiver_row[0]
+        receiver_customer_id = receiver_row[1]
 
         # Generate reference number
         import uuid
         reference_number = f"TXN{uuid.uuid4().hex[:16].upper()}"
 
-        # Process transfer
-        conn.rollback()
-        conn.start_transaction()
-
+        # Ownership, balance and both account updates are checked and applied by the ledger
         try:
-            # Debit sender
-            cursor.execute('UPDATE accounts SET balance = balance - %s WHERE account_id = %s', (amount, sender_account_id))
-
-            # Credit receiver
-            cursor.execute('UPDATE accounts SET balance = balance + %s WHERE account_id = %s', (amount, receiver_account_id))
-
-            # Record debit transaction for sender
-            cursor.execute('''
-                INSERT INTO transactions (account_id, transaction_date, transaction_type, amount, merchant, category, description, counterparty_account_id, counterparty_account_number, counterparty_bank_name, counterparty_ifsc_code, transfer_type, reference_number, status, remarks, initiated_at, completed_at)
-                VALUES (%s, NOW(), 'Debit', %s, 'Money Transfer', 'Transfer', %s, %s, %s, %s, %s, %s, %s, 'Completed', %s, NOW(), NOW())
-            ''', (sender_account_id, amount, f'Transfer to {recipient_account}', receiver_account_id, recipient_account, recipient_bank, recipient_ifsc, transfer_type, reference_number, remarks))
-
-            # Record credit transaction for receiver
-            cursor.execute('''
-                INSERT INTO transactions (account_id, transaction_date, transaction_type, amount, merchant, category, description, counterparty_account_id, counterparty_account_number, counterparty_bank_name, counterparty_ifsc_code, transfer_type, reference_number, status, remarks, initiated_at, completed_at)
-                VALUES (%s, NOW(), 'Credit', %s, 'Money Transfer', 'Transfer', %s, %s, %s, %s, %s, %s, %s, 'Completed', %s, NOW(), NOW())
-            ''', (receiver_account_id, amount, f'Received from transfer', sender_account_id, None, None, None, transfer_type, reference_number, remarks))
-
-            conn.commit()
+            debit_id, credit_id = ledger.execute_transfer(conn, ledger.new_transfer(
+                sender_account_id, customer_id, receiver_account_id, receiver_customer_id, amount,
+                transfer_type, reference_number, 'Money Transfer', f'Transfer to {recipient_account}',
+                'Received from transfer', recipient_account, recipient_bank, recipient_ifsc, remarks))
+            mark_recent_write()
+            customer_cache.invalidate_customer(customer_id, receiver_customer_id)
+            transaction_events.publish_transfer(
+                conn, [debit_id, credit_id], [customer_id, receiver_customer_id],
+                transaction_events.transfer_event(reference_number, amount, transfer_type, debit_id))
             flash(f'Transfer completed successfully! Reference: {reference_number}', 'success')
 
+        except ledger.TransferError as e:
+            flash(f'{e}!', 'error')
+
         except Exception as e:
-            conn.rollback()
             flash(f'Transfer failed: {str(e)}', 'error')
 
         finally:
@@ -587,8 +560,8 @@ def transfer():
     cursor = conn.cursor()
 
     # Get user's accounts
-    cursor.execute('''
-        SELECT account_id, account_number, account_type, balance
+    cursor.execute(f'''
+        SELECT account_id, account_number, account_type, {ACCOUNT_BALANCE}
         FROM accounts
         WHERE customer_id = %s AND status = 'Active'
         ORDER BY account_type
@@ -600,8 +573,8 @@ def transfer():
     cursor.execute('''
         SELECT t.reference_number, t.amount, t.transfer_type, t.completed_at, t.counterparty_account_number as recipient_account, t.counterparty_bank_name as recipient_bank
         FROM transactions t
-        WHERE t.account_id IN (SELECT account_id FROM accounts WHERE customer_id = %s) AND t.transaction_type = 'Debit' AND t.category = 'Transfer'
-        ORDER BY t.completed_at DESC
+        WHERE t.customer_id = %s AND t.transaction_type = 'Debit' AND t.category = 'Transfer'
+        ORDER BY t.transaction_date DESC, t.transaction_id DESC
         LIMIT 10
     ''', (customer_id,))
 
@@ -669,12 +642,12 @@ def balance():
     customer_id = session['customer_id']
     selected_account_id = request.args.get('account_id', type=int)
 
-    conn = get_db_connection()
+    conn = get_db_connection(readonly=True)
     cursor = conn.cursor()
 
     # Get all active accounts for the customer
-    cursor.execute('''
-        SELECT account_id, account_number, account_type, balance, opened_date, status, is_primary
+    cursor.execute(f'''
+        SELECT account_id, account_number, account_type, {ACCOUNT_BALANCE}, opened_date, status, is_primary
         FROM accounts
         WHERE customer_id = %s AND status = 'Active'
         ORDER BY is_primary DESC, opened_date DESC
@@ -714,8 +687,8 @@ def balance():
         selected_account_id = primary_account_id or accounts[0]['account_id']
 
     # Get detailed information for selected account
-    cursor.execute('''
-        SELECT a.account_id, a.account_number, a.account_type, a.balance, a.opened_date, a.status,
+    cursor.execute(f'''
+        SELECT a.account_id, a.account_number, a.account_type, {balance_sql('a')}, a.opened_date, a.status,
                a.bank_name, a.ifsc_code, c.full_name, c.email
         FROM accounts a
         JOIN customers c ON a.customer_id = c.customer_id
@@ -836,16 +809,9 @@ def loans():
 
     # Get user's primary account balance
     conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute('''
-        SELECT balance FROM accounts
-        WHERE customer_id = %s AND is_primary = TRUE AND status = 'Active'
-        LIMIT 1
-    ''', (customer_id,))
 
-    account_balance_row = cursor.fetchone()
-    account_balance = account_balance_row[0] if account_balance_row else 0.0
+    account_balance_row = fetch_one(conn, 'primary_account_balance', (customer_id,))
+    account_balance = account_balance_row[1] if account_balance_row else 0.0
 
     conn.close()
 
@@ -960,7 +926,9 @@ def apply_loan():
             ))
             
             application_id = cursor.lastrowid
+            customer_versions.bump(cursor, 'loan_applications', [customer_id])
             conn.commit()
+            mark_recent_write()
             conn.close()
             
             flash(f'Loan application submitted successfully! Application ID: {application_id}. We will review your application and get back to you soon.', 'success')
@@ -1021,34 +989,18 @@ def transaction_history():
         return handle_export(customer_id, date_range, transaction_type, search_term, export_format)
 
     conn = get_db_connection()
-    cursor = conn.cursor()
 
     # Get primary account balance
-    cursor.execute('''
-        SELECT balance FROM accounts
-        WHERE customer_id = %s AND is_primary = TRUE AND status = 'Active'
-        LIMIT 1
-    ''', (customer_id,))
-
-    primary_balance_row = cursor.fetchone()
-    primary_balance = primary_balance_row[0] if primary_balance_row else 0.0
+    primary_balance_row = fetch_one(conn, 'primary_account_balance', (customer_id,))
+    primary_balance = primary_balance_row[1] if primary_balance_row else 0.0
 
     # Get initial summary stats (for all time, no filters)
-    cursor.execute('''
-        SELECT
-            SUM(CASE WHEN transaction_type = 'Credit' THEN amount ELSE 0 END) as total_credits,
-            SUM(CASE WHEN transaction_type = 'Debit' THEN amount ELSE 0 END) as total_debits,
-            COUNT(*) as total_transactions
-        FROM transactions t
-        JOIN accounts a ON t.account_id = a.account_id
-        WHERE a.customer_id = %s
-    ''', (customer_id,))
-
-    stats_row = cursor.fetchone()
-    total_credits = float(stats_row[0] or 0.0)
-    total_debits = float(stats_row[1] or 0.0)
-    total_transactions = stats_row[2] or 0
-    net_flow = total_credits - total_debits
+    stats_query, stats_params = summary_stats_query(customer_id)
+    stats_row = execute_prepared(conn, stats_query, stats_params).fetchall()[0]
+    total_credits = round(float(stats_row[0] or 0.0), 2)
+    total_debits = round(float(stats_row[1] or 0.0), 2)
+    total_transactions = int(stats_row[2] or 0)
+    net_flow = round(total_credits - total_debits, 2)
 
     conn.close()
 
@@ -1068,104 +1020,31 @@ def transaction_history():
                          grouped_transactions=grouped_transactions)
 
 def handle_export(customer_id, date_range, transaction_type, search_term, export_format):
-    """Handle export functionality for transactions"""
-    from flask import Response
-    import csv
-    import io
-
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    # Build filters (same as above)
-    date_filter = ""
-    if date_range == 'today':
-        date_filter = "AND t.transaction_date >= CURDATE()"
-    elif date_range == 'week':
-        date_filter = "AND t.transaction_date >= DATE_SUB(CURDATE(), INTERVAL 7 DAY)"
-    elif date_range == 'month':
-        date_filter = "AND t.transaction_date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)"
-    elif date_range == '3months':
-        date_filter = "AND t.transaction_date >= DATE_SUB(CURDATE(), INTERVAL 90 DAY)"
-    elif date_range == 'year':
-        date_filter = "AND t.transaction_date >= DATE_SUB(CURDATE(), INTERVAL 1 YEAR)"
-
-    type_filter = ""
-    if transaction_type != 'all':
-        type_filter = f"AND t.transaction_type = '{transaction_type}'"
-
-    search_filter = ""
-    if search_term:
-        search_filter = f"AND (t.merchant LIKE '%{search_term}%' OR t.category LIKE '%{search_term}%' OR t.description LIKE '%{search_term}%')"
-
-    # Fetch all transactions for export (no pagination)
-    cursor.execute(f'''
-        SELECT t.transaction_date, t.transaction_type, t.amount,
-               t.merchant, t.category, t.description
-        FROM transactions t
-        JOIN accounts a ON t.account_id = a.account_id
-        WHERE a.customer_id = %s {date_filter} {type_filter} {search_filter}
-        ORDER BY t.transaction_date DESC, t.transaction_id DESC
-    ''', (customer_id,))
-
-    transactions = cursor.fetchall()
-    conn.close()
-
+    """Stream the filtered transactions as a CSV (gzip-compressed when accepted) or PDF statement download"""
     if export_format == 'csv':
-        # Create CSV
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(['Date', 'Type', 'Amount', 'Merchant', 'Category', 'Description'])
-
-        for row in transactions:
-            writer.writerow([
-                row[0].strftime('%Y-%m-%d %H:%M:%S') if row[0] else '',
-                row[1],
-                f"{row[2]:.2f}",
-                row[3] or '',
-                row[4] or '',
-                row[5] or ''
-            ])
-
-        output.seek(0)
-        return Response(
-            output.getvalue(),
-            mimetype='text/csv',
-            headers={'Content-Disposition': 'attachment; filename=transactions.csv'}
-        )
-
+        formatter, mimetype, filename = csv_chunks, 'text/csv', 'transactions.csv'
     elif export_format == 'pdf':
-        # For PDF export, we'll use a simple HTML to PDF approach
-        # In a real app, you'd use a library like reportlab or weasyprint
-        html_content = f"""
-        <html>
-        <head><title>Transaction History</title></head>
-        <body>
-        <h1>Transaction History</h1>
-        <table border="1">
-        <tr><th>Date</th><th>Type</th><th>Amount</th><th>Merchant</th><th>Category</th><th>Description</th></tr>
-        """
+        formatter, mimetype, filename = pdf_chunks, 'application/pdf', 'transactions.pdf'
+    else:
+        return redirect(url_for('main.transaction_history'))
 
-        for row in transactions:
-            html_content += f"""
-            <tr>
-            <td>{row[0].strftime('%Y-%m-%d %H:%M:%S') if row[0] else ''}</td>
-            <td>{row[1]}</td>
-            <td>₹{row[2]:.2f}</td>
-            <td>{row[3] or ''}</td>
-            <td>{row[4] or ''}</td>
-            <td>{row[5] or ''}</td>
-            </tr>
-            """
-
-        html_content += "</table></body></html>"
-
-        return Response(
-            html_content,
-            mimetype='text/html',
-            headers={'Content-Disposition': 'attachment; filename=transactions.html'}
-        )
-
-    return redirect(url_for('main.transaction_history'))
+    conn = get_db_connection()
+    chunks = formatter(export_rows(conn, customer_id, date_range, transaction_type, search_term))
+
+    headers = {
+        'Content-Disposition': f'attachment; filename={filename}',
+        'Vary': 'Accept-Encoding',
+        'X-Accel-Buffering': 'no',  # let nginx pass chunks straight through
+    }
+    if export_format == 'pdf':
+        body = chunks  # already bytes, and the page streams are Flate-compressed
+    elif EXPORT_GZIP and request.accept_encodings['gzip'] > 0:
+        body = gzip_chunks(chunks)
+        headers['Content-Encoding'] = 'gzip'
+    else:
+        body = encode_chunks(chunks)
+    # stream_with_context keeps the request (and its pooled connection) alive until the last chunk
+    return Response(stream_with_context(body), mimetype=mimetype, headers=headers)
 
 @main_bp.route('/profile', methods=['GET', 'POST'])
 def profile():
@@ -1296,10 +1175,8 @@ def qr_pay():
 
             # Get user's primary account
             conn = get_db_connection()
-            cursor = conn.cursor()
 
-            cursor.execute('SELECT account_id, balance FROM accounts WHERE customer_id = %s AND is_primary = TRUE AND status = "Active"', (customer_id,))
-            account_row = cursor.fetchone()
+            account_row = fetch_one(conn, 'primary_account_balance', (customer_id,))
 
             if not account_row:
                 conn.close()
@@ -1315,8 +1192,7 @@ def qr_pay():
                 return redirect(url_for('main.qr_pay'))
 
             # Verify receiver account exists
-            cursor.execute('SELECT account_id FROM accounts WHERE account_number = %s AND status = "Active"', (receiver_account,))
-            receiver_row = cursor.fetchone()
+            receiver_row = fetch_one(conn, 'receiver_by_account_number', (receiver_account,))
 
             if not receiver_row:
                 conn.close()
@@ -1324,57 +1200,29 @@ def qr_pay():
                 return redirect(url_for('main.qr_pay'))
 
             receiver_account_id = receiver_row[0]
+            receiver_customer_id = receiver_row[1]
 
             # Generate reference number
             import uuid
             reference_number = f"QR{uuid.uuid4().hex[:12].upper()}"
 
-            # Process payment with proper transaction handling
+            # Balance, receiver status and both account updates are checked and applied by the ledger
             try:
-                # Ensure no active transaction before starting a new one
-                conn.rollback()
-                # Use explicit locking to prevent concurrent transactions
-                conn.start_transaction()
-
-                # Lock the sender account for update
-                cursor.execute('SELECT balance FROM accounts WHERE account_id = %s FOR UPDATE', (sender_account_id,))
-                sender_balance_check = cursor.fetchone()
-
-                if not sender_balance_check or sender_balance_check[0] < qr_amount:
-                    conn.rollback()
-                    flash('Insufficient balance or account locked!', 'error')
-                    return redirect(url_for('main.qr_pay'))
-
-                # Lock the receiver account for update
-                cursor.execute('SELECT account_id FROM accounts WHERE account_id = %s FOR UPDATE', (receiver_account_id,))
-                if not cursor.fetchone():
-                    conn.rollback()
-                    flash('Receiver account not available!', 'error')
-                    return redirect(url_for('main.qr_pay'))
-
-                # Debit sender
-                cursor.execute('UPDATE accounts SET balance = balance - %s WHERE account_id = %s', (qr_amount, sender_account_id))
-
-                # Credit receiver
-                cursor.execute('UPDATE accounts SET balance = balance + %s WHERE account_id = %s', (qr_amount, receiver_account_id))
-
-                # Record debit transaction for sender
-                cursor.execute('''
-                    INSERT INTO transactions (account_id, transaction_date, transaction_type, amount, merchant, category, description, counterparty_account_id, counterparty_account_number, counterparty_bank_name, counterparty_ifsc_code, transfer_type, reference_number, status, initiated_at, completed_at)
-                    VALUES (%s, NOW(), 'Debit', %s, 'QR Payment', 'Transfer', %s, %s, %s, %s, %s, 'UPI', %s, 'Completed', NOW(), NOW())
-                ''', (sender_account_id, qr_amount, f'QR Payment to {receiver_name}', receiver_account_id, receiver_account, None, receiver_ifsc, reference_number))
-
-                # Record credit transaction for receiver
-                cursor.execute('''
-                    INSERT INTO transactions (account_id, transaction_date, transaction_type, amount, merchant, category, description, counterparty_account_id, counterparty_account_number, counterparty_bank_name, counterparty_ifsc_code, transfer_type, reference_number, status, initiated_at, completed_at)
-                    VALUES (%s, NOW(), 'Credit', %s, 'QR Payment', 'Transfer', %s, %s, %s, %s, %s, 'UPI', %s, 'Completed', NOW(), NOW())
-                ''', (receiver_account_id, qr_amount, f'Received QR payment', sender_account_id, None, None, None, reference_number))
-
-                conn.commit()
+                debit_id, credit_id = ledger.execute_transfer(conn, ledger.new_transfer(
+                    sender_account_id, customer_id, receiver_account_id, receiver_customer_id, qr_amount,
+                    'UPI', reference_number, 'QR Payment', f'QR Payment to {receiver_name}', 'Received QR payment',
+                    receiver_account, None, receiver_ifsc))
+                mark_recent_write()
+                customer_cache.invalidate_customer(customer_id, receiver_customer_id)
+                transaction_events.publish_transfer(
+                    conn, [debit_id, credit_id], [customer_id, receiver_customer_id],
+                    transaction_events.transfer_event(reference_number, qr_amount, 'UPI', debit_id))
                 flash(f'QR Payment completed successfully! Reference: {reference_number}', 'success')
 
+            except ledger.TransferError as e:
+                flash(f'{e}!', 'error')
+
             except Exception as e:
-                conn.rollback()
                 flash(f'Payment failed: {str(e)}', 'error')
 
             finally:
@@ -1555,7 +1403,7 @@ def loan_history():
 
     customer_id = session['customer_id']
 
-    conn = get_db_connection()
+    conn = get_db_connection(readonly=True)
     cursor = conn.cursor()
 
     # Get user's approved loans (both disbursed and approved applications)
@@ -1790,8 +1638,8 @@ def mobile_transfer():
     conn = get_db_connection()
     cursor = conn.cursor()
 
-    cursor.execute('''
-        SELECT account_id, account_number, account_type, balance
+    cursor.execute(f'''
+        SELECT account_id, account_number, account_type, {ACCOUNT_BALANCE}
         FROM accounts
         WHERE customer_id = %s AND status = 'Active'
         ORDER BY account_type
@@ -1838,25 +1686,8 @@ def mobile_transfer():
                 flash('Invalid password', 'error')
                 return redirect(url_for('main.mobile_transfer'))
 
-            # Get sender account details
-            cursor.execute('SELECT balance FROM accounts WHERE account_id = %s AND customer_id = %s AND status = "Active"', (sender_account_id, customer_id))
-            sender_row = cursor.fetchone()
-
-            if not sender_row:
-                conn.close()
-                flash('Invalid sender account', 'error')
-                return redirect(url_for('main.mobile_transfer'))
-
-            sender_balance = sender_row[0]
-
-            if sender_balance < amount:
-                conn.close()
-                flash('Insufficient balance', 'error')
-                return redirect(url_for('main.mobile_transfer'))
-
             # Get receiver's primary account
-            cursor.execute('SELECT account_id FROM accounts WHERE customer_id = %s AND status = "Active" AND is_primary = TRUE', (receiver_customer_id,))
-            receiver_row = cursor.fetchone()
+            receiver_row = fetch_one(conn, 'primary_account_id', (receiver_customer_id,))
 
             if not receiver_row:
                 conn.close()
@@ -1869,51 +1700,23 @@ def mobile_transfer():
             import uuid
             reference_number = f"MOBILE{uuid.uuid4().hex[:12].upper()}"
 
-            # Process transfer with proper transaction handling
+            # Ownership, balance and both account updates are checked and applied by the ledger
             try:
-                # Ensure no active transaction before starting a new one
-                conn.rollback()
-                # Use explicit locking to prevent concurrent transactions
-                conn.start_transaction()
-
-                # Lock the sender account for update
-                cursor.execute('SELECT balance FROM accounts WHERE account_id = %s FOR UPDATE', (sender_account_id,))
-                sender_balance_check = cursor.fetchone()
-
-                if not sender_balance_check or sender_balance_check[0] < amount:
-                    conn.rollback()
-                    flash('Insufficient balance or account locked!', 'error')
-                    return redirect(url_for('main.mobile_transfer'))
-
-                # Lock the receiver account for update
-                cursor.execute('SELECT account_id FROM accounts WHERE account_id = %s FOR UPDATE', (receiver_account_id,))
-                if not cursor.fetchone():
-                    conn.rollback()
-                    flash('Receiver account not available!', 'error')
-                    return redirect(url_for('main.mobile_transfer'))
-
-                # Debit sender
-                cursor.execute('UPDATE accounts SET balance = balance - %s WHERE account_id = %s', (amount, sender_account_id))
-
-                # Credit receiver
-                cursor.execute('UPDATE accounts SET balance = balance + %s WHERE account_id = %s', (amount, receiver_account_id))
-
-                # Record transfer in transactions table
-                cursor.execute('''
-                    INSERT INTO transactions (account_id, transaction_date, transaction_type, amount, merchant, category, description, counterparty_account_id, counterparty_account_number, counterparty_bank_name, counterparty_ifsc_code, transfer_type, reference_number, status, initiated_at, completed_at)
-                    VALUES (%s, NOW(), 'Debit', %s, 'Mobile Transfer', 'Transfer', %s, %s, NULL, NULL, NULL, 'MOBILE', %s, 'Completed', NOW(), NOW())
-                ''', (sender_account_id, amount, f'Mobile transfer to customer {receiver_customer_id}', receiver_account_id, reference_number))
-
-                cursor.execute('''
-                    INSERT INTO transactions (account_id, transaction_date, transaction_type, amount, merchant, category, description, counterparty_account_id, counterparty_account_number, counterparty_bank_name, counterparty_ifsc_code, transfer_type, reference_number, status, initiated_at, completed_at)
-                    VALUES (%s, NOW(), 'Credit', %s, 'Mobile Transfer', 'Transfer', %s, %s, NULL, NULL, NULL, 'MOBILE', %s, 'Completed', NOW(), NOW())
-                ''', (receiver_account_id, amount, f'Received mobile transfer from customer {customer_id}', sender_account_id, reference_number))
-
-                conn.commit()
+                debit_id, credit_id = ledger.execute_transfer(conn, ledger.new_transfer(
+                    sender_account_id, customer_id, receiver_account_id, receiver_customer_id, amount,
+                    'MOBILE', reference_number, 'Mobile Transfer', f'Mobile transfer to customer {receiver_customer_id}',
+                    f'Received mobile transfer from customer {customer_id}'))
+                mark_recent_write()
+                customer_cache.invalidate_customer(customer_id, receiver_customer_id)
+                transaction_events.publish_transfer(
+                    conn, [debit_id, credit_id], [customer_id, receiver_customer_id],
+                    transaction_events.transfer_event(reference_number, amount, 'MOBILE', debit_id))
                 flash(f'Transfer completed successfully! Reference: {reference_number}', 'success')
 
+            except ledger.TransferError as e:
+                flash(f'{e}!', 'error')
+
             except Exception as e:
-                conn.rollback()
                 flash(f'Transfer failed: {str(e)}', 'error')
 
             finally:
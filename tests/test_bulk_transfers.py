@@ -0,0 +1,76 @@
+"""Bulk transfers: refused-chunk triage and conservation of money across chunks."""
+from decimal import Decimal
+
+from database import bulk_transfers, daily_summary
+
+RECEIVERS = {'2345678901': (2, 4), '3456789012': (3, 5), '4567890123': (4, 6)}
+
+
+def resolved_batch(amounts):
+    """A batch from account 1 (customer 3) paying `amounts` = [(account_number, amount)], resolved without the database."""
+    batch = bulk_transfers.new_batch(1, 3, [{'receiver_account_number': number, 'amount': amount}
+                                            for number, amount in amounts])
+    bulk_transfers.resolve(batch, [(number, *RECEIVERS[number]) for number in sorted(RECEIVERS)])
+    return batch
+
+
+def outcomes(batch):
+    return [(result['status'], result['error']) for result in batch['results']]
+
+
+def test_refused_chunk_fails_closed_receivers_and_uncovered_items():
+    batch = resolved_batch([('2345678901', 100), ('3456789012', 50), ('4567890123', 300), ('2345678901', 100)])
+    chunk = batch['transfers']
+    rows = [(1, 3, 250, 'Active'), (2, 4, 0, 'Active'), (3, 5, 0, 'Closed'), (4, 6, 0, 'Active')]
+
+    remaining = bulk_transfers.refused_chunk(batch, chunk, rows)
+
+    # 100 fits, the closed receiver fails, 300 no longer fits, the second 100 still does
+    assert [index for index, _ in remaining] == [0, 3]
+    assert [batch['results'][index]['error'] for index in (1, 2)] == ['Receiver account not available',
+                                                                      'Insufficient balance']
+
+
+def test_refused_chunk_fails_everything_for_a_lost_sender():
+    batch = resolved_batch([('2345678901', 10), ('3456789012', 10)])
+    rows = [(1, 3, 1000, 'Closed'), (2, 4, 0, 'Active'), (3, 5, 0, 'Active')]
+
+    assert bulk_transfers.refused_chunk(batch, batch['transfers'], rows) == []
+    assert outcomes(batch) == [('Failed', 'Invalid sender account')] * 2
+
+
+def test_refused_chunk_retries_what_nothing_explains():
+    batch = resolved_batch([('2345678901', 10), ('3456789012', 10)])
+    rows = [(1, 3, 1000, 'Active'), (2, 4, 0, 'Active'), (3, 5, 0, 'Active')]
+
+    assert bulk_transfers.refused_chunk(batch, batch['transfers'], rows) == batch['transfers']
+
+
+def run_batch(conn, amounts):
+    batch = bulk_transfers.new_batch(1, 3, [{'receiver_account_number': number, 'amount': amount}
+                                            for number, amount in amounts])
+    bulk_transfers.prepare_batch(conn, batch)
+    customer_ids = bulk_transfers.execute_batch(conn, batch)
+    return batch, customer_ids
+
+
+def test_bulk_transfer_conserves_money(conn, query, money_total, monkeypatch):
+    # Several chunks, and several INSERT statements per chunk
+    monkeypatch.setattr(bulk_transfers, 'BULK_TRANSFER_CHUNK', 2)
+    monkeypatch.setattr(bulk_transfers, 'BULK_INSERT_ROWS', 3)
+    amounts = [('2345678901', '10.10'), ('3456789012', '20.20'), ('4567890123', '30.30'), ('2345678901', '40.40'),
+               ('0000000000', '1')]
+    before = money_total()
+    sender = Decimal(str(query('SELECT balance FROM accounts WHERE account_id = 1')[0][0]))
+
+    batch, customer_ids = run_batch(conn, amounts)
+
+    assert [status for status, _ in outcomes(batch)] == ['Completed'] * 4 + ['Rejected']
+    assert customer_ids == {3, 4, 5, 6}
+    assert money_total() == before
+    assert Decimal(str(query('SELECT balance FROM accounts WHERE account_id = 1')[0][0])) == sender - Decimal('101.00')
+    rows = query('SELECT transaction_type, COUNT(*), SUM(amount) FROM transactions WHERE reference_number LIKE %s '
+                 'GROUP BY transaction_type ORDER BY transaction_type', (batch['batch_reference'] + '%',))
+    assert [(kind, count, round(float(total), 2)) for kind, count, total in rows] == \
+        [('Credit', 4, 101.0), ('Debit', 4, 101.0)]
+    assert daily_summary.check() == []
@@ -0,0 +1,40 @@
+"""Conditional GETs: /api/transactions answers 304 until the customer's transactions change."""
+from database import ledger
+
+LISTING = '/api/transactions?customer_id={}&date_range=all'
+
+
+def etag(client, customer_id):
+    response = client.get(LISTING.format(customer_id))
+    assert response.status_code == 200
+    return response.headers['ETag']
+
+
+def revalidate(client, customer_id, tag):
+    return client.get(LISTING.format(customer_id), headers={'If-None-Match': tag})
+
+
+def pay(conn, receiver, receiver_customer, amount, reference):
+    return ledger.execute_transfer(conn, ledger.new_transfer(1, 3, receiver, receiver_customer, amount, 'UPI',
+                                                             reference, 'QR Payment', 'QR payment', 'Received QR'))
+
+
+def test_unchanged_listing_is_not_modified(client):
+    tag = etag(client, 3)
+    response = revalidate(client, 3, tag)
+    assert response.status_code == 304
+    assert response.get_data() == b''
+    assert response.headers['ETag'] == tag
+
+
+def test_etag_depends_on_the_query(client):
+    tag = etag(client, 3)
+    assert revalidate(client, 4, tag).status_code == 200
+    assert client.get(LISTING.format(3) + '&limit=5', headers={'If-None-Match': tag}).status_code == 200
+
+
+def test_transfer_changes_both_customers_etags(client, conn):
+    sender, receiver = etag(client, 3), etag(client, 5)
+    pay(conn, 3, 5, 12, 'TEST-ETAG')
+    assert revalidate(client, 3, sender).status_code == 200
+    assert revalidate(client, 5, receiver).status_code == 200
@@ -0,0 +1,75 @@
+"""Streaming exports: PDF pagination and HTML escaping."""
+import re
+import zlib
+from datetime import datetime
+
+import pytest
+
+from database.export import PDF_ROWS_PER_PAGE, html_chunks, pdf_chunks
+
+
+def rows(count):
+    return [(datetime(2024, 1, 1, 9, 0, index % 60), 'Debit', 10 + index, f'Shop {index}', 'Food', f'Row {index}')
+            for index in range(count)]
+
+
+def pdf_pages(data):
+    """Row lines of each page of a pdf_chunks() document, from its (Flate-compressed) content streams."""
+    pages = []
+    for stream in re.findall(rb'stream\n(.*?)\nendstream', data, re.S):
+        text = zlib.decompress(stream).decode('latin-1')
+        pages.append(re.findall(r'T\* \((\d{4}-\d\d-\d\d [^)]*)\) Tj', text))
+    return pages
+
+
+@pytest.mark.parametrize('count, per_page', [
+    (0, [0]),
+    (1, [1]),
+    (PDF_ROWS_PER_PAGE, [PDF_ROWS_PER_PAGE]),
+    (PDF_ROWS_PER_PAGE + 1, [PDF_ROWS_PER_PAGE, 1]),
+    (2 * PDF_ROWS_PER_PAGE + 5, [PDF_ROWS_PER_PAGE, PDF_ROWS_PER_PAGE, 5]),
+])
+def test_pdf_breaks_pages_every_rows_per_page(count, per_page):
+    data = rows(count)
+    # Batch boundaries must not matter
+    chunks = list(pdf_chunks([data[:7], data[7:]]))
+    document = b''.join(chunks)
+
+    assert [len(page) for page in pdf_pages(document)] == per_page
+    assert f'/Count {len(per_page)}'.encode() in document
+    # Preamble, one chunk per page, then the page tree and xref
+    assert len(chunks) == len(per_page) + 2
+
+
+def test_pdf_xref_offsets_point_at_their_objects():
+    document = b''.join(pdf_chunks([rows(PDF_ROWS_PER_PAGE + 3)]))
+    xref_at = int(document.rsplit(b'startxref\n', 1)[1].split(b'\n')[0])
+    assert document[xref_at:].startswith(b'xref\n')
+
+    entries = document[xref_at:].split(b'\n')[2:]
+    offsets = [int(entry[:10]) for entry in entries if entry.endswith(b' n ')]
+    for number, offset in enumerate(offsets, start=1):
+        assert document[offset:].startswith(b'%d 0 obj\n' % number)
+
+
+def test_html_escapes_every_text_cell():
+    hostile = [(datetime(2024, 1, 1), '<b>Debit</b>', 5, '<script>alert(1)</script>', 'A&B', '"quoted" <i>x</i>')]
+    html = ''.join(html_chunks([hostile]))
+
+    assert '<script>' not in html and '<b>' not in html and '<i>' not in html
+    assert '&lt;script&gt;alert(1)&lt;/script&gt;' in html
+    assert 'A&amp;B' in html
+    assert '&quot;quoted&quot;' in html
+
+
+def test_history_page_streams_a_pdf_statement(client):
+    with client.session_transaction() as session:
+        session['customer_id'] = 3
+    response = client.get('/transaction_history?export=pdf&date_range=all', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/pdf'
+    assert 'Content-Encoding' not in response.headers
+    document = response.get_data()
+    assert document.startswith(b'%PDF-') and document.endswith(b'%%EOF\n')
+    assert sum(len(page) for page in pdf_pages(document)) > 0
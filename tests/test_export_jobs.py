@@ -0,0 +1,61 @@
+"""Background export jobs: every job ends 'done' or 'failed' and gives its slot back."""
+import time
+
+import pytest
+
+from database import export_jobs
+
+
+@pytest.fixture
+def jobs_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(export_jobs, 'EXPORT_DIR', str(tmp_path))
+    yield tmp_path
+    export_jobs.shutdown_export_workers()
+
+
+def wait_for(job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = export_jobs.get_job(job_id)
+        if job['status'] not in export_jobs.ACTIVE_STATUSES:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f'export job {job_id} still {job["status"]}')
+
+
+def test_export_job_writes_its_artifact(schema, jobs_dir):
+    job = wait_for(export_jobs.submit(3, 'pdf')['job_id'])
+
+    assert job['status'] == 'done'
+    path, mimetype, _ = export_jobs.artifact(job)
+    assert mimetype == 'application/pdf'
+    with open(path, 'rb') as f:
+        assert f.read(5) == b'%PDF-'
+
+
+def test_connection_failure_fails_the_job_and_frees_its_slot(schema, jobs_dir, monkeypatch):
+    def pool_timeout():
+        raise RuntimeError('pool exhausted')
+    monkeypatch.setattr(export_jobs, 'get_db_connection', pool_timeout)
+
+    for _ in range(export_jobs.EXPORT_MAX_ACTIVE_PER_CUSTOMER + 1):
+        job = wait_for(export_jobs.submit(3, 'csv')['job_id'])
+        assert (job['status'], job['error']) == ('failed', 'pool exhausted')
+    assert export_jobs.get_job(job['job_id']) == job  # from the state file: no longer held in memory
+
+
+def test_shutdown_fails_queued_jobs(schema, jobs_dir, monkeypatch):
+    class Stopped:
+        def submit(self, *args):
+            pass  # never runs: the job stays queued
+
+        def shutdown(self, wait, cancel_futures):
+            pass
+    monkeypatch.setattr(export_jobs, '_executor', Stopped())
+    job_id = export_jobs.submit(3, 'csv')['job_id']
+
+    export_jobs.shutdown_export_workers()
+
+    job = export_jobs.get_job(job_id)
+    assert job['status'] == 'failed' and job['finished_at']
+    assert job_id not in export_jobs._jobs  # its slot is free again
@@ -0,0 +1,118 @@
+"""Hot accounts: payers write only their debit, the sweeper writes the credit with its balance and counters."""
+from decimal import Decimal
+
+import pytest
+
+from database import bulk_transfers, daily_summary, hot_accounts, ledger
+
+
+def transfer(receiver, amount, reference):
+    """A transfer from account 1 (customer 3) to `receiver` (customer 4's account 2 when hot)."""
+    return ledger.new_transfer(1, 3, receiver, 4, amount, 'UPI', reference, 'QR Payment', 'QR payment', 'Received QR')
+
+
+def run_batch(conn, amounts):
+    batch = bulk_transfers.new_batch(1, 3, [{'receiver_account_number': number, 'amount': amount}
+                                            for number, amount in amounts])
+    bulk_transfers.prepare_batch(conn, batch)
+    bulk_transfers.execute_batch(conn, batch)
+    return batch
+
+
+def outcomes(batch):
+    return [(result['status'], result['error']) for result in batch['results']]
+
+
+def etag(client, customer_id):
+    return client.get(f'/api/transactions?customer_id={customer_id}&date_range=all').headers['ETag']
+
+
+def revalidate(client, customer_id, tag):
+    return client.get(f'/api/transactions?customer_id={customer_id}&date_range=all', headers={'If-None-Match': tag})
+
+
+def test_hot_transfer_conserves_money(conn, query, money_total, hot_account):
+    before = money_total()
+    balance = query('SELECT balance FROM accounts WHERE account_id = %s', (hot_account,))[0][0]
+
+    debit_id, credit_id = ledger.execute_transfer(conn, transfer(hot_account, 40, 'TEST-HOT'))
+
+    # Only the payer's debit is written; the credit waits in pending_credits
+    assert credit_id is None
+    assert money_total() == before
+    assert query('SELECT balance FROM accounts WHERE account_id = %s', (hot_account,))[0][0] == balance
+    assert query('SELECT transaction_id, counterparty_account_id FROM transactions WHERE reference_number = %s',
+                 ('TEST-HOT',)) == [(debit_id, None)]
+
+    assert hot_accounts.sweep_all(conn) == 1
+    assert money_total() == before
+    assert Decimal(str(query('SELECT balance FROM accounts WHERE account_id = %s', (hot_account,))[0][0])) == \
+        Decimal(str(balance)) + 40
+    rows = query('SELECT account_id, transaction_type, counterparty_account_id FROM transactions '
+                 'WHERE reference_number = %s ORDER BY transaction_id', ('TEST-HOT',))
+    assert rows == [(1, 'Debit', hot_account), (hot_account, 'Credit', 1)]
+    assert daily_summary.check() == []
+
+
+def test_hot_transfer_refuses_closed_receiver(conn, query, money_total, hot_account):
+    pending = transfer(hot_account, 40, 'TEST-HOT-CLOSED')
+    before = money_total()
+    query("UPDATE accounts SET status = 'Closed' WHERE account_id = %s", (hot_account,))
+    try:
+        with pytest.raises(ledger.TransferError) as refused:
+            ledger.execute_transfer(conn, pending)
+    finally:
+        query("UPDATE accounts SET status = 'Active' WHERE account_id = %s", (hot_account,))
+    assert refused.value.status == 404
+    assert money_total() == before
+    assert query('SELECT COUNT(*) FROM pending_credits')[0][0] == 0
+
+
+def test_bulk_transfer_to_hot_account_conserves_money(conn, query, money_total, hot_account):
+    before = money_total()
+
+    batch = run_batch(conn, [('2345678901', 15), ('3456789012', 25), ('2345678901', 35)])
+
+    assert [status for status, _ in outcomes(batch)] == ['Completed'] * 3
+    assert money_total() == before
+    assert query('SELECT COUNT(*), SUM(amount) FROM pending_credits WHERE account_id = %s', (hot_account,)) == [(2, 50)]
+    credits = query("SELECT account_id FROM transactions WHERE reference_number LIKE %s AND transaction_type = 'Credit'",
+                    (batch['batch_reference'] + '%',))
+    assert credits == [(3,)]
+
+    assert hot_accounts.sweep_all(conn) == 2
+    assert money_total() == before
+    assert query("SELECT COUNT(*) FROM transactions WHERE reference_number LIKE %s AND transaction_type = 'Credit'",
+                 (batch['batch_reference'] + '%',)) == [(3,)]
+    assert daily_summary.check() == []
+
+
+def test_bulk_transfer_fails_items_to_a_closed_hot_account(conn, query, money_total, hot_account):
+    batch = bulk_transfers.new_batch(1, 3, [{'receiver_account_number': '2345678901', 'amount': 5},
+                                            {'receiver_account_number': '3456789012', 'amount': 5}])
+    bulk_transfers.prepare_batch(conn, batch)
+    before = money_total()
+    query("UPDATE accounts SET status = 'Closed' WHERE account_id = %s", (hot_account,))
+    try:
+        bulk_transfers.execute_batch(conn, batch)
+    finally:
+        query("UPDATE accounts SET status = 'Active' WHERE account_id = %s", (hot_account,))
+
+    assert outcomes(batch) == [('Failed', 'Receiver account not available'), ('Completed', None)]
+    assert money_total() == before
+    assert query('SELECT COUNT(*) FROM pending_credits')[0][0] == 0
+
+
+def test_hot_receiver_etag_changes_when_its_credit_is_written(client, conn, hot_account):
+    sender, receiver = etag(client, 3), etag(client, 4)
+    ledger.execute_transfer(conn, transfer(hot_account, 12, 'TEST-ETAG-HOT'))
+
+    # The sender sees the debit at once; the receiver's listing has not changed until the sweep
+    assert revalidate(client, 3, sender).status_code == 200
+    assert revalidate(client, 4, receiver).status_code == 304
+
+    hot_accounts.sweep_all(conn)
+    response = revalidate(client, 4, receiver)
+    assert response.status_code == 200
+    assert response.headers['ETag'] != receiver
+    assert 'Received QR' in response.get_data(as_text=True)
@@ -0,0 +1,114 @@
+"""Ledger transfers: the guarded balance UPDATE, retry classification and conservation of money."""
+import sqlite3
+from decimal import Decimal
+
+import pytest
+
+from database import daily_summary, ledger
+
+
+def transfer(sender, sender_customer, receiver, receiver_customer, amount, reference):
+    return ledger.new_transfer(sender, sender_customer, receiver, receiver_customer, amount, 'IMPS', reference,
+                               'Money Transfer', 'Transfer out', 'Transfer in')
+
+
+def move_rowcount(conn, sender, sender_customer, receiver, amount):
+    cursor = conn.cursor()
+    try:
+        conn.start_transaction()
+        cursor.execute(*ledger.move_statement(transfer(sender, sender_customer, receiver, 0, amount, 'MOVE')))
+        return cursor.rowcount
+    finally:
+        cursor.close()
+        conn.rollback()
+
+
+def test_move_updates_both_rows(conn):
+    assert move_rowcount(conn, 1, 3, 2, 10) == 2
+
+
+def test_move_refuses_insufficient_balance(conn):
+    # The receiver still matches, so a refusal shows up as a rowcount of 1, not 0
+    assert move_rowcount(conn, 1, 3, 2, 10 ** 9) == 1
+
+
+def test_move_refuses_sender_of_another_customer(conn):
+    assert move_rowcount(conn, 1, 4, 2, 10) == 1
+
+
+def test_move_refuses_closed_receiver(conn, query):
+    query("UPDATE accounts SET status = 'Closed' WHERE account_id = 3")
+    try:
+        assert move_rowcount(conn, 1, 3, 3, 10) == 1
+    finally:
+        query("UPDATE accounts SET status = 'Active' WHERE account_id = 3")
+
+
+class MySQLError(Exception):
+    def __init__(self, errno):
+        super().__init__(errno, 'error')
+        self.errno = errno
+
+
+@pytest.mark.parametrize('error, reason', [
+    (MySQLError(1213), 'deadlocks'),
+    (MySQLError(1205), 'lock_timeouts'),
+    (Exception(1213, 'Deadlock found'), 'deadlocks'),  # pymysql passes the errno as the first argument
+    (sqlite3.OperationalError('database is locked'), 'lock_timeouts'),
+    (MySQLError(1062), None),
+    (sqlite3.OperationalError('no such table: accounts'), None),
+    (ValueError('bad'), None),
+])
+def test_retry_reason(error, reason):
+    assert ledger._retry_reason(error) == reason
+
+
+def test_transfer_conserves_money(conn, query, money_total):
+    before = money_total()
+    sender, receiver = (query('SELECT balance FROM accounts WHERE account_id = %s', (account_id,))[0][0]
+                        for account_id in (1, 2))
+
+    debit_id, credit_id = ledger.execute_transfer(conn, transfer(1, 3, 2, 4, '125.50', 'TEST-SINGLE'))
+
+    assert money_total() == before
+    assert Decimal(str(query('SELECT balance FROM accounts WHERE account_id = 1')[0][0])) == \
+        Decimal(str(sender)) - Decimal('125.50')
+    assert Decimal(str(query('SELECT balance FROM accounts WHERE account_id = 2')[0][0])) == \
+        Decimal(str(receiver)) + Decimal('125.50')
+    rows = query('SELECT transaction_id, account_id, transaction_type, counterparty_account_id FROM transactions '
+                 'WHERE reference_number = %s ORDER BY transaction_id', ('TEST-SINGLE',))
+    assert rows == [(debit_id, 1, 'Debit', 2), (credit_id, 2, 'Credit', 1)]
+    assert daily_summary.check() == []
+
+
+def test_refused_transfer_changes_nothing(conn, money_total):
+    before = money_total()
+    with pytest.raises(ledger.TransferError) as refused:
+        ledger.execute_transfer(conn, transfer(1, 3, 2, 4, 10 ** 9, 'TEST-REFUSED'))
+    assert refused.value.status == 400
+    assert money_total() == before
+
+
+def mobile_transfer(client, query, amount):
+    import bcrypt
+    query('UPDATE customers SET password_hash = %s WHERE customer_id = 3',
+          (bcrypt.hashpw(b'secret', bcrypt.gensalt(4)).decode(),))
+    with client.session_transaction() as session:
+        session['customer_id'] = 3
+    client.post('/mobile_transfer', data={'selectedReceiverId': '4', 'amount': str(amount), 'sender_account': '1',
+                                          'password': 'secret'})
+    with client.session_transaction() as session:
+        return session.get('_flashes', [])
+
+
+def test_mobile_transfer_credits_the_receivers_primary_account(client, query):
+    receiver = Decimal(str(query('SELECT balance FROM accounts WHERE account_id = 2')[0][0]))
+
+    flashes = mobile_transfer(client, query, 15)
+
+    assert flashes[-1][0] == 'success'
+    assert Decimal(str(query('SELECT balance FROM accounts WHERE account_id = 2')[0][0])) == receiver + 15
+
+
+def test_mobile_transfer_flashes_refusals_like_the_other_routes(client, query):
+    assert mobile_transfer(client, query, 10 ** 9) == [('error', 'Insufficient balance!')]
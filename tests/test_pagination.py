@@ -0,0 +1,30 @@
+"""Keyset pagination cursors for /api/transactions."""
+from datetime import datetime
+
+import pytest
+
+from database.queries import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    when = datetime(2024, 3, 1, 12, 30, 5)
+    assert decode_cursor(encode_cursor((4821, when))) == (when, 4821)
+
+
+def test_cursor_is_url_safe_without_padding():
+    token = encode_cursor((7, datetime(2024, 1, 1)))
+    assert '=' not in token and '+' not in token and '/' not in token
+
+
+@pytest.mark.parametrize('token', [
+    '',
+    'not a cursor',
+    encode_cursor((1, datetime(2024, 1, 1)))[:-3],
+    'W' + encode_cursor((1, datetime(2024, 1, 1))),
+    encode_cursor((1, None)),
+    'WyIyMDI0LTAxLTAxIiwgImFiYyJd',  # ["2024-01-01", "abc"]
+    'eyJ3aGVuIjogMX0',  # {"when": 1}
+])
+def test_cursor_rejects_tampered_tokens(token):
+    with pytest.raises(ValueError):
+        decode_cursor(token)
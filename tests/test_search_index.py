@@ -0,0 +1,20 @@
+"""Word-prefix search: the index range a search word scans."""
+import pytest
+
+from database import search_index
+
+
+@pytest.mark.parametrize('term, low, high', [
+    ('cof', 'cof', 'cog'),
+    ('a', 'a', 'b'),
+    ('9', '9', 'a'),
+])
+def test_prefix_bounds(term, low, high):
+    assert search_index.prefix_bounds(term) == (low, high)
+
+
+@pytest.mark.parametrize('term', ['cof', 'az', 'z', 'zz', 'q9', 'b'])
+def test_prefix_bounds_match_exactly_the_words_with_the_prefix(term):
+    low, high = search_index.prefix_bounds(term)
+    for word in ('a', 'az', 'azz', 'b', 'coffee', 'cofz', 'cog', 'q9', 'q9z', 'qa', 'z', 'zz', 'zzzz', 'zzzzzzzz'):
+        assert (low <= word < high) == word.startswith(term), word
@@ -0,0 +1,66 @@
+"""Prepared transaction queries: every shape binds its parameters in the order its SQL uses them."""
+from datetime import date, datetime
+
+import pytest
+
+from database import queries
+from database.queries import TRANSACTION_VARIANTS, transaction_query
+
+
+# What each placeholder binds, recognised from the SQL just before it
+_PLACEHOLDER_GROUPS = (
+    ('t.customer_id = ', 'customer'),
+    ('t.transaction_date >= ', 'date'),
+    ('t.transaction_type = ', 'type'),
+    ('t.category = ', 'type'),
+    ('s.customer_id = ', 'search'),
+    ('s.term >= ', 'search'),
+    ('s.term < ', 'search'),
+    ('r.customer_id = ', 'summary'),
+    ('r.summary_date >= ', 'summary'),
+)
+
+
+def placeholder_groups(sql):
+    """The group of every filter placeholder in `sql`, in binding order (LIMIT, OFFSET and keyset ones left out)."""
+    groups = []
+    for before in sql.split('%s')[:-1]:
+        before = ' '.join(before.split())
+        groups += [group for prefix, group in _PLACEHOLDER_GROUPS if before.endswith(prefix.strip())]
+    return groups
+
+
+FILTERS = [
+    ('all', 'all', ''),
+    ('month', 'all', ''),
+    ('all', 'credit', 'coffee'),
+    ('year', 'debit', 'coffee shop'),
+    ('week', 'transfer', 'rent march'),
+]
+
+
+@pytest.mark.parametrize('shape', sorted({key[0] for key in TRANSACTION_VARIANTS}))
+@pytest.mark.parametrize('date_range, transaction_type, search', FILTERS)
+def test_parameters_follow_the_shape_param_order(shape, date_range, transaction_type, search):
+    if shape == 'page_ranked' and not search:
+        pytest.skip('page_ranked needs a search word')
+    sql, params = transaction_query(shape, 42, date_range, transaction_type, search)
+    groups = placeholder_groups(sql)
+    assert len(groups) == len(params)
+
+    # The SQL's placeholders come in the group order _SHAPE_PARAM_ORDER declares for the shape
+    order = queries._SHAPE_PARAM_ORDER.get(shape, queries._DEFAULT_PARAM_ORDER)
+    assert groups == sorted(groups, key=order.index)
+
+    # ... and each one receives a value of its group
+    for group, value in zip(groups, params):
+        if group == 'customer':
+            assert value == 42
+        elif group == 'date':
+            assert isinstance(value, datetime)
+        elif group == 'type':
+            assert value in ('Credit', 'Debit', 'Transfer')
+        elif group == 'search':
+            assert value == 42 or isinstance(value, str)
+        else:
+            assert value == 42 or isinstance(value, date)